@@ -0,0 +1,110 @@
+# analysis_cache.py
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import AIAnalysisCache
+
+load_dotenv()
+
+AI_CACHE_LRU_SIZE = int(os.getenv("AI_CACHE_LRU_SIZE", 50000))
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    # case and whitespace differences should not defeat the cache
+    return _WS_RE.sub(" ", (text or "").lower()).strip()
+
+
+def cache_key(text: str, model_name: str, prompt_version: str) -> str:
+    payload = f"{model_name}|{prompt_version}|{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of AI results: an in-process LRU in front of the
+    ai_analysis_cache table. Values are result dicts without an item id.
+    """
+
+    def __init__(self, max_size: int = AI_CACHE_LRU_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, dict]" = OrderedDict()
+
+    def _lru_get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+            return value
+
+    def _lru_put(self, key: str, value: dict):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    async def get_many(self, db: AsyncSession, keys: Iterable[str]) -> Dict[str, dict]:
+        found: Dict[str, dict] = {}
+        missing = []
+        for key in set(keys):
+            value = self._lru_get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+
+        if missing:
+            rows = await db.execute(
+                select(AIAnalysisCache.cache_key, AIAnalysisCache.result).where(AIAnalysisCache.cache_key.in_(missing))
+            )
+            db_hits = {row.cache_key: row.result for row in rows}
+            if db_hits:
+                await db.execute(
+                    update(AIAnalysisCache)
+                    .where(AIAnalysisCache.cache_key.in_(list(db_hits)))
+                    .values(hit_count=AIAnalysisCache.hit_count + 1, last_hit_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+            for key, value in db_hits.items():
+                self._lru_put(key, value)
+            found.update(db_hits)
+
+        return found
+
+    async def put_many(self, db: AsyncSession, entries: Dict[str, dict], model_name: str, prompt_version: str):
+        """Store fresh results. Does not commit."""
+        if not entries:
+            return
+        await db.execute(
+            insert(AIAnalysisCache)
+            .values([
+                {
+                    "cache_key": key,
+                    "model_name": model_name,
+                    "prompt_version": prompt_version,
+                    "result": value,
+                    "hit_count": 0,
+                    "created_at": datetime.utcnow(),
+                }
+                for key, value in entries.items()
+            ])
+            .on_conflict_do_nothing(index_elements=["cache_key"])
+        )
+        for key, value in entries.items():
+            self._lru_put(key, value)
+
+
+analysis_cache = AnalysisCache()
@@ -0,0 +1,202 @@
+# analyst.py
+"""
+Analyst agent: answers questions over one workspace's feedback.
+
+Instead of an LLM tool-calling loop (one model round trip per decision before
+anything reaches the user), every retrieval tool is cheap and independent, so
+all of them start at once with asyncio and report as they finish; the answer
+model then streams its reply token by token. The first SSE event leaves
+immediately, tool results follow within AGENT_TOOL_TIMEOUT at most (slower
+tools are cancelled and left out), and the first answer token follows one
+model call later. Steps are recorded on AgentRun write-behind.
+
+Answers are cached per workspace data_version (agents/answer_cache.py); a hit
+is replayed without running any tool or model.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional, Protocol
+
+from dotenv import load_dotenv
+
+from agents.answer_cache import answer_cache, answer_cache_key
+from agents.run_recorder import recorder
+from database.db import AsyncSessionLocal
+from services.data_version import get_data_version
+from tools.base import Tool, ToolContext
+from tools.feedback_search import keyword_search, semantic_search
+from tools.feedback_stats import feedback_stats
+from tools.snapshots import latest_snapshots
+
+load_dotenv()
+
+AGENT_NAME = "AnalystAgent"
+AI_AGENT_MODEL = os.getenv("AI_AGENT_MODEL", "gemini-1.5-flash")  # or "fake"
+AGENT_TOOL_TIMEOUT = float(os.getenv("AGENT_TOOL_TIMEOUT", 8))  # seconds the answer waits for tools
+AGENT_MAX_CONTEXT_CHARS = int(os.getenv("AGENT_MAX_CONTEXT_CHARS", 12000))
+
+TOOLS: Dict[str, Tool] = {
+    "feedback_stats": feedback_stats,
+    "snapshots": latest_snapshots,
+    "keyword_search": keyword_search,
+    "semantic_search": semantic_search,
+}
+
+
+@dataclass
+class AgentEvent:
+    event: str  # run | tool | token | done | error
+    data: dict
+
+    def sse(self) -> str:
+        return f"event: {self.event}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+# ---------------------------------------------------------------------
+# Answer models
+# ---------------------------------------------------------------------
+class AnswerModel(Protocol):
+    name: str
+
+    def stream(self, prompt: str, context: dict) -> AsyncIterator[str]:
+        ...
+
+
+class FakeAnswerModel:
+    """Local stand-in (tests, local dev): summarises the tool output, streamed word by word."""
+    name = "fake"
+
+    async def stream(self, prompt: str, context: dict) -> AsyncIterator[str]:
+        stats = context.get("feedback_stats") or {}
+        parts = [f"{stats.get('total', 0)} feedback items in the last {stats.get('days', '?')} days."]
+        if stats.get("sentiment"):
+            parts.append("Sentiment: " + ", ".join(f"{k} {v}" for k, v in stats["sentiment"].items()) + ".")
+        if stats.get("top_categories"):
+            parts.append("Top categories: " + ", ".join(c["category"] for c in stats["top_categories"][:3]) + ".")
+        examples = (context.get("semantic_search") or {}).get("items") or (context.get("keyword_search") or {}).get("items") or []
+        if examples:
+            parts.append("Example: " + (examples[0].get("ai_summary") or "(unprocessed feedback)"))
+        for word in " ".join(parts).split(" "):
+            yield word + " "
+
+
+class GeminiAnswerModel:
+    def __init__(self, model: str = AI_AGENT_MODEL):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        self.name = model
+        self._llm = ChatGoogleGenerativeAI(model=model, temperature=0.2)
+
+    async def stream(self, prompt: str, context: dict) -> AsyncIterator[str]:
+        async for chunk in self._llm.astream(prompt):
+            if chunk.content:
+                yield chunk.content
+
+
+def get_answer_model(name: Optional[str] = None) -> AnswerModel:
+    name = name or AI_AGENT_MODEL
+    if name == "fake":
+        return FakeAnswerModel()
+    return GeminiAnswerModel(name)
+
+
+_PROMPT = """You are a customer-feedback analyst. Answer the question using only the data below.
+Quote numbers from the data, mention example feedback when it helps, and say so when the data
+does not answer the question. Be concise.
+
+Question: {question}
+
+Data (JSON, one key per tool):
+{context}"""
+
+
+# ---------------------------------------------------------------------
+# Runtime
+# ---------------------------------------------------------------------
+async def _call_tool(name: str, tool: Tool, ctx: ToolContext):
+    started = time.perf_counter()
+    try:
+        result, error = await tool(ctx), None
+    except Exception as e:
+        result, error = None, f"{type(e).__name__}: {e}"
+    return name, result, error, int((time.perf_counter() - started) * 1000)
+
+
+async def run_agent(
+    workspace_id,
+    question: str,
+    model: AnswerModel,
+    request_id: Optional[str] = None,
+    days: int = 30,
+) -> AsyncIterator[AgentEvent]:
+    run_id = uuid.uuid4()
+    request_id = request_id or str(run_id)
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        data_version = await get_data_version(db, workspace_id)
+        cache_key = answer_cache_key(workspace_id, question, data_version, days, model.name)
+        cached = await answer_cache.get(db, workspace_id, cache_key)
+    run_data = {"question": question, "model": model.name, "days": days, "data_version": data_version}
+
+    if cached is not None:
+        recorder.begin(run_id, workspace_id, request_id, AGENT_NAME, {**run_data, "cached_from": cached["run_id"]})
+        recorder.finish(run_id, "success", "cache hit", answer=cached["answer"])
+        yield AgentEvent("run", {"run_id": str(run_id), "request_id": request_id, "cached": True})
+        yield AgentEvent("token", {"text": cached["answer"]})
+        yield AgentEvent("done", {
+            "run_id": str(run_id), "answer": cached["answer"], "cached_from": cached["run_id"],
+            "total_ms": int((time.perf_counter() - started) * 1000),
+        })
+        return
+
+    recorder.begin(run_id, workspace_id, request_id, AGENT_NAME, run_data)
+    yield AgentEvent("run", {"run_id": str(run_id), "request_id": request_id, "cached": False})
+
+    ctx = ToolContext(workspace_id=workspace_id, question=question, days=days)
+    tasks = [asyncio.create_task(_call_tool(name, tool, ctx)) for name, tool in TOOLS.items()]
+    context: Dict[str, dict] = {}
+    answer = []
+    complete = True  # every tool answered; only complete answers are cached
+    try:
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=AGENT_TOOL_TIMEOUT):
+                name, result, error, duration_ms = await next_done
+                recorder.step(run_id, type="tool", tool=name, duration_ms=duration_ms, error=error, result=result)
+                if result is not None:
+                    context[name] = result
+                else:
+                    complete = False
+                yield AgentEvent("tool", {"tool": name, "duration_ms": duration_ms, "error": error, "result": result})
+        except asyncio.TimeoutError:
+            late = [name for name, task in zip(TOOLS, tasks) if not task.done()]
+            complete = False
+            recorder.step(run_id, type="timeout", tools=late)
+            yield AgentEvent("tool", {"timeout": late})
+
+        prompt = _PROMPT.format(question=question, context=json.dumps(context, default=str)[:AGENT_MAX_CONTEXT_CHARS])
+        first_token_ms = None
+        async for token in model.stream(prompt, context):
+            if first_token_ms is None:
+                first_token_ms = int((time.perf_counter() - started) * 1000)
+            answer.append(token)
+            yield AgentEvent("token", {"text": token})
+
+        timings = {"first_token_ms": first_token_ms, "total_ms": int((time.perf_counter() - started) * 1000)}
+        recorder.finish(run_id, "success", cache_key=cache_key if complete else None, answer="".join(answer), **timings)
+        if complete:
+            answer_cache.put(cache_key, {"run_id": str(run_id), "answer": "".join(answer)})
+        yield AgentEvent("done", {"run_id": str(run_id), "answer": "".join(answer), **timings})
+    except (asyncio.CancelledError, GeneratorExit):
+        # client went away mid-stream
+        recorder.finish(run_id, "failed", "cancelled", answer="".join(answer))
+        raise
+    except Exception as e:
+        recorder.finish(run_id, "failed", str(e), answer="".join(answer))
+        yield AgentEvent("error", {"run_id": str(run_id), "detail": str(e)})
+    finally:
+        for task in tasks:
+            task.cancel()
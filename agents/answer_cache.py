@@ -0,0 +1,91 @@
+# answer_cache.py
+"""
+Cache of analyst agent answers.
+
+Keyed on the normalized question, the answer settings (look-back days, model,
+prompt version), the workspace's data_version and the UTC date, so an answer
+is reused until the data behind it changes and never after. The date expires
+answers as their "last N days" window slides; data_version is bumped when
+feedback is enriched, and the analyst tools only read enriched feedback, so
+newly ingested rows cannot change an answer before that bump. Tiers: an
+in-process LRU, then the latest successful AgentRun with the same cache_key
+(partial index idx_agentrun_cache), so every replica benefits from every
+answered question.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from agents.analysis_cache import normalize_text
+from database.models import AgentRun
+
+load_dotenv()
+
+AGENT_CACHE_LRU_SIZE = int(os.getenv("AGENT_CACHE_LRU_SIZE", 2000))
+AGENT_PROMPT_VERSION = os.getenv("AGENT_PROMPT_VERSION", "v1")
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question: str) -> str:
+    # "What are the top billing issues?" == "what are the top billing issues"
+    return normalize_text(_PUNCT_RE.sub(" ", question or ""))
+
+
+def answer_cache_key(workspace_id, question: str, data_version: int, days: int, model_name: str) -> str:
+    # tools aggregate over "the last `days` days": yesterday's answer covers another window
+    today = datetime.utcnow().date().isoformat()
+    payload = (
+        f"{workspace_id}|{data_version}|{today}|{days}|{model_name}|{AGENT_PROMPT_VERSION}|"
+        f"{normalize_question(question)}"
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    def __init__(self, max_size: int = AGENT_CACHE_LRU_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, dict]" = OrderedDict()
+
+    def _lru_get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    async def get(self, db: AsyncSession, workspace_id, key: str) -> Optional[dict]:
+        """{"run_id", "answer"} of the cached answer, or None."""
+        value = self._lru_get(key)
+        if value is not None:
+            return value
+        row = (await db.execute(
+            select(AgentRun.id, AgentRun.data["answer"].astext.label("answer"))
+            .where(AgentRun.workspace_id == workspace_id, AgentRun.cache_key == key, AgentRun.status == "success")
+            .order_by(AgentRun.completed_at.desc())
+            .limit(1)
+        )).first()
+        if row is None or row.answer is None:
+            return None
+        value = {"run_id": str(row.id), "answer": row.answer}
+        self.put(key, value)
+        return value
+
+
+answer_cache = AnswerCache()
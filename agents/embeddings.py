@@ -0,0 +1,77 @@
+# embeddings.py
+import hashlib
+import math
+import os
+import re
+from typing import List, Optional, Protocol
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AI_EMBEDDING_MODEL = os.getenv("AI_EMBEDDING_MODEL", "models/text-embedding-004")  # or "hashing"
+AI_EMBEDDING_DIM = int(os.getenv("AI_EMBEDDING_DIM", 768))
+# characters sent per text; long tickets rarely change meaning after the first few KB
+AI_EMBEDDING_MAX_CHARS = int(os.getenv("AI_EMBEDDING_MAX_CHARS", 8000))
+
+
+class Embedder(Protocol):
+    name: str
+    dimension: int
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else vector
+
+
+# ---------------------------------------------------------------------
+# Local hashing embedder (tests, local dev): feature-hashed unigrams and
+# bigrams. Texts sharing wording land close together; no network.
+# ---------------------------------------------------------------------
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+class HashingEmbedder:
+    name = "hashing"
+
+    def __init__(self, dimension: int = AI_EMBEDDING_DIM):
+        self.dimension = dimension
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    def _embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        tokens = _TOKEN_RE.findall(text[:AI_EMBEDDING_MAX_CHARS].lower())
+        for feature in (*tokens, *(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        return _normalize(vector)
+
+
+# ---------------------------------------------------------------------
+# Google embeddings via langchain; one request per batch
+# ---------------------------------------------------------------------
+class GoogleEmbedder:
+    def __init__(self, model: str = AI_EMBEDDING_MODEL, dimension: int = AI_EMBEDDING_DIM):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        self.name = model
+        self.dimension = dimension
+        self._embeddings = GoogleGenerativeAIEmbeddings(model=model)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = await self._embeddings.aembed_documents([t[:AI_EMBEDDING_MAX_CHARS] for t in texts])
+        return [_normalize(list(v)) for v in vectors]
+
+
+def get_embedder(name: Optional[str] = None) -> Embedder:
+    name = name or AI_EMBEDDING_MODEL
+    if name == "hashing":
+        return HashingEmbedder()
+    return GoogleEmbedder(name)
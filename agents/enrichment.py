@@ -0,0 +1,135 @@
+# enrichment.py
+import json
+import os
+import re
+from collections import Counter
+from typing import List, Optional, Protocol
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+load_dotenv()
+
+AI_ENRICHMENT_MODEL = os.getenv("AI_ENRICHMENT_MODEL", "gemini-1.5-flash")  # or "fake"
+AI_PROMPT_VERSION = os.getenv("AI_PROMPT_VERSION", "v1")
+# rough USD prices used to report cost per item
+AI_COST_PER_1K_INPUT_TOKENS = float(os.getenv("AI_COST_PER_1K_INPUT_TOKENS", 0.000075))
+AI_COST_PER_1K_OUTPUT_TOKENS = float(os.getenv("AI_COST_PER_1K_OUTPUT_TOKENS", 0.0003))
+
+CATEGORIES = ["bug", "billing", "feature_request", "account", "performance", "ux", "praise", "other"]
+
+
+# ---------------------------------------------------------------------
+# Model I/O
+# ---------------------------------------------------------------------
+class EnrichmentInput(BaseModel):
+    id: str
+    text: str
+
+
+class EnrichmentResult(BaseModel):
+    id: str
+    sentiment: str = Field(description="positive | neutral | negative")
+    sentiment_score: float = Field(ge=-1, le=1)
+    confidence_score: float = Field(ge=0, le=1)
+    primary_category: str
+    categories: List[str] = []
+    ai_summary: str
+    priority_score: int = Field(ge=0, le=10)
+    keywords: List[str] = []
+
+
+class BatchEnrichment(BaseModel):
+    items: List[EnrichmentResult]
+
+
+class BatchOutput(BaseModel):
+    results: List[EnrichmentResult]
+    cost_usd: float = 0.0
+
+
+class EnrichmentModel(Protocol):
+    name: str
+
+    async def analyze_batch(self, items: List[EnrichmentInput]) -> BatchOutput:
+        ...
+
+
+# ---------------------------------------------------------------------
+# Local fake model (tests, local dev): deterministic keyword rules, no network
+# ---------------------------------------------------------------------
+_NEGATIVE = {"broken", "bug", "error", "crash", "slow", "refund", "cancel", "fail", "failed", "angry", "terrible", "can't", "cannot"}
+_POSITIVE = {"love", "great", "thanks", "awesome", "excellent", "amazing", "helpful", "perfect"}
+_CATEGORY_WORDS = {
+    "bug": {"bug", "error", "crash", "broken", "fail", "failed"},
+    "billing": {"invoice", "refund", "charge", "billing", "payment", "price"},
+    "feature_request": {"feature", "wish", "would", "add", "support"},
+    "account": {"password", "login", "account", "reset", "email"},
+    "performance": {"slow", "timeout", "latency", "lag"},
+    "praise": _POSITIVE,
+}
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+class FakeEnrichmentModel:
+    name = "fake"
+
+    async def analyze_batch(self, items: List[EnrichmentInput]) -> BatchOutput:
+        return BatchOutput(results=[self._analyze(item) for item in items], cost_usd=0.0)
+
+    def _analyze(self, item: EnrichmentInput) -> EnrichmentResult:
+        words = _WORD_RE.findall(item.text.lower())
+        score = sum(w in _POSITIVE for w in words) - sum(w in _NEGATIVE for w in words)
+        sentiment = "positive" if score > 0 else "negative" if score < 0 else "neutral"
+        categories = [c for c, vocab in _CATEGORY_WORDS.items() if vocab.intersection(words)] or ["other"]
+        keywords = [w for w, _ in Counter(w for w in words if len(w) > 3).most_common(5)]
+        return EnrichmentResult(
+            id=item.id,
+            sentiment=sentiment,
+            sentiment_score=max(-1.0, min(1.0, score / 3)),
+            confidence_score=0.5,
+            primary_category=categories[0],
+            categories=categories,
+            ai_summary=item.text[:200],
+            priority_score=min(10, 5 - score) if score < 0 else 2,
+            keywords=keywords,
+        )
+
+
+# ---------------------------------------------------------------------
+# Gemini via langchain: many feedback items per call, structured output
+# ---------------------------------------------------------------------
+_PROMPT = """You analyse customer support feedback. For EACH item below return one entry with the same id.
+sentiment: positive | neutral | negative; sentiment_score in [-1, 1]; confidence_score in [0, 1];
+primary_category and categories from {categories}; ai_summary: one sentence;
+priority_score 0-10 (10 = urgent); keywords: up to 5 lowercase keywords.
+
+Items (JSON):
+{items}"""
+
+
+class GeminiEnrichmentModel:
+    def __init__(self, model: str = AI_ENRICHMENT_MODEL):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        self.name = model
+        self._llm = ChatGoogleGenerativeAI(model=model, temperature=0).with_structured_output(BatchEnrichment)
+
+    async def analyze_batch(self, items: List[EnrichmentInput]) -> BatchOutput:
+        prompt = _PROMPT.format(
+            categories=", ".join(CATEGORIES),
+            items=json.dumps([item.model_dump() for item in items], ensure_ascii=False),
+        )
+        output: BatchEnrichment = await self._llm.ainvoke(prompt)
+        # ~4 characters per token; good enough for cost-per-item tracking
+        input_tokens = len(prompt) / 4
+        output_tokens = len(output.model_dump_json()) / 4
+        cost = (input_tokens * AI_COST_PER_1K_INPUT_TOKENS + output_tokens * AI_COST_PER_1K_OUTPUT_TOKENS) / 1000
+        return BatchOutput(results=output.items, cost_usd=cost)
+
+
+def get_enrichment_model(name: Optional[str] = None) -> EnrichmentModel:
+    name = name or AI_ENRICHMENT_MODEL
+    if name == "fake":
+        return FakeEnrichmentModel()
+    return GeminiEnrichmentModel(name)
@@ -0,0 +1,129 @@
+# run_recorder.py
+"""
+Write-behind AgentRun persistence.
+
+The agent loop only mutates an in-memory copy of each run (begin / step /
+finish are plain method calls, no awaits), so recording never delays a
+streamed token. A background task upserts every run that changed since the
+last flush as one multi-row INSERT ... ON CONFLICT (id) DO UPDATE, so a run
+with many steps costs a handful of writes however chatty it is. Finished
+runs are forgotten once written; a failed flush keeps them for the next one.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy.dialects.postgresql import insert
+
+from database.db import AsyncSessionLocal
+from database.models import AgentRun
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+AGENT_RECORD_INTERVAL = float(os.getenv("AGENT_RECORD_INTERVAL", 0.5))  # seconds between flushes
+AGENT_RECORD_MAX_RUNS = int(os.getenv("AGENT_RECORD_MAX_RUNS", 1000))  # unflushed runs kept in memory
+
+_UPDATED_COLUMNS = ("status", "message", "data", "cache_key", "started_at", "completed_at", "updated_at")
+
+
+class AgentRunRecorder:
+    def __init__(self, interval: float = AGENT_RECORD_INTERVAL, max_runs: int = AGENT_RECORD_MAX_RUNS):
+        self.interval = interval
+        self.max_runs = max_runs
+        self._runs: Dict[object, dict] = {}
+        self._dirty: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def begin(self, run_id, workspace_id, request_id: str, agent_name: str, data: dict):
+        if len(self._runs) >= self.max_runs:
+            logger.warning("agent run recorder backlog full; run %s not recorded", run_id)
+            return
+        now = datetime.utcnow()
+        self._runs[run_id] = {
+            "id": run_id,
+            "workspace_id": workspace_id,
+            "request_id": request_id,
+            "agent_name": agent_name,
+            "status": "pending",
+            "message": None,
+            "data": {**data, "steps": []},
+            "cache_key": None,
+            "started_at": now,
+            "completed_at": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._touch(run_id)
+
+    def step(self, run_id, **step):
+        run = self._runs.get(run_id)
+        if run is not None:
+            run["data"]["steps"].append({**step, "at": datetime.utcnow().isoformat()})
+            self._touch(run_id)
+
+    def finish(self, run_id, status: str, message: Optional[str] = None, cache_key: Optional[str] = None, **data):
+        run = self._runs.get(run_id)
+        if run is not None:
+            run["status"] = status
+            run["message"] = message
+            run["cache_key"] = cache_key
+            run["data"].update(data)
+            run["completed_at"] = datetime.utcnow()
+            self._touch(run_id)
+
+    def _touch(self, run_id):
+        self._runs[run_id]["updated_at"] = datetime.utcnow()
+        self._dirty.add(run_id)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def flush(self) -> int:
+        dirty, self._dirty = self._dirty, set()
+        # snapshot: the agent keeps appending steps while the write is in flight
+        rows = [
+            {**run, "data": {**run["data"], "steps": list(run["data"]["steps"])}}
+            for run in (self._runs.get(run_id) for run_id in dirty) if run is not None
+        ]
+        if not rows:
+            return 0
+        stmt = insert(AgentRun).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AgentRun.id],
+            set_={col: stmt.excluded[col] for col in _UPDATED_COLUMNS},
+        )
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(stmt)
+                await db.commit()
+        except Exception:
+            self._dirty |= dirty
+            logger.exception("agent run flush failed; %s runs kept for retry", len(rows))
+            return 0
+        for row in rows:
+            run = self._runs.get(row["id"])
+            if run is not None and run["completed_at"] is not None and row["id"] not in self._dirty:
+                del self._runs[row["id"]]
+        return len(rows)
+
+    async def _run(self):
+        while self._dirty:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+recorder = AgentRunRecorder()
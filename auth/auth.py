@@ -4,13 +4,16 @@ from jose import jwt, JWTError
 from passlib.context import CryptContext
 import os
 
+from auth.hashing_pool import run_hashing
+
 load_dotenv()
 
 SECRET_KEY = os.getenv("AUTH_SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 90))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=BCRYPT_ROUNDS)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -18,6 +21,29 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like $2b$<cost>$<salt+digest>
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return pwd_context.needs_update(hashed_password)
+
+def verify_and_rehash(plain_password: str, hashed_password: str):
+    """Returns (is_valid, new_hash); new_hash is set when the stored cost is outdated."""
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
+# Async variants run bcrypt on the dedicated hashing pool, off the event loop
+# and off FastAPI's shared threadpool
+async def hash_password_async(password: str) -> str:
+    return await run_hashing(hash_password, password)
+
+async def verify_and_rehash_async(plain_password: str, hashed_password: str):
+    return await run_hashing(verify_and_rehash, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
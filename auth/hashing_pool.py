@@ -0,0 +1,49 @@
+# hashing_pool.py
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+
+load_dotenv()
+
+# bcrypt releases the GIL while hashing, so a small thread pool gives real parallelism
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+# calls allowed to wait for a worker before we shed load with 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_in_flight = 0
+
+
+def hashing_pool_stats() -> dict:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_pending": PASSWORD_HASH_MAX_PENDING,
+        "in_flight": _in_flight,
+    }
+
+
+async def run_hashing(fn, *args):
+    """
+    Run a password hashing call on the dedicated pool. Fails fast with 503 when
+    running + queued calls exceed the cap instead of queueing without bound.
+    Only called from the event loop thread, so the counter needs no lock.
+    """
+    global _in_flight
+    if _in_flight >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _in_flight -= 1
+
+
+def shutdown_hashing_pool():
+    _executor.shutdown(wait=False, cancel_futures=True)
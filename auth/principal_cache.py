@@ -0,0 +1,143 @@
+# principal_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from database import models
+
+load_dotenv()
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))  # seconds
+PRINCIPAL_CACHE_MAX = int(os.getenv("PRINCIPAL_CACHE_MAX", 10000))
+
+
+# ---------------------------------------------------------------------
+# Principal: a detached, read-only snapshot of a user and their memberships.
+# Attribute names mirror models.User / Membership so get_user_workspace and
+# routes work with either.
+# ---------------------------------------------------------------------
+@dataclass(frozen=True)
+class WorkspaceRef:
+    id: UUID
+
+
+@dataclass(frozen=True)
+class MembershipRef:
+    workspace_id: UUID
+    role: str
+    workspace: WorkspaceRef
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: UUID
+    email: str
+    full_name: Optional[str]
+    is_active: bool
+    created_at: datetime
+    memberships: Tuple[MembershipRef, ...]
+
+
+def principal_from_user(user: models.User) -> Principal:
+    return Principal(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        is_active=user.is_active,
+        created_at=user.created_at,
+        memberships=tuple(
+            MembershipRef(workspace_id=m.workspace_id, role=m.role, workspace=WorkspaceRef(id=m.workspace_id))
+            for m in user.memberships
+        ),
+    )
+
+
+# ---------------------------------------------------------------------
+# TTL + LRU cache (per process). The TTL bounds staleness across replicas;
+# local writes invalidate immediately via the session hooks below.
+# ---------------------------------------------------------------------
+class PrincipalCache:
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_size: int = PRINCIPAL_CACHE_MAX):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id) -> Optional[Principal]:
+        key = str(user_id)
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, principal: Principal):
+        key = str(principal.id)
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, principal)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._items.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_principal(user_id):
+    principal_cache.invalidate(user_id)
+
+
+# ---------------------------------------------------------------------
+# Invalidation: collect users touched by a flush, drop them once committed
+# ---------------------------------------------------------------------
+_PENDING_KEY = "principal_invalidations"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_principal_changes(session, flush_context):
+    touched = session.info.setdefault(_PENDING_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        # read loaded state only; never trigger a lazy load inside a flush
+        if isinstance(obj, models.Membership):
+            user_id = inspect(obj).dict.get("user_id")
+        elif isinstance(obj, models.User):
+            user_id = inspect(obj).dict.get("id")
+        else:
+            continue
+        if user_id is not None:
+            touched.add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_principal_changes(session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_changes(session):
+    session.info.pop(_PENDING_KEY, None)
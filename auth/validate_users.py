@@ -4,9 +4,12 @@ from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
 import os
 
-from database.db import get_db
+from database.db import get_async_db, get_db
 from database import models
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from auth.principal_cache import Principal, principal_cache, principal_from_user
 
 load_dotenv()
 
@@ -16,28 +19,67 @@ ALGORITHM = os.getenv("ALGORITHM")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _user_id_from_token(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    return user_id
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """
+    Resolve the bearer token to a cached Principal. A cache hit costs no DB
+    round-trip; a miss loads the user and memberships in a single query.
+    """
+    user_id = _user_id_from_token(token)
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
 
-    user = db.query(models.User).filter(
+    user = db.query(models.User).options(joinedload(models.User.memberships)).filter(
         models.User.id == user_id).first()  # Remove int() conversion since user_id is now a string
     if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    principal = principal_from_user(user)
+    principal_cache.set(principal)
+    return principal
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Async-route variant of get_current_user; shares the same principal cache."""
+    user_id = _user_id_from_token(token)
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    result = await db.execute(
+        select(models.User)
+        .where(models.User.id == user_id)
+        .options(selectinload(models.User.memberships))
+    )
+    user = result.scalar_one_or_none()
+    if user is None:
+        raise _credentials_exception()
+    principal = principal_from_user(user)
+    principal_cache.set(principal)
+    return principal
 
 
-def get_user_workspace(user: models.User, workspace_id: str = None):
+def get_user_workspace(user: Principal, workspace_id: str = None):
     """
     If workspace_id is passed, return that membership;
     Otherwise, return the first workspace (or the owner's workspace).
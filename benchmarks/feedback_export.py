@@ -0,0 +1,78 @@
+"""
+Feedback export: throughput and peak memory per format.
+
+Seeds a throwaway workspace with synthetic feedback, then streams the export
+for each format (as the endpoint does, chunks are discarded after counting) at
+growing row counts. Peak Python memory (tracemalloc) should stay flat as rows
+grow; if it climbs with row count something is buffering the export. Run
+against a scratch database; the workspace is deleted afterwards unless --keep.
+
+    python -m benchmarks.feedback_export --rows 100000 1000000
+"""
+import argparse
+import time
+import tracemalloc
+import uuid
+
+from sqlalchemy import text
+
+from benchmarks.feedback_search import SEED_SQL, _PHRASES
+from database.db import engine
+from services.feedback_export import EXPORT_FORMATS, export_feedback, parquet_available
+from services.feedback_query import DEFAULT_LIST_FIELDS, FeedbackFilters, resolve_fields
+
+
+def _seed(workspace_id, rows: int):
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO workspaces (id, name, created_at, updated_at) VALUES (:id, 'export benchmark', now(), now())"),
+            {"id": workspace_id},
+        )
+        conn.execute(text(SEED_SQL), {
+            "workspace_id": workspace_id, "rows": rows, "phrases": _PHRASES, "n_phrases": len(_PHRASES),
+        })
+
+
+def _drop(workspace_id):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM workspaces WHERE id = :id"), {"id": workspace_id})
+
+
+def _run(workspace_id, export_format: str, columns):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = 0
+    for chunk in export_feedback(workspace_id, FeedbackFilters(), columns, export_format):
+        size += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming feedback export")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--keep", action="store_true", help="keep the seeded workspaces")
+    args = parser.parse_args()
+
+    formats = [f for f in EXPORT_FORMATS if f != "parquet" or parquet_available()]
+    columns = resolve_fields(",".join([*DEFAULT_LIST_FIELDS, "raw_content"]))
+    print(f"{'rows':>10}{'format':>9}{'seconds':>10}{'rows/s':>12}{'MB out':>10}{'peak MB':>10}")
+    for rows in args.rows:
+        workspace_id = uuid.uuid4()
+        _seed(workspace_id, rows)
+        try:
+            for export_format in formats:
+                elapsed, size, peak = _run(workspace_id, export_format, columns)
+                print(
+                    f"{rows:>10}{export_format:>9}{elapsed:>10.1f}{rows / elapsed:>12.0f}"
+                    f"{size / 1e6:>10.1f}{peak / 1e6:>10.1f}"
+                )
+        finally:
+            if not args.keep:
+                _drop(workspace_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Feedback search: naive ILIKE scan vs the search_vector GIN index.
+
+Seeds a throwaway workspace with synthetic feedback (generated server-side with
+generate_series, so 1M rows take seconds rather than minutes), then times both
+strategies for a handful of keyword and phrase queries. Run against a scratch
+database; the workspace is deleted afterwards unless --keep is given.
+
+    python -m benchmarks.feedback_search --rows 1000000 --repeat 5
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from sqlalchemy import text
+
+from database.db import engine
+
+QUERIES = [
+    ("refund", "%refund%"),
+    ("login timeout", "%login timeout%"),
+    ('"export to csv"', "%export to csv%"),
+    ("invoice -duplicate", "%invoice%"),
+]
+
+# phrases are combined per row so keyword frequencies are realistic-ish
+_PHRASES = [
+    "the app crashes when I open the dashboard",
+    "please add export to csv for reports",
+    "I was charged twice, need a refund",
+    "login timeout after the latest update",
+    "love the new insights page, great work",
+    "search is slow on large workspaces",
+    "invoice shows the wrong company name",
+    "duplicate invoice received this month",
+    "password reset email never arrives",
+    "integration with zendesk stopped syncing",
+    "dark mode would be really nice",
+    "support team was very helpful today",
+]
+
+SEED_SQL = """
+INSERT INTO feedback_items (
+    id, workspace_id, source_type, external_id, raw_content,
+    is_processed, priority_score, created_at, updated_at
+)
+SELECT
+    gen_random_uuid(), :workspace_id, 'benchmark', 'bench-' || g,
+    phrases[1 + (g * 7) % n] || '. ' || phrases[1 + (g * 13) % n] || '. ref ' || md5(g::text),
+    false, 0, now() - make_interval(secs => g), now()
+FROM generate_series(1, :rows) AS g, (SELECT CAST(:phrases AS text[]) AS phrases, :n_phrases AS n) AS p
+"""
+
+ILIKE_SQL = """
+SELECT id FROM feedback_items
+WHERE workspace_id = :workspace_id AND raw_content ILIKE :pattern
+ORDER BY created_at DESC LIMIT 20
+"""
+
+TSVECTOR_SQL = """
+SELECT id, ts_rank_cd(search_vector, q) AS rank
+FROM feedback_items, websearch_to_tsquery('english', :q) AS q
+WHERE workspace_id = :workspace_id AND search_vector @@ q
+ORDER BY rank DESC, id DESC LIMIT 20
+"""
+
+
+def _seed(conn, workspace_id, rows: int):
+    conn.execute(
+        text("INSERT INTO workspaces (id, name, created_at, updated_at) VALUES (:id, 'search benchmark', now(), now())"),
+        {"id": workspace_id},
+    )
+    start = time.perf_counter()
+    conn.execute(text(SEED_SQL), {
+        "workspace_id": workspace_id, "rows": rows, "phrases": _PHRASES, "n_phrases": len(_PHRASES),
+    })
+    conn.execute(text("ANALYZE feedback_items"))
+    print(f"seeded {rows} rows in {time.perf_counter() - start:.1f}s")
+
+
+def _time(conn, sql: str, params: dict, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark feedback full-text search")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded workspace")
+    args = parser.parse_args()
+
+    workspace_id = uuid.uuid4()
+    with engine.begin() as conn:
+        _seed(conn, workspace_id, args.rows)
+
+    try:
+        with engine.connect() as conn:
+            print(f"{'query':<24}{'ILIKE ms':>12}{'tsvector ms':>14}{'speedup':>10}")
+            for q, pattern in QUERIES:
+                naive = _time(conn, ILIKE_SQL, {"workspace_id": workspace_id, "pattern": pattern}, args.repeat)
+                indexed = _time(conn, TSVECTOR_SQL, {"workspace_id": workspace_id, "q": q}, args.repeat)
+                print(f"{q:<24}{naive:>12.1f}{indexed:>14.1f}{naive / indexed:>9.1f}x")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                # feedback_items cascade from the workspace
+                conn.execute(text("DELETE FROM workspaces WHERE id = :id"), {"id": workspace_id})
+
+
+if __name__ == "__main__":
+    main()
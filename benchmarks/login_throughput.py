@@ -0,0 +1,97 @@
+"""
+Login throughput before/after moving bcrypt to the dedicated hashing pool.
+
+"before" verifies passwords on the shared threadpool that FastAPI also uses for
+sync endpoints; "after" uses auth.hashing_pool. In both modes a stream of cheap
+"unrelated" sync requests runs on the shared pool and its latency is reported,
+since starvation of those requests is what the change is about.
+
+Concurrency defaults to the hashing pool's cap (PASSWORD_HASH_WORKERS +
+PASSWORD_HASH_MAX_PENDING). Above it "after" sheds the excess with 503, which
+is counted and reported as shed load rather than failing the run.
+
+    python -m benchmarks.login_throughput --logins 400 [--concurrency 200]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from auth.auth import hash_password, verify_and_rehash
+from auth.hashing_pool import PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WORKERS, run_hashing
+
+SHARED_POOL_SIZE = 40  # anyio's default thread limiter used by FastAPI
+HASHING_CAP = PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_PENDING  # beyond this run_hashing answers 503
+
+
+def _unrelated_endpoint():
+    # stands in for a cheap sync endpoint (serialize a small response)
+    return sum(range(1000))
+
+
+async def _probe(shared_pool, stop: asyncio.Event, latencies: list):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = time.perf_counter()
+        await loop.run_in_executor(shared_pool, _unrelated_endpoint)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def _run(mode: str, hashed: str, logins: int, concurrency: int):
+    shared_pool = ThreadPoolExecutor(max_workers=SHARED_POOL_SIZE)
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    probe_latencies: list = []
+    shed = 0
+
+    async def login():
+        nonlocal shed
+        async with semaphore:
+            if mode == "before":
+                await loop.run_in_executor(shared_pool, verify_and_rehash, "correct horse", hashed)
+                return
+            try:
+                await run_hashing(verify_and_rehash, "correct horse", hashed)
+            except HTTPException as e:
+                if e.status_code != 503:
+                    raise
+                shed += 1
+
+    probes = [asyncio.create_task(_probe(shared_pool, stop, probe_latencies)) for _ in range(4)]
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*probes)
+    shared_pool.shutdown()
+
+    probe_latencies.sort()
+    p99 = probe_latencies[int(len(probe_latencies) * 0.99) - 1] if probe_latencies else 0.0
+    print(
+        f"{mode:>6}: {(logins - shed) / elapsed:8.1f} logins/s, {shed} shed (503) | unrelated p50 "
+        f"{statistics.median(probe_latencies or [0]):7.2f} ms, p99 {p99:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=HASHING_CAP)
+    args = parser.parse_args()
+
+    hashed = hash_password("correct horse")
+    print(
+        f"shared pool: {SHARED_POOL_SIZE} threads, hashing pool: {PASSWORD_HASH_WORKERS} threads "
+        f"(sheds above {HASHING_CAP} in flight)"
+    )
+    for mode in ("before", "after"):
+        asyncio.run(_run(mode, hashed, args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
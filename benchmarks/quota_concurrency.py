@@ -0,0 +1,115 @@
+"""
+Quota leases under concurrent workers.
+
+Creates a throwaway plan + workspace, then runs --managers independent
+QuotaManagers (each stands in for a worker process with its own leases and
+DB connections), each with --tasks coroutines consuming random amounts until
+the limit is hit. Checks that grants never exceed the plan limit, that the
+workspace counter equals what was actually used once leases are released,
+and that a counter stamped last month is reset lazily. Run against a scratch
+database; the rows are deleted afterwards unless --keep is given.
+
+    python -m benchmarks.quota_concurrency --limit 5000 --managers 8 --tasks 16
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from database.db import AsyncSessionLocal
+from services.quota import QuotaManager
+
+
+async def _setup(limit: int, ai_limit: int):
+    plan_id, workspace_id = uuid.uuid4(), uuid.uuid4()
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            text(
+                "INSERT INTO subscription_plans (id, name, max_feedback_items, max_integrations, ai_analysis_limit, created_at) "
+                "VALUES (:id, :name, :limit, 1, :ai_limit, now())"
+            ),
+            {"id": plan_id, "name": f"bench-{plan_id.hex[:8]}", "limit": limit, "ai_limit": ai_limit},
+        )
+        await db.execute(
+            text(
+                "INSERT INTO workspaces (id, name, subscription_plan_id, current_feedback_count, "
+                "monthly_ai_analysis_count, last_reset_date, created_at, updated_at) "
+                "VALUES (:id, 'quota benchmark', :plan_id, 0, :ai_limit, :last_month, now(), now())"
+            ),
+            {
+                "id": workspace_id, "plan_id": plan_id, "ai_limit": ai_limit,
+                "last_month": date.today().replace(day=1) - timedelta(days=1),
+            },
+        )
+        await db.commit()
+    return plan_id, workspace_id
+
+
+async def _counter(workspace_id, column: str) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(text(f"SELECT {column} FROM workspaces WHERE id = :id"), {"id": workspace_id})
+
+
+async def _consume(manager: QuotaManager, workspace_id, max_units: int, used: list):
+    while True:
+        units = random.randint(1, max_units)
+        granted = await manager.acquire(workspace_id, "feedback_items", units)
+        if granted < units:
+            # partial grant: use what we got, give the rest back and stop
+            manager.give_back(workspace_id, "feedback_items", granted)
+            return
+        used.append(granted)
+
+
+async def run(limit: int, managers: int, tasks: int, block: int, max_units: int, keep: bool):
+    plan_id, workspace_id = await _setup(limit, ai_limit=limit)
+    pool = [QuotaManager(block=block) for _ in range(managers)]
+    used = []
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _consume(manager, workspace_id, max_units, used) for manager in pool for _ in range(tasks)
+        ))
+        elapsed = time.perf_counter() - start
+        leased = await _counter(workspace_id, "current_feedback_count")
+        released = sum(await asyncio.gather(*(manager.release(expired_only=False) for manager in pool)))
+        final = await _counter(workspace_id, "current_feedback_count")
+
+        total = sum(used)
+        print(f"{len(used)} grants, {total} units in {elapsed:.2f}s ({len(used) / elapsed:.0f} grants/s)")
+        print(f"leased {leased}, released {released}, counter after release {final}")
+        assert leased <= limit, f"leased {leased} units over a limit of {limit}"
+        assert final == total, f"counter {final} != units used {total}"
+
+        # monthly quota stamped last month starts from zero again
+        ai_granted = await pool[0].acquire(workspace_id, "ai_analyses", 10)
+        assert ai_granted == 10, f"monthly reset did not happen (granted {ai_granted})"
+        await pool[0].release(expired_only=False)
+        assert await _counter(workspace_id, "monthly_ai_analysis_count") == 10
+        print("ok")
+    finally:
+        if not keep:
+            async with AsyncSessionLocal() as db:
+                await db.execute(text("DELETE FROM workspaces WHERE id = :id"), {"id": workspace_id})
+                await db.execute(text("DELETE FROM subscription_plans WHERE id = :id"), {"id": plan_id})
+                await db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quota lease correctness under concurrency")
+    parser.add_argument("--limit", type=int, default=5000)
+    parser.add_argument("--managers", type=int, default=8, help="simulated worker processes")
+    parser.add_argument("--tasks", type=int, default=16, help="concurrent consumers per manager")
+    parser.add_argument("--block", type=int, default=100)
+    parser.add_argument("--max-units", type=int, default=5)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.limit, args.managers, args.tasks, args.block, args.max_units, args.keep))
+
+
+if __name__ == "__main__":
+    main()
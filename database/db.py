@@ -1,13 +1,40 @@
 from dotenv import load_dotenv
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 import os
+import uuid
 load_dotenv()
 from sqlalchemy.ext.declarative import declarative_base
 
+from database.pool_stats import TimedAsyncAdaptedQueuePool, TimedQueuePool, attach_pool_stats
+
 Base = declarative_base()
 DATABASE_URL=os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
+
+# ---------------------------------------------------------------------
+# Pool settings (shared by the sync and async engines)
+# ---------------------------------------------------------------------
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds; keep below PgBouncer/LB idle timeouts
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# "transaction" when connecting through PgBouncer in transaction pooling mode
+DB_PGBOUNCER_MODE = os.getenv("DB_PGBOUNCER_MODE", "").lower()
+
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=TimedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_logging_name="sync",
+)
+attach_pool_stats(engine, "sync")
 
 SessionLocal=sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -17,4 +44,55 @@ def get_db():
         yield db
 
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# ---------------------------------------------------------------------
+# Async engine (asyncpg) for async routes and workers
+# ---------------------------------------------------------------------
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", DB_POOL_SIZE))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", DB_MAX_OVERFLOW))
+DB_ASYNC_POOL_TIMEOUT = float(os.getenv("DB_ASYNC_POOL_TIMEOUT", DB_POOL_TIMEOUT))
+
+
+def _async_database_url(url: str):
+    """
+    Derive the asyncpg URL from DATABASE_URL. asyncpg does not understand the
+    libpq `sslmode` query param, so it is translated into connect_args.
+    """
+    url = make_url(url.replace("postgres://", "postgresql://", 1))
+    connect_args = {}
+    sslmode = url.query.get("sslmode")
+    if sslmode:
+        url = url.difference_update_query(["sslmode"])
+        if sslmode != "disable":
+            connect_args["ssl"] = "require"
+    if DB_PGBOUNCER_MODE == "transaction":
+        # server-side prepared statements do not survive PgBouncer handing the
+        # backend to another client between transactions
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    return url.set(drivername="postgresql+asyncpg"), connect_args
+
+
+ASYNC_DATABASE_URL, _async_connect_args = _async_database_url(os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_ASYNC_POOL_SIZE,
+    max_overflow=DB_ASYNC_MAX_OVERFLOW,
+    pool_timeout=DB_ASYNC_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_logging_name="async",
+    connect_args=_async_connect_args,
+)
+attach_pool_stats(async_engine.sync_engine, "async")
+
+# expire_on_commit=False: attribute access after commit must not trigger implicit IO
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -2,10 +2,10 @@
 import uuid
 from datetime import datetime, date
 from sqlalchemy import (
-    Column, String, Integer, Boolean, Text, DateTime, Date,
-    ForeignKey, DECIMAL, UniqueConstraint, Index, func
+    Column, String, Integer, BigInteger, Boolean, Text, DateTime, Date,
+    ForeignKey, DECIMAL, UniqueConstraint, Index, func, text, Computed, DDL, event
 )
-from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB, TSVECTOR
 from sqlalchemy.orm import relationship, declarative_base
 
 from database.db import Base
@@ -47,6 +47,8 @@ class Workspace(Base):
     current_feedback_count = Column(Integer, default=0)
     monthly_ai_analysis_count = Column(Integer, default=0)
     last_reset_date = Column(Date, default=date.today)
+    # bumped whenever processed feedback or insight snapshots change; part of agent answer cache keys
+    data_version = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     settings = Column(JSONB, default=dict)  # workspace-specific settings
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -124,7 +126,7 @@ class Integration(Base):
     workspace_id = Column(UUID(as_uuid=True), ForeignKey("workspaces.id", ondelete="CASCADE"))
     type = Column(String(50), nullable=False)  # csv, zendesk, intercom, slack, etc.
     name = Column(String(255), nullable=True)
-    config = Column(JSONB, nullable=False, default=dict)  # e.g., oauth tokens, settings (encrypt in app)
+    config = Column(JSONB, nullable=False, default=dict)  # e.g., oauth tokens, settings, sync_state watermark (encrypt in app)
     webhook_url = Column(String(500), nullable=True)
     last_sync_at = Column(DateTime, nullable=True)
     sync_status = Column(String(50), default="pending")  # pending, syncing, completed, error
@@ -142,6 +144,7 @@ class Integration(Base):
 # ---------------------------------------------------------------------
 # Unified Feedback Items table: the magic hub
 # - Stores raw content and AI enrichment columns
+# - Partitioned by month on created_at (services/partitions.py); keys include it
 # ---------------------------------------------------------------------
 class FeedbackItem(Base):
     __tablename__ = "feedback_items"
@@ -159,6 +162,7 @@ class FeedbackItem(Base):
     customer_name = Column(String(255), nullable=True)
     raw_content = Column(Text, nullable=False)
     cleaned_content = Column(Text, nullable=True)  # optional cleaned text
+    content_hash = Column(String(64), nullable=True)  # sha256 of provider-owned fields, skips no-op re-syncs
 
     # source metadata from provider
     source_metadata = Column(JSONB, default=dict)  # status, priority, tags, assignee...
@@ -175,26 +179,69 @@ class FeedbackItem(Base):
 
     # processing status
     is_processed = Column(Boolean, default=False)
-    processing_error = Column(Text, nullable=True)
+    processing_error = Column(Text, nullable=True)  # set once AI_MAX_ATTEMPTS enrichment attempts failed
+    processing_attempts = Column(Integer, default=0)  # failed enrichment attempts so far
     reviewed_by_user = Column(Boolean, default=False)
     user_category_override = Column(String(100), nullable=True)
 
     processed_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    embedded_at = Column(DateTime, nullable=True)  # vector stored in the workspace's Qdrant collection
+    # partition key; the provider's own timestamp, so re-syncs hit the same row
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
 
+    # full-text search: summary + keywords weighted above the body; maintained by Postgres
+    search_vector = Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(ai_summary, '')), 'A') || "
+            "setweight(to_tsvector('english', feedback_keywords_text(keywords)), 'A') || "
+            "setweight(to_tsvector('english', left(coalesce(cleaned_content, raw_content, ''), 200000)), 'B')",
+            persisted=True,
+        ),
+    )
+
     workspace = relationship("Workspace", back_populates="feedback_items")
     integration = relationship("Integration", back_populates="feedback_items")
 
+    # ids are unique on their own: the ORM keeps addressing rows by id alone
+    __mapper_args__ = {"primary_key": [id]}
+
     __table_args__ = (
-        UniqueConstraint("workspace_id", "external_id", "source_type", name="uq_feedback_unique"),
-        Index("idx_feedback_workspace_created", "workspace_id", "created_at"),
-        Index("idx_feedback_sentiment", "workspace_id", "sentiment"),
-        Index("idx_feedback_category", "workspace_id", "primary_category"),
-        Index("idx_feedback_processed", "workspace_id", "is_processed"),
+        UniqueConstraint("workspace_id", "external_id", "source_type", "created_at", name="uq_feedback_unique"),
+        # trailing (created_at, id) lets every filtered listing walk the index in
+        # keyset order instead of sorting
+        Index("idx_feedback_workspace_created", "workspace_id", "created_at", "id"),
+        Index("idx_feedback_sentiment", "workspace_id", "sentiment", "created_at", "id"),
+        Index("idx_feedback_category", "workspace_id", "primary_category", "created_at", "id"),
+        Index("idx_feedback_processed", "workspace_id", "is_processed", "created_at", "id"),
+        Index("idx_feedback_source", "workspace_id", "source_type", "created_at", "id"),
+        Index("idx_feedback_processed_at", "workspace_id", "processed_at"),
+        # incremental rollups: rows written since the last run, whatever their created_at
+        Index("idx_feedback_updated", "workspace_id", "updated_at"),
+        Index("idx_feedback_search", "search_vector", postgresql_using="gin"),
+        # small partial index: only rows still waiting for an embedding
+        Index("idx_feedback_embed_pending", "created_at", postgresql_where=text("embedded_at IS NULL")),
+        # same for rows still waiting for enrichment (the worker's enqueue poll)
+        Index(
+            "idx_feedback_enrich_pending", "created_at",
+            postgresql_where=text("is_processed = false AND processing_error IS NULL"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
 
+# array_to_string is only STABLE, so generated columns need an IMMUTABLE wrapper
+event.listen(
+    FeedbackItem.__table__,
+    "before_create",
+    DDL(
+        "CREATE OR REPLACE FUNCTION feedback_keywords_text(text[]) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT coalesce(array_to_string($1, ' '), '') $$"
+    ),
+)
+
+
 # ---------------------------------------------------------------------
 # AI analysis job record (for background tasks - no Celery required)
 # - Create a job entry when new feedback needs processing
@@ -204,7 +251,8 @@ class AIAnalysisJob(Base):
     __tablename__ = "ai_analysis_jobs"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     workspace_id = Column(UUID(as_uuid=True), ForeignKey("workspaces.id", ondelete="CASCADE"))
-    feedback_item_id = Column(UUID(as_uuid=True), ForeignKey("feedback_items.id", ondelete="CASCADE"))
+    # no FK: feedback_items.id is not unique without its partition key; retention deletes jobs with their items
+    feedback_item_id = Column(UUID(as_uuid=True), index=True)
     job_type = Column(String(50), nullable=False)  # sentiment, categorization, summary
     status = Column(String(50), default="pending")  # pending, processing, completed, failed
     input_data = Column(JSONB, nullable=True)
@@ -214,6 +262,29 @@ class AIAnalysisJob(Base):
     completed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # at most one open job per item, however many workers enqueue at once
+        Index(
+            "uq_ai_job_open", "feedback_item_id", unique=True,
+            postgresql_where=text("status IN ('pending', 'processing')"),
+        ),
+    )
+
+
+# ---------------------------------------------------------------------
+# AI analysis cache: results keyed on normalized content + model + prompt version
+# - Identical feedback text is analysed once, across workspaces
+# ---------------------------------------------------------------------
+class AIAnalysisCache(Base):
+    __tablename__ = "ai_analysis_cache"
+    cache_key = Column(String(64), primary_key=True)  # sha256(model | prompt_version | normalized text)
+    model_name = Column(String(100), nullable=False)
+    prompt_version = Column(String(50), nullable=False)
+    result = Column(JSONB, nullable=False)  # sentiment, categories, keywords, ai_summary, ...
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_hit_at = Column(DateTime, nullable=True)
+
 
 # ---------------------------------------------------------------------
 # Usage tracking (daily) - used for billing and limit enforcement
@@ -280,6 +351,7 @@ class InsightsSnapshot(Base):
 
 # ---------------------------------------------------------------------
 # Webhook events (raw payload buffer for retries & debugging)
+# - Partitioned by day on received_at; old days are dropped whole
 # ---------------------------------------------------------------------
 class WebhookEvent(Base):
     __tablename__ = "webhook_events"
@@ -292,11 +364,31 @@ class WebhookEvent(Base):
     processed = Column(Boolean, default=False)
     processing_error = Column(Text, nullable=True)
     retry_count = Column(Integer, default=0)
-    received_at = Column(DateTime, default=datetime.utcnow)
+    next_attempt_at = Column(DateTime, nullable=True)  # backoff / claim lease; NULL = due now
+    received_at = Column(DateTime, primary_key=True, default=datetime.utcnow)  # partition key
     processed_at = Column(DateTime, nullable=True)
 
     integration = relationship("Integration", back_populates="webhook_events")
 
+    __mapper_args__ = {"primary_key": [id]}
+
+    __table_args__ = (
+        # drain queue: only unprocessed rows are indexed
+        Index("idx_webhook_pending", "received_at", postgresql_where=text("processed = false")),
+        Index("idx_webhook_dedupe", "integration_id", "webhook_id"),
+        {"postgresql_partition_by": "RANGE (received_at)"},
+    )
+
+
+# rows outside every dated partition (historic imports, clock skew) land in a
+# DEFAULT partition until partition maintenance moves them into their own
+for _partitioned in (FeedbackItem.__table__, WebhookEvent.__table__):
+    event.listen(
+        _partitioned,
+        "after_create",
+        DDL(f"CREATE TABLE IF NOT EXISTS {_partitioned.name}_default PARTITION OF {_partitioned.name} DEFAULT"),
+    )
+
 
 # ---------------------------------------------------------------------
 # Agent runs (storing output from pydantic_ai / langchain / langgraph)
@@ -310,6 +402,7 @@ class AgentRun(Base):
     status = Column(String(50), default="pending")  # pending | success | failed
     message = Column(Text, nullable=True)  # optional human-readable explanation
     data = Column(JSONB, nullable=True)  # serialized AgentResponse / AnalyticsInsight / LLMAnswer
+    cache_key = Column(String(64), nullable=True)  # question + workspace data_version; see agents/answer_cache.py
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -320,5 +413,9 @@ class AgentRun(Base):
     __table_args__ = (
         Index("idx_agentrun_workspace_request", "workspace_id", "request_id"),
         Index("idx_agentrun_status", "status"),
+        Index(
+            "idx_agentrun_cache", "workspace_id", "cache_key",
+            postgresql_where=text("status = 'success' AND cache_key IS NOT NULL"),
+        ),
     )
 
@@ -0,0 +1,119 @@
+# pool_stats.py
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """Counters fed by pool events; read by /internal/db-pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.waits = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def record_wait(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            if timed_out:
+                self.timeouts += 1
+
+    def on_connect(self, *args):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, *args):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def on_checkin(self, *args):
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def on_invalidate(self, *args):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "avg_wait_ms": round(self.total_wait_ms / self.waits, 3) if self.waits else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+            }
+
+
+# keyed by the pool's logging name ("sync" / "async"), which survives engine.dispose()
+POOL_STATS: Dict[str, PoolStats] = {}
+
+
+def _stats_for(pool) -> PoolStats:
+    return POOL_STATS.setdefault(getattr(pool, "logging_name", None) or "default", PoolStats())
+
+
+class _TimedPoolMixin:
+    # _do_get is where a caller blocks for a free connection; time it
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            _stats_for(self).record_wait((time.perf_counter() - start) * 1000, timed_out)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def attach_pool_stats(engine, name: str) -> PoolStats:
+    stats = POOL_STATS.setdefault(name, PoolStats())
+    event.listen(engine, "connect", stats.on_connect)
+    event.listen(engine, "checkout", stats.on_checkout)
+    event.listen(engine, "checkin", stats.on_checkin)
+    event.listen(engine, "invalidate", stats.on_invalidate)
+    return stats
+
+
+def pool_status(engine, name: str) -> dict:
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            timeout=pool.timeout(),
+        )
+    status["events"] = POOL_STATS.get(name, PoolStats()).snapshot()
+    return status
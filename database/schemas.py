@@ -130,6 +130,16 @@ class IntegrationCreate(BaseModel):
     name: Optional[str] = None
     config: Optional[dict] = None
 
+class WebhookSecretIn(BaseModel):
+    secret: str = Field(..., min_length=1, description="signing secret shown on the provider's webhook")
+
+class FeedbackImportOut(ResponseBase):
+    integration_id: UUID
+    sync_status: str
+    total_items_synced: int
+    # bytes_read, rows_read, rows_written, rows_invalid, rows_per_minute, errors (sample)
+    progress: dict
+
 class IntegrationOut(ResponseBase):
     id: UUID
     workspace_id: UUID
@@ -181,6 +191,23 @@ class FeedbackOut(ResponseBase):
         "from_attributes": True
     }
 
+class FeedbackListOut(ResponseBase):
+    # items carry only the projected fields (see services.feedback_query)
+    items: List[dict]
+    next_cursor: Optional[str] = None
+    limit: int
+
+class FeedbackSearchOut(ResponseBase):
+    # items are ordered by rank; `highlight` wraps matches in <mark>
+    items: List[dict]
+    next_cursor: Optional[str] = None
+    limit: int
+
+class SimilarFeedbackOut(ResponseBase):
+    # items are ordered by cosine similarity (`score`)
+    feedback_id: UUID
+    items: List[dict]
+
 # ---------------------
 # AI Analysis Job
 # ---------------------
@@ -255,6 +282,9 @@ class InsightsSnapshotOut(ResponseBase):
     top_issues: Optional[list]
     trend_analysis: Optional[str]
     recommendations: Optional[List[str]]
+    sentiment_change: Optional[float] = None
+    volume_change: Optional[float] = None
+    generation_time_ms: Optional[int] = None
     generated_at: datetime
 
     model_config = {
@@ -283,3 +313,22 @@ class WebhookEventOut(ResponseBase):
     model_config = {
         "from_attributes": True
     }
+
+# ---------------------
+# Analyst agent
+# ---------------------
+class AgentAskIn(BaseModel):
+    question: str = Field(min_length=1, max_length=1000)
+    request_id: Optional[str] = None
+    days: int = Field(30, ge=1, le=365)
+
+class AgentRunOut(ResponseBase):
+    id: UUID
+    workspace_id: UUID
+    request_id: str
+    agent_name: str
+    run_status: str
+    run_message: Optional[str]
+    data: Optional[dict]
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
@@ -1,10 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from database.db import Base, engine
 from database.models import *
-from routes import intercom_routes, slack_routes, zendesk_routes,auth_routes
+from routes import intercom_routes, slack_routes, zendesk_routes,auth_routes, internal_routes, workspace_routes, import_routes, webhook_routes, agent_routes, live_routes
+from services.http_client import close_http_clients
+from services.vector_index import close_vector_client
+from services.usage_meter import UsageMeteringMiddleware, usage_meter
+from services.quota import quota_manager
+from services.scheduler import SCHEDULER_ENABLED, scheduler
+from agents.run_recorder import recorder
+from services.live_events import hub
+from auth.hashing_pool import shutdown_hashing_pool
 
-app= FastAPI(title='INSIGHTOPS API')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SCHEDULER_ENABLED:
+        # periodic jobs, usage flushing included
+        scheduler.start()
+    else:
+        usage_meter.start()
+    yield
+    await scheduler.stop()
+    # end open event streams and the LISTEN connection
+    await hub.stop()
+    # write counted usage before the process exits
+    await usage_meter.stop()
+    # persist agent runs still waiting for the write-behind flush
+    await recorder.stop()
+    # hand unused quota leases back to their workspaces
+    await quota_manager.release(expired_only=False)
+    # drain pooled provider connections
+    await close_http_clients()
+    await close_vector_client()
+    shutdown_hashing_pool()
+
+
+app= FastAPI(title='INSIGHTOPS API', lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -13,6 +46,7 @@ app.add_middleware(
     allow_headers=["*"],
 
 )
+app.add_middleware(UsageMeteringMiddleware)
 try:
     Base.metadata.create_all(engine)
     print("✅ Tables created")
@@ -24,6 +58,12 @@ app.include_router(intercom_routes.router)
 app.include_router(slack_routes.router)
 app.include_router(zendesk_routes.router)
 app.include_router(auth_routes.router)
+app.include_router(internal_routes.router)
+app.include_router(workspace_routes.router)
+app.include_router(import_routes.router)
+app.include_router(webhook_routes.router)
+app.include_router(agent_routes.router)
+app.include_router(live_routes.router)
 
 @app.get("/")
 def root():
@@ -0,0 +1,75 @@
+"""Bring the original tables up to the model schema
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-17
+
+Adds the columns, function and table the models gained before partitioning:
+content hash, enrichment attempts, embedding and full-text search columns on
+feedback_items, webhook retry backoff, agent answer cache keys, the workspace
+data_version and the shared AI analysis cache. 0001 copies feedback_items and
+webhook_events through LIKE, so they must exist first. Every step is a no-op
+on a database that already has them (a fresh create_all).
+
+Adding the generated search_vector rewrites feedback_items.
+"""
+from alembic import op
+
+revision = "0000"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(ai_summary, '')), 'A') || "
+    "setweight(to_tsvector('english', feedback_keywords_text(keywords)), 'A') || "
+    "setweight(to_tsvector('english', left(coalesce(cleaned_content, raw_content, ''), 200000)), 'B')"
+)
+
+
+def upgrade():
+    op.execute("ALTER TABLE workspaces ADD COLUMN IF NOT EXISTS data_version bigint NOT NULL DEFAULT 0")
+
+    # array_to_string is only STABLE, so the generated column needs an IMMUTABLE wrapper
+    op.execute(
+        "CREATE OR REPLACE FUNCTION feedback_keywords_text(text[]) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT coalesce(array_to_string($1, ' '), '') $$"
+    )
+    op.execute("ALTER TABLE feedback_items ADD COLUMN IF NOT EXISTS content_hash varchar(64)")
+    op.execute("ALTER TABLE feedback_items ADD COLUMN IF NOT EXISTS processing_attempts integer DEFAULT 0")
+    op.execute("ALTER TABLE feedback_items ADD COLUMN IF NOT EXISTS embedded_at timestamp")
+    op.execute(
+        "ALTER TABLE feedback_items ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED"
+    )
+
+    op.execute("ALTER TABLE webhook_events ADD COLUMN IF NOT EXISTS next_attempt_at timestamp")
+
+    op.execute("ALTER TABLE agent_runs ADD COLUMN IF NOT EXISTS cache_key varchar(64)")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_agentrun_cache ON agent_runs (workspace_id, cache_key) "
+        "WHERE status = 'success' AND cache_key IS NOT NULL"
+    )
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS ai_analysis_cache (
+            cache_key varchar(64) PRIMARY KEY,
+            model_name varchar(100) NOT NULL,
+            prompt_version varchar(50) NOT NULL,
+            result jsonb NOT NULL,
+            hit_count integer DEFAULT 0,
+            created_at timestamp,
+            last_hit_at timestamp
+        )
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS ai_analysis_cache")
+    op.execute("DROP INDEX IF EXISTS idx_agentrun_cache")
+    op.execute("ALTER TABLE agent_runs DROP COLUMN IF EXISTS cache_key")
+    op.execute("ALTER TABLE webhook_events DROP COLUMN IF EXISTS next_attempt_at")
+    for column in ("search_vector", "embedded_at", "processing_attempts", "content_hash"):
+        op.execute(f"ALTER TABLE feedback_items DROP COLUMN IF EXISTS {column}")
+    op.execute("DROP FUNCTION IF EXISTS feedback_keywords_text(text[])")
+    op.execute("ALTER TABLE workspaces DROP COLUMN IF EXISTS data_version")
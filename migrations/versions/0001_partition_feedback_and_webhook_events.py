@@ -0,0 +1,214 @@
+"""Partition feedback_items by month and webhook_events by day
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-17
+
+Rebuilds both tables as range-partitioned parents; Postgres cannot convert a
+table in place. The primary key and uq_feedback_unique gain the partition key,
+as every unique constraint on a partitioned table must include it. The
+ai_analysis_jobs -> feedback_items FK is dropped (feedback_items.id alone is
+no longer unique), and an index on ai_analysis_jobs.feedback_item_id is added.
+
+Copying feedback_items rewrites the whole table: run it in a maintenance
+window. Of webhook_events only the retention window and events still waiting
+for a retry are kept. Databases already created with partitioned tables (a
+fresh create_all) are left as they are.
+"""
+import os
+from datetime import date, datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = "0000"
+branch_labels = None
+depends_on = None
+
+WEBHOOK_RETENTION_DAYS = int(os.getenv("WEBHOOK_RETENTION_DAYS", 7))
+
+FEEDBACK_INDEXES = (
+    ("idx_feedback_workspace_created", "(workspace_id, created_at, id)"),
+    ("idx_feedback_sentiment", "(workspace_id, sentiment, created_at, id)"),
+    ("idx_feedback_category", "(workspace_id, primary_category, created_at, id)"),
+    ("idx_feedback_processed", "(workspace_id, is_processed, created_at, id)"),
+    ("idx_feedback_source", "(workspace_id, source_type, created_at, id)"),
+    ("idx_feedback_processed_at", "(workspace_id, processed_at)"),
+    ("idx_feedback_search", "USING gin (search_vector)"),
+    ("idx_feedback_embed_pending", "(created_at) WHERE embedded_at IS NULL"),
+)
+FEEDBACK_FKS = (
+    "FOREIGN KEY (workspace_id) REFERENCES workspaces (id) ON DELETE CASCADE",
+    "FOREIGN KEY (integration_id) REFERENCES integrations (id) ON DELETE SET NULL",
+)
+WEBHOOK_INDEXES = (
+    ("idx_webhook_pending", "(received_at) WHERE processed = false"),
+    ("idx_webhook_dedupe", "(integration_id, webhook_id)"),
+)
+WEBHOOK_FKS = (
+    "FOREIGN KEY (workspace_id) REFERENCES workspaces (id) ON DELETE CASCADE",
+    "FOREIGN KEY (integration_id) REFERENCES integrations (id) ON DELETE CASCADE",
+)
+JOB_FK = "ai_analysis_jobs_feedback_item_id_fkey"
+
+
+# ---------------------------
+# Helpers
+# ---------------------------
+def _relkind(table: str):
+    return op.get_bind().scalar(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table})
+
+
+def _insert_columns(table: str) -> list:
+    return list(op.get_bind().scalars(sa.text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :t AND is_generated = 'NEVER' "
+        "ORDER BY ordinal_position"
+    ), {"t": table}))
+
+
+def _set_aside(table: str) -> str:
+    """Rename `table` and its indexes (and so their constraints) out of the way."""
+    old = f"{table}_old"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"""
+        DO $$
+        DECLARE idx record;
+        BEGIN
+            FOR idx IN SELECT indexname FROM pg_indexes
+                       WHERE schemaname = current_schema() AND tablename = '{old}'
+            LOOP
+                EXECUTE format('ALTER INDEX %I RENAME TO %I', idx.indexname, left(idx.indexname, 59) || '_old');
+            END LOOP;
+        END $$
+    """)
+    return old
+
+
+def _drop_references(table: str):
+    """Drop every FK pointing at `table` (so it can be dropped)."""
+    op.execute(f"""
+        DO $$
+        DECLARE fk record;
+        BEGIN
+            FOR fk IN SELECT conrelid::regclass AS tbl, conname FROM pg_constraint
+                      WHERE contype = 'f' AND confrelid = '{table}'::regclass
+            LOOP
+                EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', fk.tbl, fk.conname);
+            END LOOP;
+        END $$
+    """)
+
+
+def _build(table: str, like: str, partition_key, primary_key: str, uniques, fks, indexes):
+    partition_by = f" PARTITION BY RANGE ({partition_key})" if partition_key else ""
+    op.execute(f"CREATE TABLE {table} (LIKE {like} INCLUDING DEFAULTS INCLUDING GENERATED){partition_by}")
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({primary_key})")
+    for name, columns in uniques:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({columns})")
+    for fk in fks:
+        op.execute(f"ALTER TABLE {table} ADD {fk}")
+    for name, definition in indexes:
+        op.execute(f"CREATE INDEX {name} ON {table} {definition}")
+
+
+def _next(start: date, unit: str) -> date:
+    if unit == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def _add_partitions(table: str, unit: str, first: date, ahead: int):
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    today = datetime.utcnow().date()
+    last = date(today.year, today.month, 1) if unit == "month" else today
+    for _ in range(ahead):
+        last = _next(last, unit)
+    start = first
+    while start <= last:
+        end = _next(start, unit)
+        suffix = f"{start:%Y_%m}" if unit == "month" else f"{start:%Y_%m_%d}"
+        op.execute(f"CREATE TABLE {table}_p{suffix} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')")
+        start = end
+
+
+def _copy(table: str, old: str, key: str, key_fallback: str, where: str = "TRUE"):
+    columns = _insert_columns(old)
+    select = ", ".join(f"coalesce({key}, {key_fallback})" if c == key else c for c in columns)
+    op.execute(f"INSERT INTO {table} ({', '.join(columns)}) SELECT {select} FROM {old} WHERE {where}")
+
+
+# ---------------------------
+# Upgrade
+# ---------------------------
+def _partition_feedback():
+    old = _set_aside("feedback_items")
+    _drop_references(old)
+    _build(
+        "feedback_items", old, "created_at", "id, created_at",
+        [("uq_feedback_unique", "workspace_id, external_id, source_type, created_at")],
+        FEEDBACK_FKS, FEEDBACK_INDEXES,
+    )
+    first = op.get_bind().scalar(sa.text(f"SELECT min(created_at) FROM {old}")) or datetime.utcnow()
+    _add_partitions("feedback_items", "month", date(first.year, first.month, 1), ahead=3)
+    _copy("feedback_items", old, "created_at", "coalesce(updated_at, now())")
+    op.execute(f"DROP TABLE {old}")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_ai_analysis_jobs_feedback_item_id ON ai_analysis_jobs (feedback_item_id)")
+
+
+def _partition_webhook_events():
+    old = _set_aside("webhook_events")
+    _build("webhook_events", old, "received_at", "id, received_at", [], WEBHOOK_FKS, WEBHOOK_INDEXES)
+    first = datetime.utcnow().date() - timedelta(days=WEBHOOK_RETENTION_DAYS)
+    _add_partitions("webhook_events", "day", first, ahead=7)
+    # older unprocessed events land in webhook_events_default until they are retried or expire
+    _copy(
+        "webhook_events", old, "received_at", "now()",
+        where=f"received_at >= '{first}' OR received_at IS NULL OR processed = false",
+    )
+    op.execute(f"DROP TABLE {old}")
+
+
+def upgrade():
+    if _relkind("feedback_items") == "r":
+        _partition_feedback()
+    if _relkind("webhook_events") == "r":
+        _partition_webhook_events()
+
+
+# ---------------------------
+# Downgrade: back to plain tables
+# ---------------------------
+def downgrade():
+    if _relkind("webhook_events") == "p":
+        old = _set_aside("webhook_events")
+        _build("webhook_events", old, None, "id", [], WEBHOOK_FKS, WEBHOOK_INDEXES)
+        _copy("webhook_events", old, "received_at", "now()")
+        op.execute(f"DROP TABLE {old}")
+
+    if _relkind("feedback_items") == "p":
+        old = _set_aside("feedback_items")
+        _build(
+            "feedback_items", old, None, "id",
+            [("uq_feedback_unique", "workspace_id, external_id, source_type")],
+            FEEDBACK_FKS, FEEDBACK_INDEXES,
+        )
+        # the wider partitioned key may have admitted rows that collide on the old one: keep the newest
+        columns = ", ".join(_insert_columns(old))
+        op.execute(f"INSERT INTO feedback_items ({columns}) SELECT {columns} FROM {old} WHERE external_id IS NULL")
+        op.execute(
+            f"INSERT INTO feedback_items ({columns}) "
+            f"SELECT DISTINCT ON (workspace_id, external_id, source_type) {columns} FROM {old} "
+            f"WHERE external_id IS NOT NULL ORDER BY workspace_id, external_id, source_type, created_at DESC"
+        )
+        op.execute(f"DROP TABLE {old}")
+        op.execute("DROP INDEX IF EXISTS ix_ai_analysis_jobs_feedback_item_id")
+        op.execute(
+            "DELETE FROM ai_analysis_jobs j WHERE j.feedback_item_id IS NOT NULL "
+            "AND NOT EXISTS (SELECT 1 FROM feedback_items f WHERE f.id = j.feedback_item_id)"
+        )
+        op.execute(
+            f"ALTER TABLE ai_analysis_jobs ADD CONSTRAINT {JOB_FK} "
+            "FOREIGN KEY (feedback_item_id) REFERENCES feedback_items (id) ON DELETE CASCADE"
+        )
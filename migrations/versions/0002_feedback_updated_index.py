@@ -0,0 +1,20 @@
+"""Index feedback_items (workspace_id, updated_at) for incremental rollups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE INDEX IF NOT EXISTS idx_feedback_updated ON feedback_items (workspace_id, updated_at)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_feedback_updated")
@@ -0,0 +1,39 @@
+"""Enrichment queue: partial pending index, one open job per item
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+Duplicate open jobs left by concurrent enqueues are failed (the oldest one per
+item stays open) before uq_ai_job_open is built.
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_feedback_enrich_pending ON feedback_items (created_at) "
+        "WHERE is_processed = false AND processing_error IS NULL"
+    )
+    op.execute("""
+        UPDATE ai_analysis_jobs j SET status = 'failed', error_message = 'duplicate job', completed_at = now()
+        WHERE j.status IN ('pending', 'processing') AND EXISTS (
+            SELECT 1 FROM ai_analysis_jobs o
+            WHERE o.feedback_item_id = j.feedback_item_id AND o.status IN ('pending', 'processing')
+              AND (o.created_at, o.id) < (j.created_at, j.id)
+        )
+    """)
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_ai_job_open ON ai_analysis_jobs (feedback_item_id) "
+        "WHERE status IN ('pending', 'processing')"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS uq_ai_job_open")
+    op.execute("DROP INDEX IF EXISTS idx_feedback_enrich_pending")
@@ -0,0 +1,77 @@
+# agent_routes.py
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from agents.analyst import get_answer_model, run_agent
+from auth.validate_users import get_current_user_async, get_user_workspace
+from database.db import get_async_db
+from database.models import AgentRun
+from database.schemas import AgentAskIn, AgentRunOut
+
+router = APIRouter(prefix="/workspaces", tags=["Agent"])
+
+_answer_model = None
+
+
+def _model():
+    # built on first use: the Gemini client needs credentials the API may not have at import time
+    global _answer_model
+    if _answer_model is None:
+        _answer_model = get_answer_model()
+    return _answer_model
+
+
+# ---------------------------
+# Ask: Server-Sent Events (run, tool..., token..., done | error)
+# ---------------------------
+@router.post("/{workspace_id}/agent/ask")
+async def ask_agent(
+    workspace_id: str,
+    body: AgentAskIn,
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+
+    async def events():
+        async for event in run_agent(workspace.id, body.question, _model(), body.request_id, body.days):
+            yield event.sse()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # no proxy buffering, or the first tokens sit in nginx until the answer is done
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{workspace_id}/agent/runs/{run_id}", response_model=AgentRunOut)
+async def get_agent_run(
+    workspace_id: str,
+    run_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    run = (await db.execute(
+        select(AgentRun).where(AgentRun.id == run_id, AgentRun.workspace_id == workspace.id)
+    )).scalars().first()
+    if run is None:
+        raise HTTPException(status_code=404, detail="Agent run not found")
+
+    return AgentRunOut(
+        status_code=200,
+        message="Agent run fetched successfully",
+        id=run.id,
+        workspace_id=run.workspace_id,
+        request_id=run.request_id,
+        agent_name=run.agent_name,
+        run_status=run.status,
+        run_message=run.message,
+        data=run.data,
+        started_at=run.started_at,
+        completed_at=run.completed_at,
+    )
@@ -1,63 +1,121 @@
 from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database.db import get_db
+from sqlalchemy import DateTime, String, insert, literal, select, true
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.db import get_async_db
 from database.models import User, Workspace, Membership
-from auth.auth import hash_password, create_access_token, verify_password
+from auth.auth import hash_password_async, create_access_token, verify_and_rehash_async
+from auth.principal_cache import Principal
 from auth.validate_users import get_current_user
 
 from database.schemas import UserCreate, UserOut
 from datetime import datetime, timedelta
-from database import schemas, models
+from database import schemas
 import os
+import uuid
 load_dotenv()
 router = APIRouter(prefix="/auth", tags=["Auth"])
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 @router.post("/signup", response_model=UserOut)
-def signup(user_in: UserCreate, db: Session = Depends(get_db)):
-    # Check if user exists
-    if db.query(User).filter(User.email == user_in.email).first():
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+async def signup(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    # bcrypt runs on the dedicated hashing pool
+    hashed_password = await hash_password_async(user_in.password)
+    now = datetime.utcnow()
 
-    # Create user
-    user = User(
-        email=user_in.email,
-        hashed_password=hash_password(user_in.password),
-        full_name=user_in.full_name
+    # User, default workspace and owner membership go in as one statement
+    # (data-modifying CTEs + RETURNING): one round-trip, one transaction, no
+    # orphan rows. Duplicate emails are caught by the unique constraint.
+    new_user = (
+        insert(User)
+        .values(
+            id=uuid.uuid4(),
+            email=user_in.email,
+            hashed_password=hashed_password,
+            full_name=user_in.full_name,
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        .returning(User.id, User.created_at, User.is_active)
+        .cte("new_user")
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-
-    # Create default workspace
-    workspace = Workspace(name=f"{user_in.full_name or user_in.email}'s Workspace")
-    db.add(workspace)
-    db.commit()
-    db.refresh(workspace)
+    new_workspace = (
+        insert(Workspace)
+        .values(
+            id=uuid.uuid4(),
+            name=f"{user_in.full_name or user_in.email}'s Workspace",
+            subscription_status="free",
+            current_feedback_count=0,
+            monthly_ai_analysis_count=0,
+            last_reset_date=now.date(),
+            settings={},
+            created_at=now,
+            updated_at=now,
+        )
+        .returning(Workspace.id)
+        .cte("new_workspace")
+    )
+    new_membership = (
+        insert(Membership)
+        .from_select(
+            ["id", "user_id", "workspace_id", "role", "created_at"],
+            select(
+                literal(uuid.uuid4(), PG_UUID(as_uuid=True)),
+                new_user.c.id,
+                new_workspace.c.id,
+                literal("owner", String),
+                literal(now, DateTime),
+            ),
+        )
+        .returning(Membership.user_id, Membership.workspace_id, Membership.role)
+        .cte("new_membership")
+    )
+    stmt = select(
+        new_membership.c.user_id,
+        new_membership.c.workspace_id,
+        new_membership.c.role,
+        new_user.c.created_at,
+        new_user.c.is_active,
+    ).select_from(new_user.join(new_membership, true()))
 
-    # Link membership
-    membership = Membership(user_id=user.id, workspace_id=workspace.id, role="owner")
-    db.add(membership)
-    db.commit()
+    try:
+        row = (await db.execute(stmt)).one()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
     return UserOut(
-        id=user.id,
-        email=user.email,
-        full_name=user.full_name,
-        is_active=user.is_active,
-        workspace_id= workspace.id,
-        role=membership.role,
-        created_at=user.created_at,
+        id=row.user_id,
+        email=user_in.email,
+        full_name=user_in.full_name,
+        is_active=row.is_active,
+        workspace_id=row.workspace_id,
+        role=row.role,
+        created_at=row.created_at,
         status_code=201,
         message="Signup successful"
     )
 
 @router.post("/login", response_model=schemas.LoginResponse)
-def login(email: str, password: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+async def login(email: str, password: str, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
+    if not user or not user.hashed_password:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
+    is_valid, new_hash = await verify_and_rehash_async(password, user.hashed_password)
+    if not is_valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+    if new_hash:
+        # stored hash used an outdated BCRYPT_ROUNDS cost; upgrade it transparently
+        user.hashed_password = new_hash
+        user.updated_at = datetime.utcnow()
+        await db.commit()
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": str(user.id)}, expires_delta=access_token_expires
@@ -77,18 +135,14 @@ def login(email: str, password: str, db: Session = Depends(get_db)):
     )
 
 @router.get("/me", response_model=schemas.UserOutMultiple)
-def read_me(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    memberships = db.query(models.Membership).filter(models.Membership.user_id == current_user.id).all()
-
+def read_me(current_user: Principal = Depends(get_current_user)):
+    # memberships come with the cached principal; no extra query
     membership_list = [
         schemas.UserMembership(
             workspace_id=str(m.workspace_id),
             role=m.role
         )
-        for m in memberships
+        for m in current_user.memberships
     ]
 
     return schemas.UserOutMultiple(
@@ -0,0 +1,111 @@
+# import_routes.py
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.validate_users import get_current_user_async, get_user_workspace
+from database.db import get_async_db
+from database.models import Integration
+from database.schemas import FeedbackImportOut
+from services.feedback_import import ImportFailed, run_import
+from services.feedback_ingest import claim_integration_sync
+from services.quota import QuotaExceeded
+
+router = APIRouter(prefix="/workspaces", tags=["Imports"])
+
+CONTENT_TYPES = {"text/csv": "csv", "application/csv": "csv", "application/pdf": "pdf"}
+
+
+def _import_out(integration: Integration, message: str) -> FeedbackImportOut:
+    return FeedbackImportOut(
+        status_code=200,
+        message=message,
+        integration_id=integration.id,
+        sync_status=integration.sync_status,
+        total_items_synced=integration.total_items_synced or 0,
+        progress=(integration.config or {}).get("import", {}),
+    )
+
+
+# ---------------------------
+# Upload: the file is the raw request body (not multipart), so it is parsed
+# and loaded while it streams in instead of being spooled first
+# ---------------------------
+@router.post("/{workspace_id}/imports", response_model=FeedbackImportOut)
+async def import_feedback(
+    workspace_id: str,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|pdf)$", description="defaults from Content-Type"),
+    filename: Optional[str] = None,
+    content_column: Optional[str] = Query(None, description="CSV column holding the feedback text"),
+    integration_id: Optional[uuid.UUID] = Query(None, description="re-import into an existing csv/pdf integration"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type.startswith("multipart/"):
+        raise HTTPException(status_code=415, detail="Send the file as the raw request body, not multipart form data")
+    file_format = format or CONTENT_TYPES.get(content_type)
+    if file_format is None:
+        raise HTTPException(status_code=415, detail="Use Content-Type text/csv or application/pdf, or pass ?format=")
+
+    if integration_id:
+        integration = (await db.execute(
+            select(Integration).where(
+                Integration.id == integration_id,
+                Integration.workspace_id == workspace.id,
+                Integration.type == file_format,
+            )
+        )).scalars().first()
+        if integration is None:
+            raise HTTPException(status_code=404, detail="Import integration not found")
+        if not await claim_integration_sync(db, integration.id):
+            raise HTTPException(status_code=409, detail="An import into this integration is already running")
+    else:
+        integration = Integration(
+            workspace_id=workspace.id,
+            type=file_format,
+            name=filename or f"{file_format.upper()} import",
+            config={},
+        )
+        db.add(integration)
+        await db.commit()
+
+    try:
+        await run_import(db, integration, request.stream(), file_format, filename, content_column)
+    except ImportFailed as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QuotaExceeded:
+        # rows loaded before the limit was hit stay imported; the integration is marked "error".
+        # run_import rolled back on the way out: reload before reading attributes
+        await db.refresh(integration)
+        raise HTTPException(status_code=402, detail={
+            "message": "Feedback limit reached for your plan; the import stopped part way",
+            "integration_id": str(integration.id),
+            "sync_status": integration.sync_status,
+            "total_items_synced": integration.total_items_synced or 0,
+            "progress": (integration.config or {}).get("import", {}),
+        })
+
+    return _import_out(integration, "Import completed successfully")
+
+
+@router.get("/{workspace_id}/imports/{integration_id}", response_model=FeedbackImportOut)
+async def get_import_progress(
+    workspace_id: str,
+    integration_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    integration = (await db.execute(
+        select(Integration).where(Integration.id == integration_id, Integration.workspace_id == workspace.id)
+    )).scalars().first()
+    if integration is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return _import_out(integration, "Import progress fetched successfully")
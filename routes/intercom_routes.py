@@ -1,13 +1,19 @@
 # intercom_routes.py
+import logging
 import os
-import httpx
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
-from database.db import get_db
+from database.db import AsyncSessionLocal, get_async_db, get_db
 from database.models import Integration
-from auth.validate_users import get_current_user, get_user_workspace
+from auth.validate_users import get_current_user, get_current_user_async, get_user_workspace
+from services.http_client import get_http_client
+from services.intercom_sync import fetch_app_id, sync_intercom_integration
+from services.feedback_ingest import release_sync_claim, sync_claim
+from services.quota import check_integration_limit
 
 load_dotenv()
 
@@ -16,6 +22,7 @@ INTERCOM_CLIENT_SECRET = os.getenv("INTERCOM_CLIENT_SECRET")
 INTERCOM_REDIRECT_URI = os.getenv("INTERCOM_REDIRECT_URI")
 
 router = APIRouter(prefix="/intercom", tags=["Intercom"])
+logger = logging.getLogger(__name__)
 
 # ---------------------------
 # Step 1: Redirect user to Intercom OAuth page
@@ -38,8 +45,8 @@ async def intercom_callback(
     code: str = None,
     state: str = None,
     workspace_id: str = None,  # optional query param for multi-workspace users
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
 ):
     if not code:
         raise HTTPException(status_code=400, detail="No code returned from Intercom")
@@ -49,45 +56,97 @@ async def intercom_callback(
 
     # Exchange code for access token
     token_url = "https://api.intercom.io/auth/eagle/token"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            token_url,
-            json={
-                "grant_type": "authorization_code",
-                "client_id": INTERCOM_CLIENT_ID,
-                "client_secret": INTERCOM_CLIENT_SECRET,
-                "redirect_uri": INTERCOM_REDIRECT_URI,
-                "code": code
-            },
-            headers={
-                "Accept": "application/json",
-                "Content-Type": "application/json"
-            }
-        )
-        token_data = resp.json()
+    client = get_http_client("intercom")
+    resp = await client.post(
+        token_url,
+        json={
+            "grant_type": "authorization_code",
+            "client_id": INTERCOM_CLIENT_ID,
+            "client_secret": INTERCOM_CLIENT_SECRET,
+            "redirect_uri": INTERCOM_REDIRECT_URI,
+            "code": code
+        },
+        headers={
+            "Accept": "application/json",
+            "Content-Type": "application/json"
+        }
+    )
+    token_data = resp.json()
 
     access_token = token_data.get("access_token")
     if not access_token:
         raise HTTPException(status_code=400, detail=f"Failed to fetch access token: {token_data}")
 
+    # webhook intake matches events on it (Intercom signs every app's webhooks with one secret)
+    app_id = await fetch_app_id(client, access_token)
+    if not app_id:
+        raise HTTPException(status_code=400, detail="Failed to fetch the Intercom app id")
+
     # Save or update Integration record
-    integration = db.query(Integration).filter_by(
-        workspace_id=workspace.id,
-        type="intercom"
-    ).first()
+    result = await db.execute(
+        select(Integration).filter_by(workspace_id=workspace.id, type="intercom")
+    )
+    integration = result.scalars().first()
 
     if not integration:
+        await check_integration_limit(db, workspace.id)
         integration = Integration(
             workspace_id=workspace.id,
             type="intercom",
             name="Intercom",
-            config={"access_token": access_token}
+            config={"access_token": access_token, "app_id": app_id}
         )
         db.add(integration)
     else:
-        integration.config["access_token"] = access_token
+        # reassign so SQLAlchemy notices the JSONB change
+        integration.config = {**(integration.config or {}), "access_token": access_token, "app_id": app_id}
 
-    db.commit()
-    db.refresh(integration)
+    await db.commit()
 
     return {"message": "Intercom token saved successfully", "integration_id": integration.id}
+
+
+# ---------------------------
+# Step 3: Sync conversations into feedback_items
+# ---------------------------
+async def _run_conversation_sync(integration_id, incremental: bool):
+    # Background tasks outlive the request, so they get their own session
+    async with AsyncSessionLocal() as db:
+        integration = None
+        try:
+            integration = await db.get(Integration, integration_id)
+            if integration is None:
+                return
+            count = await sync_intercom_integration(db, integration, incremental=incremental)
+            logger.info("Intercom sync for integration %s finished: %s conversations written", integration_id, count)
+        except Exception as e:
+            logger.exception("Intercom sync for integration %s failed", integration_id)
+            if integration is not None:
+                await release_sync_claim(db, integration, e)
+
+
+@router.post("/integrations/{integration_id}/sync", status_code=202)
+def start_conversation_sync(
+    integration_id: str,
+    background_tasks: BackgroundTasks,
+    mode: str = "incremental",  # incremental | full
+    workspace_id: str = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    integration = db.query(Integration).filter_by(
+        id=integration_id,
+        workspace_id=workspace.id,
+        type="intercom"
+    ).first()
+    if not integration:
+        raise HTTPException(status_code=404, detail="Intercom integration not found")
+    if mode not in ("incremental", "full"):
+        raise HTTPException(status_code=400, detail="mode must be 'incremental' or 'full'")
+    if db.execute(sync_claim(integration.id)).scalar() is None:
+        raise HTTPException(status_code=409, detail="Sync already in progress")
+    db.commit()
+
+    background_tasks.add_task(_run_conversation_sync, integration.id, mode == "incremental")
+    return {"message": "Intercom sync started", "integration_id": integration.id, "mode": mode}
@@ -0,0 +1,59 @@
+# internal_routes.py
+import hmac
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from database.db import async_engine, engine
+from database.pool_stats import pool_status
+from services.live_events import hub
+from services.scheduler import scheduler
+
+load_dotenv()
+
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+# explicit opt-in for local dev: without a token, /internal is otherwise closed
+INTERNAL_API_ALLOW_UNAUTHENTICATED = os.getenv("INTERNAL_API_ALLOW_UNAUTHENTICATED", "false").lower() == "true"
+
+
+def require_internal_token(x_internal_token: Optional[str] = Header(default=None)):
+    if not INTERNAL_API_TOKEN:
+        if INTERNAL_API_ALLOW_UNAUTHENTICATED:
+            return
+        raise HTTPException(status_code=403, detail="Internal API is disabled: INTERNAL_API_TOKEN is not set")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token.encode(), INTERNAL_API_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+router = APIRouter(prefix="/internal", tags=["Internal"], dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/db-pool")
+def db_pool_stats():
+    return {
+        "sync": pool_status(engine, "sync"),
+        "async": pool_status(async_engine.sync_engine, "async"),
+    }
+
+
+@router.get("/scheduler")
+def scheduler_status():
+    return scheduler.status()
+
+
+@router.get("/live-events")
+def live_events_status():
+    return hub.status()
+
+
+@router.post("/scheduler/{job_name}/run", status_code=202)
+async def run_scheduled_job(job_name: str):
+    if job_name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if scheduler.jobs[job_name].leader and not scheduler.is_leader:
+        raise HTTPException(status_code=409, detail="This replica is not the scheduler leader")
+    if not scheduler.run_now(job_name):
+        raise HTTPException(status_code=409, detail="Job is already running")
+    return {"message": "Job started", "job": job_name}
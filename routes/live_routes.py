@@ -0,0 +1,30 @@
+# live_routes.py
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from auth.validate_users import get_current_user_async, get_user_workspace
+from services.live_events import hub, stream_events
+
+router = APIRouter(prefix="/workspaces", tags=["Live Events"])
+
+
+# ---------------------------
+# Server-Sent Events: ready, feedback.ingested, feedback.enriched,
+# integration.sync_status, resync, evicted
+# ---------------------------
+@router.get("/{workspace_id}/events")
+async def workspace_events(
+    workspace_id: str,
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    subscriber = hub.subscribe(workspace.id)
+    if subscriber is None:
+        # clients retry; the load balancer sends them to a less busy process
+        raise HTTPException(status_code=503, detail="Too many live connections, retry shortly")
+
+    return StreamingResponse(
+        stream_events(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,6 +1,145 @@
-from fastapi import APIRouter
+# slack_routes.py
+import logging
+import os
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
 
+from database.db import AsyncSessionLocal, get_async_db, get_db
+from database.models import Integration
+from auth.validate_users import get_current_user, get_current_user_async, get_user_workspace
+from services.http_client import get_http_client
+from services.slack_sync import SLACK_API_BASE_URL, sync_slack_integration
+from services.feedback_ingest import release_sync_claim, sync_claim
+from services.quota import check_integration_limit
+
+load_dotenv()
+
+SLACK_CLIENT_ID = os.getenv("SLACK_CLIENT_ID")
+SLACK_CLIENT_SECRET = os.getenv("SLACK_CLIENT_SECRET")
+SLACK_REDIRECT_URI = os.getenv("SLACK_REDIRECT_URI")
+SLACK_SCOPES = "channels:history,channels:read,groups:history,groups:read"
 
 router = APIRouter(prefix="/slack", tags=["Slack"])
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------
+# Step 1: Redirect user to Slack OAuth page
+# ---------------------------
+@router.get("/authorize")
+async def slack_authorize():
+    redirect_url = (
+        f"https://slack.com/oauth/v2/authorize?client_id={SLACK_CLIENT_ID}"
+        f"&scope={SLACK_SCOPES}"
+        f"&redirect_uri={SLACK_REDIRECT_URI}"
+    )
+    return {"auth_url": redirect_url}
+
+
+# ---------------------------
+# Step 2: Handle OAuth callback
+# ---------------------------
+@router.get("/callback")
+async def slack_callback(
+    code: str = None,
+    workspace_id: str = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    if not code:
+        raise HTTPException(status_code=400, detail="No code returned from Slack")
+
+    workspace = get_user_workspace(current_user, workspace_id)
+
+    client = get_http_client("slack")
+    resp = await client.post(
+        f"{SLACK_API_BASE_URL}/oauth.v2.access",
+        data={
+            "client_id": SLACK_CLIENT_ID,
+            "client_secret": SLACK_CLIENT_SECRET,
+            "code": code,
+            "redirect_uri": SLACK_REDIRECT_URI,
+        },
+    )
+    token_data = resp.json()
+    if not token_data.get("ok") or not token_data.get("access_token"):
+        raise HTTPException(status_code=400, detail=f"Failed to fetch access token: {token_data.get('error')}")
+
+    team = token_data.get("team") or {}
+    config = {
+        "access_token": token_data["access_token"],
+        "team_id": team.get("id"),
+        "team_name": team.get("name"),
+        "bot_user_id": token_data.get("bot_user_id"),
+    }
+
+    result = await db.execute(
+        select(Integration).filter_by(workspace_id=workspace.id, type="slack")
+    )
+    integration = result.scalars().first()
+
+    if not integration:
+        await check_integration_limit(db, workspace.id)
+        integration = Integration(
+            workspace_id=workspace.id,
+            type="slack",
+            name=team.get("name") or "Slack",
+            config=config
+        )
+        db.add(integration)
+    else:
+        # reassign so SQLAlchemy notices the JSONB change
+        integration.config = {**(integration.config or {}), **config}
+
+    await db.commit()
+
+    return {"message": "Slack token saved successfully", "integration_id": integration.id}
+
+
+# ---------------------------
+# Step 3: Backfill / sync channel history into feedback_items
+# ---------------------------
+async def _run_channel_sync(integration_id, incremental: bool):
+    # Background tasks outlive the request, so they get their own session
+    async with AsyncSessionLocal() as db:
+        integration = None
+        try:
+            integration = await db.get(Integration, integration_id)
+            if integration is None:
+                return
+            count = await sync_slack_integration(db, integration, incremental=incremental)
+            logger.info("Slack sync for integration %s finished: %s messages written", integration_id, count)
+        except Exception as e:
+            logger.exception("Slack sync for integration %s failed", integration_id)
+            if integration is not None:
+                await release_sync_claim(db, integration, e)
+
 
+@router.post("/integrations/{integration_id}/sync", status_code=202)
+def start_channel_sync(
+    integration_id: str,
+    background_tasks: BackgroundTasks,
+    mode: str = "incremental",  # incremental | full
+    workspace_id: str = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    integration = db.query(Integration).filter_by(
+        id=integration_id,
+        workspace_id=workspace.id,
+        type="slack"
+    ).first()
+    if not integration:
+        raise HTTPException(status_code=404, detail="Slack integration not found")
+    if mode not in ("incremental", "full"):
+        raise HTTPException(status_code=400, detail="mode must be 'incremental' or 'full'")
+    if db.execute(sync_claim(integration.id)).scalar() is None:
+        raise HTTPException(status_code=409, detail="Sync already in progress")
+    db.commit()
 
+    background_tasks.add_task(_run_channel_sync, integration.id, mode == "incremental")
+    return {"message": "Slack sync started", "integration_id": integration.id, "mode": mode}
@@ -0,0 +1,72 @@
+# webhook_routes.py
+import json
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db import get_async_db
+from services.webhook_intake import (
+    PROVIDERS,
+    TENANT_KEYS,
+    VERIFIERS,
+    InvalidSignature,
+    event_identity,
+    event_tenant,
+    intake_statement,
+    signing_secret,
+)
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
+
+
+# ---------------------------
+# Intake: verify, append one row, acknowledge. Processing happens in
+# workers.webhook_drain; keep this path free of any other IO (beyond the
+# primary-key lookup of a per-integration signing secret).
+# ---------------------------
+@router.post("/{provider}/{integration_id}")
+async def receive_webhook(
+    provider: str,
+    integration_id: uuid.UUID,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if provider not in PROVIDERS:
+        raise HTTPException(status_code=404, detail="Unknown webhook provider")
+
+    body = await request.body()
+    secret = await signing_secret(db, provider, integration_id)
+    try:
+        VERIFIERS[provider](request.headers, body, secret)
+    except InvalidSignature as e:
+        raise HTTPException(status_code=401, detail=f"Invalid webhook signature: {e}")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body must be JSON")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Webhook body must be a JSON object")
+
+    # Slack's endpoint handshake; nothing to store
+    if provider == "slack" and payload.get("type") == "url_verification":
+        return {"challenge": payload.get("challenge")}
+
+    # app-wide signing secrets: the payload's team/app id ties the event to this integration
+    tenant = event_tenant(provider, payload)
+    if provider in TENANT_KEYS and tenant is None:
+        raise HTTPException(status_code=400, detail=f"Webhook body has no {TENANT_KEYS[provider]}")
+
+    webhook_id, event_type = event_identity(provider, request.headers, payload)
+    result = await db.execute(
+        intake_statement(
+            provider, integration_id, webhook_id, event_type, body.decode("utf-8", errors="replace"), tenant,
+        )
+    )
+    if result.first() is None:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Unknown or inactive integration, or not this integration's account")
+    await db.commit()
+
+    return {"received": True}
@@ -0,0 +1,206 @@
+# workspace_routes.py
+import uuid
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.validate_users import get_current_user_async, get_user_workspace
+from database.db import get_async_db
+from database.models import FeedbackItem, InsightsSnapshot
+from database.schemas import FeedbackListOut, FeedbackSearchOut, InsightsSnapshotOut, SimilarFeedbackOut
+from services.feedback_query import (
+    DEFAULT_LIST_FIELDS,
+    FeedbackFilters,
+    apply_feedback_filters,
+    apply_keyset,
+    build_search_query,
+    encode_cursor,
+    encode_search_cursor,
+    resolve_fields,
+)
+from services.feedback_export import EXPORT_FORMATS, export_feedback, parquet_available
+from services.vector_index import get_vector, search_similar
+
+router = APIRouter(prefix="/workspaces", tags=["Workspaces"])
+
+PERIOD_TYPES = ("daily", "weekly", "monthly")
+
+
+# ---------------------------
+# Insights (precomputed rollups; one indexed row per request)
+# ---------------------------
+@router.get("/{workspace_id}/insights", response_model=InsightsSnapshotOut)
+async def get_insights_snapshot(
+    workspace_id: str,
+    period_type: str = "daily",
+    period_start: Optional[date] = None,  # defaults to the latest period
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    if period_type not in PERIOD_TYPES:
+        raise HTTPException(status_code=400, detail=f"period_type must be one of {', '.join(PERIOD_TYPES)}")
+
+    query = select(InsightsSnapshot).where(
+        InsightsSnapshot.workspace_id == workspace.id,
+        InsightsSnapshot.period_type == period_type,
+    )
+    if period_start:
+        query = query.where(InsightsSnapshot.period_start == period_start)
+    else:
+        query = query.order_by(InsightsSnapshot.period_start.desc()).limit(1)
+
+    snapshot = (await db.execute(query)).scalars().first()
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No insights snapshot for this period yet")
+
+    return InsightsSnapshotOut.model_validate(
+        {
+            **{c.name: getattr(snapshot, c.name) for c in InsightsSnapshot.__table__.columns},
+            "status_code": 200,
+            "message": "Insights fetched successfully",
+        }
+    )
+
+
+# ---------------------------
+# Feedback listing (keyset pagination, column projection)
+# ---------------------------
+@router.get("/{workspace_id}/feedback", response_model=FeedbackListOut)
+async def list_feedback(
+    workspace_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    category: Optional[str] = None,
+    processed: Optional[bool] = None,
+    source_type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="comma-separated columns; raw_content is opt-in"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    columns = resolve_fields(fields)
+    filters = FeedbackFilters(sentiment=sentiment, category=category, processed=processed, source_type=source_type)
+
+    query = select(*(getattr(FeedbackItem, name) for name in columns))
+    query = apply_keyset(apply_feedback_filters(query, workspace.id, filters), cursor, limit)
+    rows = (await db.execute(query)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return FeedbackListOut(
+        status_code=200,
+        message="Feedback fetched successfully",
+        items=[row._asdict() for row in rows],
+        next_cursor=next_cursor,
+        limit=limit,
+    )
+
+
+# ---------------------------
+# Feedback export (streamed from a server-side cursor; counted as export_requests)
+# ---------------------------
+@router.get("/{workspace_id}/feedback/export")
+async def export_feedback_items(
+    workspace_id: str,
+    format: str = Query("csv", description="csv, ndjson or parquet"),
+    sentiment: Optional[str] = None,
+    category: Optional[str] = None,
+    processed: Optional[bool] = None,
+    source_type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="comma-separated columns; raw_content is opt-in"),
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export is not available on this server")
+    columns = resolve_fields(fields)
+    filters = FeedbackFilters(sentiment=sentiment, category=category, processed=processed, source_type=source_type)
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"feedback-{workspace.id}-{date.today().isoformat()}.{extension}"
+    return StreamingResponse(
+        export_feedback(workspace.id, filters, columns, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------
+# Feedback search (tsvector + GIN, ranked, keyset over (rank, id))
+# ---------------------------
+@router.get("/{workspace_id}/feedback/search", response_model=FeedbackSearchOut)
+async def search_feedback(
+    workspace_id: str,
+    q: str = Query(..., min_length=1, max_length=500, description='keywords, "exact phrase", -exclude'),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    category: Optional[str] = None,
+    source_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    filters = FeedbackFilters(sentiment=sentiment, category=category, source_type=source_type)
+
+    rows = (await db.execute(build_search_query(workspace.id, q, filters, cursor, limit))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(rows[-1].rank, rows[-1].id)
+
+    return FeedbackSearchOut(
+        status_code=200,
+        message="Search completed successfully",
+        items=[row._asdict() for row in rows],
+        next_cursor=next_cursor,
+        limit=limit,
+    )
+
+
+# ---------------------------
+# Similar feedback (per-workspace vector collection)
+# ---------------------------
+@router.get("/{workspace_id}/feedback/{feedback_id}/similar", response_model=SimilarFeedbackOut)
+async def similar_feedback(
+    workspace_id: str,
+    feedback_id: uuid.UUID,
+    limit: int = Query(10, ge=1, le=50),
+    min_score: float = Query(0.75, ge=0, le=1),
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+
+    # the collection is the workspace's own, so a hit also proves ownership
+    vector = await get_vector(workspace.id, feedback_id)
+    if vector is None:
+        raise HTTPException(status_code=404, detail="Feedback not found or not embedded yet")
+    matches = await search_similar(workspace.id, vector, limit, min_score, exclude_id=feedback_id)
+
+    rows = {}
+    if matches:
+        query = select(*(getattr(FeedbackItem, name) for name in DEFAULT_LIST_FIELDS)).where(
+            FeedbackItem.workspace_id == workspace.id,
+            FeedbackItem.id.in_([uuid.UUID(pid) for pid, _ in matches]),
+        )
+        rows = {str(row.id): row._asdict() for row in await db.execute(query)}
+
+    return SimilarFeedbackOut(
+        status_code=200,
+        message="Similar feedback fetched successfully",
+        feedback_id=feedback_id,
+        items=[{**rows[pid], "score": score} for pid, score in matches if pid in rows],
+    )
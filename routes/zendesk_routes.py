@@ -1,9 +1,21 @@
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, HTTPException
 from fastapi.responses import RedirectResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import logging
 import os
-import httpx
 from dotenv import load_dotenv
 
+from database.db import AsyncSessionLocal, get_async_db, get_db
+from database.models import Integration
+from database.schemas import WebhookSecretIn
+from auth.validate_users import get_current_user, get_current_user_async, get_user_workspace
+from services.http_client import get_http_client
+from services.zendesk_sync import sync_zendesk_integration
+from services.feedback_ingest import release_sync_claim, sync_claim
+from services.quota import check_integration_limit
+
 load_dotenv()
 
 ZENDESK_SESSION_SECRET = os.environ.get("ZENDESK_SESSION_SECRET")
@@ -13,6 +25,7 @@ ZENDESK_CLIENT_SECRET = os.environ.get("ZENDESK_CLIENT_SECRET")
 ZENDESK_REDIRECT_URL = os.environ.get("ZENDESK_REDIRECT_URL")  # e.g., https://yourapp.com/zendesk/callback
 
 router = APIRouter(prefix="/zendesk", tags=["Zendesk"])
+logger = logging.getLogger(__name__)
 
 
 # Step 1: Redirect user to Zendesk OAuth page
@@ -28,7 +41,14 @@ def connect_zendesk():
 
 # Step 2: Callback URL to handle Zendesk's response
 @router.get("/callback")
-async def zendesk_callback(request: Request, code: str = None, error: str = None):
+async def zendesk_callback(
+    request: Request,
+    code: str = None,
+    error: str = None,
+    workspace_id: str = None,  # optional query param for multi-workspace users
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
     if error:
         raise HTTPException(status_code=400, detail=f"Zendesk OAuth error: {error}")
 
@@ -45,8 +65,8 @@ async def zendesk_callback(request: Request, code: str = None, error: str = None
         "code": code,
     }
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(token_url, data=payload)
+    client = get_http_client("zendesk")
+    resp = await client.post(token_url, data=payload)
 
     if resp.status_code != 200:
         raise HTTPException(status_code=resp.status_code, detail=resp.text)
@@ -55,8 +75,59 @@ async def zendesk_callback(request: Request, code: str = None, error: str = None
     access_token = token_data.get("access_token")
     refresh_token = token_data.get("refresh_token")
 
-    # TODO: Save tokens securely in your DB, linked to the user's workspace
-    return {"access_token": access_token, "refresh_token": refresh_token, "token_data": token_data}
+    if not access_token:
+        raise HTTPException(status_code=400, detail=f"Failed to fetch access token: {token_data}")
+
+    # Save or update Integration record
+    workspace = get_user_workspace(current_user, workspace_id)
+    result = await db.execute(
+        select(Integration).filter_by(workspace_id=workspace.id, type="zendesk")
+    )
+    integration = result.scalars().first()
+
+    config = {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "subdomain": ZENDESK_SUBDOMAIN,
+    }
+    if not integration:
+        await check_integration_limit(db, workspace.id)
+        integration = Integration(
+            workspace_id=workspace.id,
+            type="zendesk",
+            name="Zendesk",
+            config=config
+        )
+        db.add(integration)
+    else:
+        # reassign so SQLAlchemy notices the JSONB change
+        integration.config = {**(integration.config or {}), **config}
+
+    await db.commit()
+
+    return {"message": "Zendesk token saved successfully", "integration_id": integration.id}
+
+
+# Webhooks: Zendesk signs each webhook with its own secret (Admin Center ->
+# Webhooks -> Signing secret); incoming events are verified against it
+@router.put("/integrations/{integration_id}/webhook-secret")
+async def set_webhook_secret(
+    integration_id: str,
+    body: WebhookSecretIn,
+    workspace_id: str = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    integration = (await db.execute(
+        select(Integration).filter_by(id=integration_id, workspace_id=workspace.id, type="zendesk")
+    )).scalars().first()
+    if not integration:
+        raise HTTPException(status_code=404, detail="Zendesk integration not found")
+    # reassign so SQLAlchemy notices the JSONB change
+    integration.config = {**(integration.config or {}), "webhook_secret": body.secret}
+    await db.commit()
+    return {"message": "Zendesk webhook secret saved", "integration_id": integration.id}
 
 
 # Optional: Test fetching Zendesk tickets
@@ -65,10 +136,56 @@ async def get_tickets(access_token: str):
     url = f"https://{ZENDESK_SUBDOMAIN}.zendesk.com/api/v2/tickets.json"
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers)
+    client = get_http_client("zendesk")
+    resp = await client.get(url, headers=headers)
 
     if resp.status_code != 200:
         raise HTTPException(status_code=resp.status_code, detail=resp.text)
 
     return resp.json()
+
+
+# ---------------------------
+# Ticket sync into feedback_items
+# ---------------------------
+async def _run_ticket_sync(integration_id, incremental: bool):
+    # Background tasks outlive the request, so they get their own session
+    async with AsyncSessionLocal() as db:
+        integration = None
+        try:
+            integration = await db.get(Integration, integration_id)
+            if integration is None:
+                return
+            count = await sync_zendesk_integration(db, integration, incremental=incremental)
+            logger.info("Zendesk sync for integration %s finished: %s tickets written", integration_id, count)
+        except Exception as e:
+            logger.exception("Zendesk sync for integration %s failed", integration_id)
+            if integration is not None:
+                await release_sync_claim(db, integration, e)
+
+
+@router.post("/integrations/{integration_id}/sync", status_code=202)
+def start_ticket_sync(
+    integration_id: str,
+    background_tasks: BackgroundTasks,
+    mode: str = "incremental",  # incremental | full
+    workspace_id: str = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    workspace = get_user_workspace(current_user, workspace_id)
+    integration = db.query(Integration).filter_by(
+        id=integration_id,
+        workspace_id=workspace.id,
+        type="zendesk"
+    ).first()
+    if not integration:
+        raise HTTPException(status_code=404, detail="Zendesk integration not found")
+    if mode not in ("incremental", "full"):
+        raise HTTPException(status_code=400, detail="mode must be 'incremental' or 'full'")
+    if db.execute(sync_claim(integration.id)).scalar() is None:
+        raise HTTPException(status_code=409, detail="Sync already in progress")
+    db.commit()
+
+    background_tasks.add_task(_run_ticket_sync, integration.id, mode == "incremental")
+    return {"message": "Zendesk sync started", "integration_id": integration.id, "mode": mode}
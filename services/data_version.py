@@ -0,0 +1,31 @@
+# data_version.py
+"""
+Workspace.data_version: a counter bumped in the same transaction as any
+change to what analysts see (processed feedback, regenerated snapshots).
+Caches keyed on it never need explicit invalidation: a bump makes every
+older key unreachable.
+"""
+from typing import Iterable
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Workspace
+
+
+async def bump_data_version(db: AsyncSession, workspace_ids: Iterable):
+    """Increment data_version for the given workspaces. Does not commit."""
+    # sorted: concurrent bumps of several workspaces lock rows in the same order
+    ids = sorted(set(workspace_ids), key=str)
+    if not ids:
+        return
+    await db.execute(
+        update(Workspace)
+        .where(Workspace.id.in_(ids))
+        .values(data_version=Workspace.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def get_data_version(db: AsyncSession, workspace_id) -> int:
+    return await db.scalar(select(Workspace.data_version).where(Workspace.id == workspace_id)) or 0
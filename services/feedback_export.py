@@ -0,0 +1,188 @@
+# feedback_export.py
+"""
+Streaming feedback export (CSV, NDJSON, Parquet).
+
+Rows come from a server-side cursor (psycopg2 named cursor via yield_per), so
+only EXPORT_BATCH_SIZE rows are in memory at any time, and each batch is
+encoded and handed to the client before the next is fetched. Memory stays
+flat whether a workspace has a thousand rows or fifty million. Parquet is
+written one row group per batch; its footer is the only part that grows with
+row count (a few bytes per row group).
+
+Generators are sync: StreamingResponse iterates them in the threadpool, and
+each export holds one sync pool connection for its whole duration, hence
+EXPORT_MAX_CONCURRENT.
+"""
+import csv
+import io
+import json
+import os
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator, List
+
+from dotenv import load_dotenv
+from sqlalchemy import ARRAY, Boolean, DateTime, Integer, Numeric, select
+
+from database.db import SessionLocal
+from database.models import FeedbackItem
+from services.feedback_query import FeedbackFilters, apply_feedback_filters
+
+load_dotenv()
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 5000))  # rows per fetch / Parquet row group
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", 4))  # per process; more wait their turn
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+_export_slots = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENT)
+
+
+def parquet_available() -> bool:
+    # pyarrow is optional: only Parquet exports need it
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _batches(workspace_id, filters: FeedbackFilters, columns: List[str]) -> Iterator[list]:
+    query = select(*(getattr(FeedbackItem, name) for name in columns))
+    query = apply_feedback_filters(query, workspace_id, filters)
+    # same order as the listing API, served by the (workspace_id, created_at, id) indexes
+    query = query.order_by(FeedbackItem.created_at.desc(), FeedbackItem.id.desc())
+    with SessionLocal() as db:
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for batch in result.partitions():
+            yield batch
+
+
+def _plain(value):
+    # CSV / NDJSON cell: lists and dicts as JSON, everything else as text
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+# ---------------------------
+# Encoders: one bytes chunk per batch
+# ---------------------------
+def _csv(batches: Iterator[list], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([_plain(v) for v in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _ndjson(batches: Iterator[list], columns: List[str]) -> Iterator[bytes]:
+    for batch in batches:
+        lines = (json.dumps(dict(zip(columns, row)), default=_ndjson_default) for row in batch)
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file for ParquetWriter: keeps its own offset, hands bytes out as they arrive."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema(columns: List[str]):
+    import pyarrow as pa
+
+    fields = []
+    for name in columns:
+        column_type = getattr(FeedbackItem, name).type
+        if isinstance(column_type, ARRAY):
+            arrow_type = pa.list_(pa.string())
+        elif isinstance(column_type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, Numeric):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _parquet_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (list, bool, int, float, datetime)) or value is None:
+        return value
+    return str(value)
+
+
+def _parquet(batches: Iterator[list], columns: List[str]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(columns)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd") as writer:
+        for batch in batches:
+            arrays = [
+                pa.array([_parquet_value(row[i]) for row in batch], type=schema.field(i).type)
+                for i in range(len(columns))
+            ]
+            # one row group per fetched batch
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()  # footer
+
+
+_ENCODERS = {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}
+
+
+def export_feedback(workspace_id, filters: FeedbackFilters, columns: List[str], export_format: str) -> Iterator[bytes]:
+    """Encoded chunks of the export; waits for a free slot when EXPORT_MAX_CONCURRENT are running."""
+    with _export_slots:
+        for chunk in _ENCODERS[export_format](_batches(workspace_id, filters, columns), columns):
+            if chunk:
+                yield chunk
@@ -0,0 +1,502 @@
+"""
+Streaming CSV / PDF feedback import.
+
+The request body is consumed as it arrives: bytes are decoded and cut into
+whole CSV records (quoted fields may span lines), parsed and validated off the
+event loop, and handed to the loader through a small bounded queue so the next
+chunk is parsed while the previous one is written. Each chunk is COPY'd into an
+ON COMMIT DROP staging table and merged into feedback_items on
+uq_feedback_unique in one transaction, together with the progress counters on
+the import's Integration row.
+
+PDFs need random access (the xref table sits at the end), so they are spooled
+to a temp file first and then extracted a batch of pages at a time; each
+non-empty page becomes one feedback item.
+"""
+import asyncio
+import codecs
+import csv
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from PyPDF2 import PdfReader
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, false, func, literal, select
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateTable
+
+from database.models import FeedbackItem, Integration
+from services.feedback_ingest import content_hash, reserve_feedback_quota, with_feedback_conflict_update
+from services.live_events import LIVE_MAX_IDS, publish
+from services.quota import quota_manager
+
+load_dotenv()
+
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", 20000))  # rows per COPY + merge transaction
+IMPORT_READ_BYTES = int(os.getenv("IMPORT_READ_BYTES", 4 * 1024 * 1024))  # body bytes parsed per thread hop
+IMPORT_PIPELINE_DEPTH = int(os.getenv("IMPORT_PIPELINE_DEPTH", 2))  # parsed chunks waiting for the loader
+IMPORT_MAX_CONTENT_CHARS = int(os.getenv("IMPORT_MAX_CONTENT_CHARS", 100_000))
+IMPORT_MAX_PDF_BYTES = int(os.getenv("IMPORT_MAX_PDF_BYTES", 200 * 1024 * 1024))
+IMPORT_PDF_PAGE_BATCH = 50
+IMPORT_ERROR_SAMPLE = 20  # invalid rows reported back in detail
+
+# feedback columns a CSV header may map to, with accepted spellings
+COLUMN_ALIASES = {
+    "raw_content": ("raw_content", "content", "feedback", "text", "message", "body", "comment"),
+    "external_id": ("external_id", "id", "ticket_id"),
+    "customer_email": ("customer_email", "email"),
+    "customer_name": ("customer_name", "name", "customer"),
+    "source_url": ("source_url", "url", "link"),
+    "created_at": ("created_at", "date", "timestamp", "submitted_at"),
+}
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+csv.field_size_limit(max(csv.field_size_limit(), IMPORT_MAX_CONTENT_CHARS * 2))
+
+
+class ImportFailed(Exception):
+    pass
+
+
+# ---------------------------
+# Parsing (runs in worker threads)
+# ---------------------------
+@dataclass
+class ImportStats:
+    bytes_read: int = 0
+    rows_read: int = 0
+    rows_written: int = 0
+    rows_invalid: int = 0
+    errors: List[dict] = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    def invalid(self, row_number: int, reason: str):
+        self.rows_invalid += 1
+        if len(self.errors) < IMPORT_ERROR_SAMPLE:
+            self.errors.append({"row": row_number, "error": reason})
+
+    def as_progress(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            "bytes_read": self.bytes_read,
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "rows_invalid": self.rows_invalid,
+            "rows_per_minute": int(self.rows_read / elapsed * 60) if elapsed else 0,
+            "errors": self.errors,
+        }
+
+
+class CsvRecordSplitter:
+    """
+    Cut decoded text into whole CSV records. A newline ends a record only when
+    the quotes seen so far are balanced (escaped quotes come in pairs).
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._quotes = 0
+
+    def feed(self, text: str) -> List[str]:
+        records, start, pos, quotes = [], 0, 0, self._quotes
+        pending = self._pending
+        while True:
+            newline = text.find("\n", pos)
+            if newline == -1:
+                break
+            quotes += text.count('"', pos, newline)
+            pos = newline + 1
+            if quotes % 2 == 0:
+                records.append(pending + text[start:pos])
+                pending, start, quotes = "", pos, 0
+        self._pending = pending + text[start:]
+        self._quotes = quotes + text.count('"', pos)
+        return records
+
+    def close(self) -> List[str]:
+        rest, self._pending, self._quotes = self._pending, "", 0
+        return [rest] if rest.strip() else []
+
+
+def _parse_created_at(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    # feedback timestamps are naive UTC
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+class FeedbackRowParser:
+    """Turns CSV records / PDF pages into staging tuples (see STAGING_COLUMNS)."""
+
+    def __init__(self, source_type: str, stats: ImportStats, content_column: Optional[str] = None):
+        self.source_type = source_type
+        self.stats = stats
+        self.content_column = content_column
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._splitter = CsvRecordSplitter()
+        self._mapping: Optional[Dict[str, int]] = None
+        self._header: List[str] = []
+
+    # CSV
+    def feed_csv(self, data: bytes, final: bool = False) -> List[tuple]:
+        self.stats.bytes_read += len(data)
+        records = self._splitter.feed(self._decoder.decode(data, final))
+        if final:
+            records.extend(self._splitter.close())
+        rows = []
+        for values in csv.reader(records):
+            if self._mapping is None:
+                self._read_header(values)
+                continue
+            if not any(v.strip() for v in values):
+                continue
+            self.stats.rows_read += 1
+            row = self._validate(self.stats.rows_read, self._row_from_values(values))
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def _read_header(self, header: List[str]):
+        self._header = [h.strip() for h in header]
+        lowered = {h.lower(): i for i, h in enumerate(self._header)}
+        mapping = {}
+        for target, aliases in COLUMN_ALIASES.items():
+            if target == "raw_content" and self.content_column:
+                aliases = (self.content_column.lower(),)
+            index = next((lowered[a] for a in aliases if a in lowered), None)
+            if index is not None:
+                mapping[target] = index
+        if "raw_content" not in mapping:
+            raise ImportFailed(
+                f"CSV header has no content column; expected one of {', '.join(COLUMN_ALIASES['raw_content'])}"
+            )
+        self._mapping = mapping
+
+    def _row_from_values(self, values: List[str]) -> dict:
+        mapped = set(self._mapping.values())
+        row = {
+            target: (values[i].strip() or None) if i < len(values) else None
+            for target, i in self._mapping.items()
+        }
+        # unmapped columns are kept as source metadata
+        row["source_metadata"] = {
+            name: values[i] for i, name in enumerate(self._header)
+            if i not in mapped and i < len(values) and name and values[i] != ""
+        }
+        return row
+
+    # PDF
+    def parse_pages(self, pages: List[Tuple[int, str]]) -> List[tuple]:
+        rows = []
+        for page_number, text in pages:
+            if not text.strip():
+                continue
+            self.stats.rows_read += 1
+            row = self._validate(page_number, {"raw_content": text.strip(), "source_metadata": {"page": page_number}})
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    @staticmethod
+    def _check(row: dict) -> Optional[str]:
+        content = row.get("raw_content")
+        if not content:
+            return "empty content"
+        if len(content) > IMPORT_MAX_CONTENT_CHARS:
+            return f"content longer than {IMPORT_MAX_CONTENT_CHARS} characters"
+        if row.get("customer_email") and not _EMAIL_RE.match(row["customer_email"]):
+            return "invalid customer_email"
+        for column, limit in (("external_id", 255), ("customer_email", 255), ("customer_name", 255), ("source_url", 500)):
+            if row.get(column) and len(row[column]) > limit:
+                return f"{column} longer than {limit} characters"
+        return None
+
+    def _validate(self, row_number: int, row: dict) -> Optional[tuple]:
+        error = self._check(row)
+        created_at = None
+        if error is None and row.get("created_at"):
+            try:
+                created_at = _parse_created_at(row["created_at"])
+            except ValueError:
+                error = "invalid created_at (expected ISO 8601)"
+        if error is not None:
+            self.stats.invalid(row_number, error)
+            return None
+
+        content, email = row["raw_content"], row.get("customer_email")
+        external_id = row.get("external_id") or "{}-{}".format(
+            self.source_type,
+            hashlib.sha256(f"{content}|{email or ''}|{row.get('created_at') or ''}".encode()).hexdigest()[:40],
+        )
+        metadata = row.get("source_metadata") or {}
+        hashed = content_hash({
+            "source_url": row.get("source_url"),
+            "customer_email": email,
+            "customer_name": row.get("customer_name"),
+            "raw_content": content,
+            "source_metadata": metadata,
+        })
+        return (
+            row_number, external_id, email, row.get("customer_name"), row.get("source_url"),
+            content, json.dumps(metadata), hashed, created_at,
+        )
+
+
+def _extract_pages(reader: PdfReader, start: int, end: int) -> List[Tuple[int, str]]:
+    return [(n + 1, reader.pages[n].extract_text() or "") for n in range(start, end)]
+
+
+# ---------------------------
+# Chunk producers
+# ---------------------------
+def _rechunk(pending: List[tuple], size: int, final: bool):
+    while len(pending) >= size or (final and pending):
+        chunk, pending[:] = pending[:size], pending[size:]
+        yield chunk
+
+
+async def csv_chunks(stream: AsyncIterator[bytes], parser: FeedbackRowParser, chunk_rows: int = IMPORT_CHUNK_ROWS):
+    buffer, size, pending = [], 0, []
+    async for piece in stream:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= IMPORT_READ_BYTES:
+            pending.extend(await asyncio.to_thread(parser.feed_csv, b"".join(buffer)))
+            buffer, size = [], 0
+            for chunk in _rechunk(pending, chunk_rows, final=False):
+                yield chunk
+    pending.extend(await asyncio.to_thread(parser.feed_csv, b"".join(buffer), True))
+    for chunk in _rechunk(pending, chunk_rows, final=True):
+        yield chunk
+
+
+async def pdf_chunks(stream: AsyncIterator[bytes], parser: FeedbackRowParser, chunk_rows: int = IMPORT_CHUNK_ROWS):
+    with tempfile.TemporaryFile() as spool:
+        async for piece in stream:
+            parser.stats.bytes_read += len(piece)
+            if parser.stats.bytes_read > IMPORT_MAX_PDF_BYTES:
+                raise ImportFailed(f"PDF larger than {IMPORT_MAX_PDF_BYTES} bytes")
+            spool.write(piece)
+        spool.seek(0)
+        try:
+            reader = await asyncio.to_thread(PdfReader, spool)
+            page_count = len(reader.pages)
+        except Exception as e:
+            raise ImportFailed(f"Unreadable PDF: {e}")
+
+        pending = []
+        for start in range(0, page_count, IMPORT_PDF_PAGE_BATCH):
+            pages = await asyncio.to_thread(_extract_pages, reader, start, min(start + IMPORT_PDF_PAGE_BATCH, page_count))
+            pending.extend(parser.parse_pages(pages))
+            for chunk in _rechunk(pending, chunk_rows, final=False):
+                yield chunk
+        for chunk in _rechunk(pending, chunk_rows, final=True):
+            yield chunk
+
+
+# ---------------------------
+# Loading: COPY into staging, merge on uq_feedback_unique
+# ---------------------------
+_staging_metadata = MetaData()
+STAGING = Table(
+    "feedback_import_staging",
+    _staging_metadata,
+    Column("row_number", Integer),
+    Column("external_id", String(255)),
+    Column("customer_email", String(255)),
+    Column("customer_name", String(255)),
+    Column("source_url", String(500)),
+    Column("raw_content", Text),
+    Column("source_metadata", JSONB),
+    Column("content_hash", String(64)),
+    Column("created_at", DateTime),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",  # per-transaction: safe behind PgBouncer transaction pooling
+)
+STAGING_COLUMNS = tuple(c.name for c in STAGING.columns)
+_EXTERNAL_ID = STAGING_COLUMNS.index("external_id")
+_MERGED_COLUMNS = (
+    "id", "workspace_id", "integration_id", "source_type", "external_id", "customer_email",
+    "customer_name", "source_url", "raw_content", "source_metadata", "content_hash",
+    "priority_score", "is_processed", "reviewed_by_user", "created_at", "updated_at",
+)
+
+
+def _merge_statement(workspace_id, integration_id, source_type: str):
+    # last occurrence of an external_id in the chunk wins (ON CONFLICT cannot touch a row twice)
+    latest = (
+        select(STAGING)
+        .distinct(STAGING.c.external_id)
+        .order_by(STAGING.c.external_id, STAGING.c.row_number.desc())
+        .subquery("latest")
+    )
+    # created_at is part of uq_feedback_unique (partition key): a re-imported row
+    # keeps the one it was first stored with (see resolve_created_at)
+    existing_created_at = (
+        select(FeedbackItem.created_at)
+        .where(
+            FeedbackItem.workspace_id == workspace_id,
+            FeedbackItem.source_type == source_type,
+            FeedbackItem.external_id == latest.c.external_id,
+        )
+        .order_by(FeedbackItem.created_at)
+        .limit(1)
+        .scalar_subquery()
+    )
+    rows = select(
+        func.gen_random_uuid(),
+        literal(workspace_id, FeedbackItem.workspace_id.type),
+        literal(integration_id, FeedbackItem.integration_id.type),
+        literal(source_type),
+        latest.c.external_id,
+        latest.c.customer_email,
+        latest.c.customer_name,
+        latest.c.source_url,
+        latest.c.raw_content,
+        latest.c.source_metadata,
+        latest.c.content_hash,
+        literal(0),
+        false(),
+        false(),
+        func.coalesce(existing_created_at, latest.c.created_at, func.now()),
+        func.now(),
+    )
+    stmt = insert(FeedbackItem).from_select(list(_MERGED_COLUMNS), rows, include_defaults=False)
+    return with_feedback_conflict_update(stmt)
+
+
+async def load_chunk(db: AsyncSession, workspace_id, integration_id, source_type: str, rows: List[tuple]) -> int:
+    """COPY + merge one chunk inside the current transaction; returns rows inserted or changed."""
+    external_ids = list({row[_EXTERNAL_ID] for row in rows})
+    leased = await reserve_feedback_quota(db, workspace_id, source_type, external_ids)
+    inserted = 0
+    try:
+        # keys already stored tell inserts from updates (RETURNING xmax is not allowed on a partitioned table)
+        existing = set((await db.scalars(
+            select(FeedbackItem.external_id).where(
+                FeedbackItem.workspace_id == workspace_id,
+                FeedbackItem.source_type == source_type,
+                FeedbackItem.external_id.in_([e for e in external_ids if e is not None]),
+            )
+        )).all())
+        await db.execute(CreateTable(STAGING))
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(STAGING.name, records=rows, columns=STAGING_COLUMNS)
+        stmt = _merge_statement(workspace_id, integration_id, source_type).returning(
+            FeedbackItem.id, FeedbackItem.external_id
+        )
+        written = (await db.execute(stmt)).all()
+        new_ids = [item_id for item_id, external_id in written if external_id is None or external_id not in existing]
+        inserted = len(new_ids)
+    finally:
+        quota_manager.give_back(workspace_id, "feedback_items", leased - inserted)
+    if written:
+        await publish(
+            db, workspace_id, "feedback.ingested",
+            count=len(written), inserted=inserted, ids=[str(i) for i in new_ids[:LIVE_MAX_IDS]],
+        )
+    return len(written)
+
+
+# ---------------------------
+# Orchestration
+# ---------------------------
+def _record_progress(integration: Integration, config: dict, stats: ImportStats, **extra):
+    # `config` is the caller's copy: after a rollback the instance is expired and
+    # reading integration.config would need IO
+    config["import"] = {**config.get("import", {}), **stats.as_progress(), **extra}
+    # reassign so SQLAlchemy notices the JSONB change
+    integration.config = dict(config)
+    integration.updated_at = datetime.utcnow()
+
+
+async def _publish_status(db: AsyncSession, workspace_id, integration_id, status: str, error: Optional[str] = None):
+    await publish(db, workspace_id, "integration.sync_status", integration_id=integration_id, status=status, error=error)
+
+
+async def _pipeline(chunks: AsyncIterator[List[tuple]], consume: Callable[[List[tuple]], Awaitable[None]]):
+    """Parse ahead of the loader by at most IMPORT_PIPELINE_DEPTH chunks."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=IMPORT_PIPELINE_DEPTH)
+    done = object()
+
+    async def produce():
+        try:
+            async for chunk in chunks:
+                await queue.put(chunk)
+            await queue.put(done)
+        except Exception as e:
+            await queue.put(e)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            await consume(item)
+    finally:
+        producer.cancel()
+
+
+async def run_import(
+    db: AsyncSession,
+    integration: Integration,
+    stream: AsyncIterator[bytes],
+    file_format: str,
+    filename: Optional[str] = None,
+    content_column: Optional[str] = None,
+) -> ImportStats:
+    """
+    Stream one uploaded file into feedback_items. Progress is committed after
+    every chunk in integration.sync_status / total_items_synced / config["import"].
+    """
+    workspace_id, integration_id = integration.workspace_id, integration.id
+    config = dict(integration.config or {})
+    total = integration.total_items_synced or 0
+    stats = ImportStats()
+    parser = FeedbackRowParser(file_format, stats, content_column)
+    chunks = csv_chunks(stream, parser) if file_format == "csv" else pdf_chunks(stream, parser)
+
+    integration.sync_status = "syncing"
+    integration.last_error_message = None
+    _record_progress(
+        integration, config, stats, format=file_format, filename=filename,
+        started_at=datetime.utcnow().isoformat(), finished_at=None,
+    )
+    await _publish_status(db, workspace_id, integration_id, "syncing")
+    await db.commit()
+
+    async def consume(rows: List[tuple]):
+        written = await load_chunk(db, workspace_id, integration_id, file_format, rows)
+        stats.rows_written += written
+        integration.total_items_synced = total + stats.rows_written
+        integration.last_sync_at = datetime.utcnow()
+        _record_progress(integration, config, stats)
+        await db.commit()  # also drops the staging table
+
+    try:
+        await _pipeline(chunks, consume)
+    except Exception as e:
+        await db.rollback()
+        integration.sync_status = "error"
+        integration.last_error_message = str(e)
+        _record_progress(integration, config, stats, finished_at=datetime.utcnow().isoformat())
+        await _publish_status(db, workspace_id, integration_id, "error", str(e))
+        await db.commit()
+        raise
+
+    integration.sync_status = "completed"
+    _record_progress(integration, config, stats, finished_at=datetime.utcnow().isoformat())
+    await _publish_status(db, workspace_id, integration_id, "completed")
+    await db.commit()
+    return stats
@@ -0,0 +1,322 @@
+# feedback_ingest.py
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import FeedbackItem, Integration
+from services.live_events import LIVE_MAX_IDS, publish
+from services.quota import QuotaExceeded, quota_manager
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_UPSERT_CHUNK_SIZE = int(os.getenv("FEEDBACK_UPSERT_CHUNK_SIZE", 500))
+
+# Columns owned by the provider; AI enrichment columns are never overwritten by a re-sync
+SOURCE_COLUMNS = (
+    "integration_id",
+    "source_url",
+    "customer_email",
+    "customer_name",
+    "raw_content",
+    "source_metadata",
+)
+HASHED_COLUMNS = ("source_url", "customer_email", "customer_name", "raw_content", "source_metadata")
+
+
+@dataclass
+class SyncBatch:
+    rows: List[dict] = field(default_factory=list)
+    # provider watermark that is safe to persist once `rows` are stored
+    state: Optional[dict] = None
+
+
+def chunked(items: Iterable[dict], size: int = FEEDBACK_UPSERT_CHUNK_SIZE) -> Iterator[List[dict]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def content_hash(row: dict) -> str:
+    payload = json.dumps({col: row.get(col) for col in HASHED_COLUMNS}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _dedupe(rows: List[dict]) -> List[dict]:
+    """
+    Postgres refuses to update the same row twice in one ON CONFLICT statement,
+    so collapse duplicate keys inside a batch (last one wins).
+    """
+    unique = {}
+    for row in rows:
+        unique[(row["workspace_id"], row["external_id"], row["source_type"])] = row
+    return list(unique.values())
+
+
+def with_feedback_conflict_update(stmt):
+    """
+    ON CONFLICT (uq_feedback_unique) clause shared by every feedback loader:
+    refresh source columns, re-queue AI work when the text changed, and skip
+    rows whose content_hash is unchanged.
+    """
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        constraint="uq_feedback_unique",
+        set_={
+            **{col: excluded[col] for col in SOURCE_COLUMNS},
+            "content_hash": excluded.content_hash,
+            "is_processed": case(
+                (FeedbackItem.raw_content.is_distinct_from(excluded.raw_content), False),
+                else_=FeedbackItem.is_processed,
+            ),
+            "processing_error": case(
+                (FeedbackItem.raw_content.is_distinct_from(excluded.raw_content), None),
+                else_=FeedbackItem.processing_error,
+            ),
+            "processing_attempts": case(
+                (FeedbackItem.raw_content.is_distinct_from(excluded.raw_content), 0),
+                else_=FeedbackItem.processing_attempts,
+            ),
+            "embedded_at": case(
+                (FeedbackItem.raw_content.is_distinct_from(excluded.raw_content), None),
+                else_=FeedbackItem.embedded_at,
+            ),
+            "updated_at": func.now(),
+        },
+        where=FeedbackItem.content_hash.is_distinct_from(excluded.content_hash),
+    )
+
+
+async def reserve_feedback_quota(db: AsyncSession, workspace_id, source_type: str, external_ids: List[str]) -> int:
+    """
+    Lease one feedback_items unit per row that may be new. Near the plan limit
+    the rows that already exist (updates are free) are counted before giving
+    up; raises QuotaExceeded when the new rows do not fit. Returns units
+    leased; hand the unused ones back with quota_manager.give_back.
+    """
+    units = len(external_ids)
+    granted = await quota_manager.acquire(workspace_id, "feedback_items", units)
+    if granted < units:
+        existing = await db.scalar(
+            select(func.count()).select_from(FeedbackItem).where(
+                FeedbackItem.workspace_id == workspace_id,
+                FeedbackItem.source_type == source_type,
+                FeedbackItem.external_id.in_(external_ids),
+            )
+        )
+        if units - (existing or 0) > granted:
+            quota_manager.give_back(workspace_id, "feedback_items", granted)
+            raise QuotaExceeded(workspace_id, "feedback_items")
+    return granted
+
+
+async def resolve_created_at(db: AsyncSession, rows: List[dict]) -> Tuple[List[dict], Set[tuple]]:
+    """
+    created_at is part of uq_feedback_unique (it is the partition key), so an
+    item must keep the value it was first stored with: a stored row wins, then
+    the provider's timestamp. A new item without one is skipped rather than
+    stamped with the wall clock, which two concurrent syncs would read
+    differently (two partitions, two rows). Returns the rows to write and the
+    (workspace_id, source_type, external_id) keys already stored, which tell
+    inserts from updates: RETURNING xmax is not allowed on a partitioned table.
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["workspace_id"], row["source_type"]), []).append(row["external_id"])
+    stored = {}
+    for (workspace_id, source_type), external_ids in groups.items():
+        result = await db.execute(
+            select(FeedbackItem.external_id, func.min(FeedbackItem.created_at))
+            .where(
+                FeedbackItem.workspace_id == workspace_id,
+                FeedbackItem.source_type == source_type,
+                FeedbackItem.external_id.in_(external_ids),
+            )
+            .group_by(FeedbackItem.external_id)
+        )
+        stored.update(((workspace_id, source_type, external_id), created_at) for external_id, created_at in result)
+    kept = []
+    for row in rows:
+        key = (row["workspace_id"], row["source_type"], row["external_id"])
+        row["created_at"] = stored.get(key) or row.get("created_at")
+        if row["created_at"] is None:
+            logger.warning("skipping %s feedback %s: no created_at from the provider", row["source_type"], row["external_id"])
+            continue
+        kept.append(row)
+    return kept, {(str(workspace_id), source_type, external_id) for workspace_id, source_type, external_id in stored}
+
+
+async def upsert_feedback_batch(db: AsyncSession, rows: List[dict]) -> int:
+    """
+    Insert or update one chunk of feedback rows against uq_feedback_unique.
+    Rows whose content_hash is unchanged are left alone; rows whose text changed
+    are flagged for AI re-processing and re-embedding. New rows count against
+    the plan's max_feedback_items. Does not commit; returns rows written.
+    """
+    rows = _dedupe(rows)
+    if not rows:
+        return 0
+    groups = {}
+    for row in rows:
+        row.setdefault("content_hash", content_hash(row))
+        groups.setdefault((row["workspace_id"], row["source_type"]), []).append(row["external_id"])
+
+    leased = {}
+    try:
+        for (workspace_id, source_type), external_ids in groups.items():
+            leased[workspace_id] = leased.get(workspace_id, 0) + await reserve_feedback_quota(
+                db, workspace_id, source_type, external_ids
+            )
+        rows, existing = await resolve_created_at(db, rows)
+        written = []
+        if rows:
+            stmt = with_feedback_conflict_update(insert(FeedbackItem).values(rows)).returning(
+                FeedbackItem.workspace_id, FeedbackItem.source_type, FeedbackItem.external_id, FeedbackItem.id,
+            )
+            written = (await db.execute(stmt)).all()
+    except Exception:
+        for workspace_id, units in leased.items():
+            quota_manager.give_back(workspace_id, "feedback_items", units)
+        raise
+
+    for workspace_id, units in leased.items():
+        inserted = [
+            item_id for ws, source_type, external_id, item_id in written
+            if str(ws) == str(workspace_id) and (str(ws), source_type, external_id) not in existing
+        ]
+        quota_manager.give_back(workspace_id, "feedback_items", units - len(inserted))
+        changed = sum(1 for ws, _, _, _ in written if str(ws) == str(workspace_id))
+        if changed:
+            await publish(
+                db, workspace_id, "feedback.ingested",
+                count=changed, inserted=len(inserted), ids=[str(i) for i in inserted[:LIVE_MAX_IDS]],
+            )
+    return len(written)
+
+
+# ---------------------------
+# Integration sync bookkeeping
+# ---------------------------
+def get_sync_state(integration: Integration) -> dict:
+    return dict((integration.config or {}).get("sync_state") or {})
+
+
+def sync_claim(integration_id, stale_after: Optional[int] = None):
+    """
+    Atomically mark an integration "syncing"; RETURNING yields no row when a
+    run already holds it. Checking sync_status first and writing it later lets
+    two callers both start a sync. `stale_after` (seconds) lets a claim older
+    than that (a crashed run) be taken over.
+    """
+    now = datetime.utcnow()
+    free = Integration.sync_status.is_distinct_from("syncing")
+    if stale_after is not None:
+        free = or_(free, Integration.updated_at < now - timedelta(seconds=stale_after))
+    return (
+        update(Integration)
+        .where(Integration.id == integration_id, free)
+        .values(sync_status="syncing", last_error_message=None, updated_at=now)
+        .returning(Integration.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def claim_integration_sync(db: AsyncSession, integration_id, stale_after: Optional[int] = None) -> bool:
+    claimed = (await db.execute(sync_claim(integration_id, stale_after))).scalar() is not None
+    await db.commit()
+    return claimed
+
+
+async def release_sync_claim(db: AsyncSession, integration: Integration, error: Exception):
+    # a syncer that failed before run_feedback_sync took over (e.g. no token) would leave the claim behind
+    await db.rollback()
+    await db.refresh(integration)
+    if integration.sync_status == "syncing":
+        await set_sync_status(db, integration, "error", str(error))
+
+
+async def set_sync_status(db: AsyncSession, integration: Integration, status: str, error: Optional[str] = None):
+    integration.sync_status = status
+    integration.last_error_message = error
+    integration.updated_at = datetime.utcnow()
+    if status == "completed":
+        integration.last_sync_at = datetime.utcnow()
+    await publish(
+        db, integration.workspace_id, "integration.sync_status",
+        integration_id=integration.id, status=status, error=error,
+    )
+    await db.commit()
+
+
+async def _flush_chunk(db: AsyncSession, integration: Integration, rows: List[dict], state: Optional[dict]) -> int:
+    written = await upsert_feedback_batch(db, rows) if rows else 0
+    integration.total_items_synced = (integration.total_items_synced or 0) + written
+    integration.last_sync_at = datetime.utcnow()
+    integration.updated_at = datetime.utcnow()
+    if state is not None:
+        # reassign so SQLAlchemy notices the JSONB change; committed together with the rows
+        integration.config = {**(integration.config or {}), "sync_state": state}
+    await db.commit()
+    return written
+
+
+async def run_feedback_sync(
+    db: AsyncSession,
+    integration: Integration,
+    batches: AsyncIterator[SyncBatch],
+    full: bool = False,
+    chunk_size: int = FEEDBACK_UPSERT_CHUNK_SIZE,
+) -> int:
+    """
+    Drain provider batches into feedback_items, one chunk in memory at a time.
+    The watermark of the last batch in a chunk is committed with that chunk, so
+    an interrupted sync resumes where it stopped.
+    Returns the number of rows written.
+    """
+    if full:
+        integration.total_items_synced = 0
+    await set_sync_status(db, integration, "syncing")
+
+    written = 0
+    buffer: List[dict] = []
+    state = None
+    try:
+        async for batch in batches:
+            buffer.extend(batch.rows)
+            if batch.state is not None:
+                state = batch.state
+            if len(buffer) >= chunk_size:
+                written += await _flush_chunk(db, integration, buffer, state)
+                buffer, state = [], None
+
+        if buffer or state is not None:
+            written += await _flush_chunk(db, integration, buffer, state)
+
+        await set_sync_status(db, integration, "completed")
+    except Exception as e:
+        await db.rollback()
+        # rollback expired the instance; reload it (async) before it is read again
+        await db.refresh(integration)
+        await set_sync_status(db, integration, "error", str(e))
+        raise
+    finally:
+        # stop producers behind the iterator (e.g. concurrent channel walkers) promptly
+        aclose = getattr(batches, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    return written
@@ -0,0 +1,138 @@
+# feedback_query.py
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import Float, Select, cast, func, literal_column, select, tuple_
+
+from database.models import FeedbackItem
+
+# Columns a client may project; raw_content / cleaned_content are opt-in
+SELECTABLE_FIELDS = (
+    "id", "workspace_id", "integration_id", "source_type", "external_id", "source_url",
+    "customer_email", "customer_name", "raw_content", "cleaned_content",
+    "sentiment", "sentiment_score", "confidence_score", "primary_category", "categories",
+    "ai_summary", "priority_score", "keywords", "is_processed", "processed_at", "created_at",
+)
+DEFAULT_LIST_FIELDS = (
+    "id", "source_type", "external_id", "customer_name", "sentiment", "sentiment_score",
+    "primary_category", "ai_summary", "priority_score", "is_processed", "created_at",
+)
+# always selected: they form the keyset cursor
+KEYSET_FIELDS = ("id", "created_at")
+
+
+@dataclass
+class FeedbackFilters:
+    sentiment: Optional[str] = None
+    category: Optional[str] = None
+    processed: Optional[bool] = None
+    source_type: Optional[str] = None
+
+
+def resolve_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        requested = list(DEFAULT_LIST_FIELDS)
+    else:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = sorted(set(requested) - set(SELECTABLE_FIELDS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys([*KEYSET_FIELDS, *requested]))
+
+
+def apply_feedback_filters(query: Select, workspace_id, filters: FeedbackFilters) -> Select:
+    # equality filters line up with the idx_feedback_* (workspace_id, <col>, created_at, id) indexes
+    query = query.where(FeedbackItem.workspace_id == workspace_id)
+    if filters.sentiment:
+        query = query.where(FeedbackItem.sentiment == filters.sentiment)
+    if filters.category:
+        query = query.where(FeedbackItem.primary_category == filters.category)
+    if filters.processed is not None:
+        query = query.where(FeedbackItem.is_processed.is_(filters.processed))
+    if filters.source_type:
+        query = query.where(FeedbackItem.source_type == filters.source_type)
+    return query
+
+
+# ---------------------------
+# Keyset cursor over (created_at DESC, id DESC)
+# ---------------------------
+def encode_cursor(created_at: datetime, item_id) -> str:
+    raw = json.dumps({"c": created_at.isoformat(), "i": str(item_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["c"]), UUID(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset(query: Select, cursor: Optional[str], limit: int) -> Select:
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        # row-value comparison is index-driven: no OFFSET scan, O(limit) per page
+        query = query.where(tuple_(FeedbackItem.created_at, FeedbackItem.id) < tuple_(created_at, item_id))
+    # fetch one extra row to know whether another page exists
+    return query.order_by(FeedbackItem.created_at.desc(), FeedbackItem.id.desc()).limit(limit + 1)
+
+
+# ---------------------------
+# Full-text search over search_vector (GIN idx_feedback_search)
+# ---------------------------
+# a regconfig literal: asyncpg would otherwise bind it as varchar
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+SEARCH_RESULT_FIELDS = (
+    "id", "source_type", "external_id", "customer_name", "sentiment",
+    "primary_category", "ai_summary", "priority_score", "created_at",
+)
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+def encode_search_cursor(rank: float, item_id) -> str:
+    raw = json.dumps({"r": rank, "i": str(item_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(data["r"]), UUID(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def build_search_query(workspace_id, q: str, filters: FeedbackFilters, cursor: Optional[str], limit: int) -> Select:
+    """
+    Ranked page of matches with highlights. Ranking runs over every match (that is
+    inherent to relevance order), but ts_headline - which re-parses the document -
+    only runs on the limit + 1 rows of the page.
+    """
+    # websearch syntax: "exact phrase", -exclude, or
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    # real -> float8 so the cursor value round-trips exactly through JSON
+    rank = cast(func.ts_rank_cd(FeedbackItem.search_vector, tsquery), Float)
+
+    page = select(*(getattr(FeedbackItem, name) for name in SEARCH_RESULT_FIELDS), rank.label("rank")).where(
+        FeedbackItem.search_vector.op("@@")(tsquery)
+    )
+    page = apply_feedback_filters(page, workspace_id, filters)
+    if cursor:
+        last_rank, last_id = decode_search_cursor(cursor)
+        page = page.where(tuple_(rank, FeedbackItem.id) < tuple_(last_rank, last_id))
+    page = page.order_by(rank.desc(), FeedbackItem.id.desc()).limit(limit + 1).subquery("page")
+
+    document = select(func.coalesce(FeedbackItem.cleaned_content, FeedbackItem.raw_content)).where(
+        FeedbackItem.id == page.c.id
+    ).scalar_subquery()
+    highlight = func.ts_headline(SEARCH_CONFIG, document, tsquery, HEADLINE_OPTIONS).label("highlight")
+    return select(page, highlight).order_by(page.c.rank.desc(), page.c.id.desc())
@@ -0,0 +1,162 @@
+# http_client.py
+import asyncio
+import logging
+import os
+import random
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 5))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))  # seconds
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 60))  # seconds, also caps Retry-After
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+@dataclass(frozen=True)
+class ProviderSettings:
+    max_connections: int
+    max_keepalive: int
+    timeout: float
+    connect_timeout: float = 5.0
+    keepalive_expiry: float = 30.0
+
+
+def _settings(prefix: str, max_connections: int, timeout: float) -> ProviderSettings:
+    max_conn = int(os.getenv(f"{prefix}_HTTP_MAX_CONNECTIONS", max_connections))
+    return ProviderSettings(
+        max_connections=max_conn,
+        max_keepalive=int(os.getenv(f"{prefix}_HTTP_MAX_KEEPALIVE", max_conn)),
+        timeout=float(os.getenv(f"{prefix}_HTTP_TIMEOUT", timeout)),
+    )
+
+
+PROVIDER_SETTINGS: Dict[str, ProviderSettings] = {
+    "zendesk": _settings("ZENDESK", 20, 30),
+    "intercom": _settings("INTERCOM", 20, 30),
+    "slack": _settings("SLACK", 20, 30),
+    "default": _settings("DEFAULT", 10, 15),
+}
+
+
+# ---------------------------
+# Retry transport
+# ---------------------------
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _backoff(attempt: int) -> float:
+    # exponential backoff with full jitter
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the pooled transport and retries throttled / unavailable responses.
+    429s are retried for any method (the provider did not process the call) and
+    wait for Retry-After when present; 5xx gateway errors only for idempotent
+    methods; connect errors always, since nothing was sent.
+
+    A request may carry an "on_throttle" extension, called with the delay before
+    a 429 is retried, so callers sharing a rate budget can back off together.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_retries: int = HTTP_MAX_RETRIES):
+        self._transport = transport
+        self._max_retries = max_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self._transport.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= self._max_retries:
+                    raise
+                await asyncio.sleep(_backoff(attempt))
+                attempt += 1
+                continue
+
+            retryable = response.status_code == 429 or (
+                response.status_code in RETRY_STATUSES and request.method in IDEMPOTENT_METHODS
+            )
+            if not retryable or attempt >= self._max_retries:
+                return response
+
+            delay = _retry_after_seconds(response)
+            delay = min(delay, HTTP_BACKOFF_MAX) if delay is not None else _backoff(attempt)
+            logger.warning(
+                "%s %s returned %s, retrying in %.1fs (attempt %s/%s)",
+                request.method, request.url.host, response.status_code, delay, attempt + 1, self._max_retries,
+            )
+            on_throttle = request.extensions.get("on_throttle")
+            if on_throttle is not None and response.status_code == 429:
+                on_throttle(delay)
+            await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# ---------------------------
+# Client registry (one pooled client per provider, closed on app shutdown)
+# ---------------------------
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(provider: str) -> httpx.AsyncClient:
+    settings = PROVIDER_SETTINGS.get(provider) or PROVIDER_SETTINGS["default"]
+    limits = httpx.Limits(
+        max_connections=settings.max_connections,
+        max_keepalive_connections=settings.max_keepalive,
+        keepalive_expiry=settings.keepalive_expiry,
+    )
+    transport = httpx.AsyncHTTPTransport(http2=HTTP2_ENABLED, limits=limits, retries=0)
+    return httpx.AsyncClient(
+        transport=RetryTransport(transport),
+        timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+        headers={"User-Agent": "InsightOps/1.0"},
+    )
+
+
+def get_http_client(provider: str = "default") -> httpx.AsyncClient:
+    """
+    Shared client for a provider. Created lazily so workers and scripts can use
+    it without the FastAPI lifespan; the app closes them all on shutdown.
+    """
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = _clients[provider] = _build_client(provider)
+    return client
+
+
+async def close_http_clients() -> None:
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
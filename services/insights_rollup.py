@@ -0,0 +1,288 @@
+"""
+Incremental InsightsSnapshot rollups.
+
+Daily snapshots are recomputed only for days that gained or (re)processed
+feedback since the previous run; weekly and monthly snapshots are then summed
+from those daily rows, so a refresh never rescans a workspace's history.
+
+    python -m services.insights_rollup [--workspace <id>]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import cast, Date, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db import AsyncSessionLocal
+from database.models import FeedbackItem, InsightsSnapshot, Workspace
+from services.data_version import bump_data_version
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# re-scan this far behind the last run so rows committed late are not missed
+ROLLUP_WATERMARK_OVERLAP = int(os.getenv("ROLLUP_WATERMARK_OVERLAP", 300))  # seconds
+
+
+# ---------------------------
+# Periods
+# ---------------------------
+def week_bounds(day: date) -> Tuple[date, date]:
+    start = day - timedelta(days=day.weekday())
+    return start, start + timedelta(days=6)
+
+
+def month_bounds(day: date) -> Tuple[date, date]:
+    start = day.replace(day=1)
+    next_month = (start + timedelta(days=32)).replace(day=1)
+    return start, next_month - timedelta(days=1)
+
+
+def previous_period_start(period_type: str, start: date) -> date:
+    if period_type == "daily":
+        return start - timedelta(days=1)
+    if period_type == "weekly":
+        return start - timedelta(days=7)
+    return (start - timedelta(days=1)).replace(day=1)
+
+
+# ---------------------------
+# Aggregation helpers
+# ---------------------------
+def _pct_change(current: float, previous: Optional[float]) -> Optional[Decimal]:
+    if not previous:
+        return None
+    change = (current - previous) / previous * 100
+    # column is DECIMAL(5, 2)
+    return Decimal(str(round(max(min(change, 999.99), -999.99), 2)))
+
+
+def _net_sentiment(breakdown: Optional[dict]) -> Optional[float]:
+    breakdown = breakdown or {}
+    total = sum(breakdown.values())
+    if not total:
+        return None
+    return (breakdown.get("positive", 0) - breakdown.get("negative", 0)) / total * 100
+
+
+def _category_list(counts: Counter) -> List[dict]:
+    return [{"category": c, "count": n} for c, n in counts.most_common()]
+
+
+def _sum_snapshots(rows) -> Tuple[int, dict, Counter]:
+    total, sentiment, categories = 0, Counter(), Counter()
+    for row in rows:
+        total += row.total_feedback_count or 0
+        sentiment.update(row.sentiment_breakdown or {})
+        for entry in row.category_breakdown or []:
+            categories[entry["category"]] += entry["count"]
+    return total, dict(sentiment), categories
+
+
+# ---------------------------
+# Refresh
+# ---------------------------
+async def _changed_days(db: AsyncSession, workspace_id, since: Optional[datetime]) -> Set[date]:
+    created_day = cast(FeedbackItem.created_at, Date)
+    if since is None:
+        query = select(created_day).where(FeedbackItem.workspace_id == workspace_id).distinct()
+    else:
+        # created_at is the provider's timestamp (a backfill lands on old days), so
+        # probe on updated_at, which every write sets: inserts, re-syncs that
+        # changed the row, enrichment (idx_feedback_updated)
+        query = (
+            select(created_day)
+            .where(FeedbackItem.workspace_id == workspace_id, FeedbackItem.updated_at > since)
+            .distinct()
+        )
+    return {row[0] for row in await db.execute(query)}
+
+
+async def _daily_aggregates(db: AsyncSession, workspace_id, days: List[date]) -> Dict[date, dict]:
+    created_day = cast(FeedbackItem.created_at, Date)
+    query = (
+        select(
+            created_day.label("day"),
+            FeedbackItem.is_processed,
+            FeedbackItem.sentiment,
+            FeedbackItem.primary_category,
+            func.count().label("n"),
+        )
+        .where(
+            FeedbackItem.workspace_id == workspace_id,
+            FeedbackItem.created_at >= datetime.combine(min(days), datetime.min.time()),
+            FeedbackItem.created_at < datetime.combine(max(days) + timedelta(days=1), datetime.min.time()),
+            created_day.in_(days),
+        )
+        .group_by(created_day, FeedbackItem.is_processed, FeedbackItem.sentiment, FeedbackItem.primary_category)
+    )
+    aggregates = {day: {"total": 0, "sentiment": Counter(), "categories": Counter()} for day in days}
+    for row in await db.execute(query):
+        agg = aggregates[row.day]
+        agg["total"] += row.n
+        if row.is_processed:
+            agg["sentiment"][row.sentiment or "unknown"] += row.n
+            agg["categories"][row.primary_category or "uncategorized"] += row.n
+    return aggregates
+
+
+# plain column rows (not ORM entities) so reads after the upserts are never stale
+_SNAPSHOT_COLUMNS = (
+    InsightsSnapshot.period_start,
+    InsightsSnapshot.total_feedback_count,
+    InsightsSnapshot.sentiment_breakdown,
+    InsightsSnapshot.category_breakdown,
+)
+
+
+async def _previous_totals(db: AsyncSession, workspace_id, period_type: str, starts: Iterable[date]) -> dict:
+    previous = {previous_period_start(period_type, s): s for s in starts}
+    rows = await db.execute(
+        select(*_SNAPSHOT_COLUMNS).where(
+            InsightsSnapshot.workspace_id == workspace_id,
+            InsightsSnapshot.period_type == period_type,
+            InsightsSnapshot.period_start.in_(list(previous)),
+        )
+    )
+    return {previous[row.period_start]: row for row in rows}
+
+
+async def _upsert_snapshots(db: AsyncSession, rows: List[dict]):
+    if not rows:
+        return
+    stmt = insert(InsightsSnapshot).values(rows)
+    excluded = stmt.excluded
+    await db.execute(stmt.on_conflict_do_update(
+        constraint="uq_insight_period",
+        set_={
+            col: excluded[col]
+            for col in (
+                "period_end", "total_feedback_count", "sentiment_breakdown", "category_breakdown",
+                "sentiment_change", "volume_change", "generation_time_ms", "generated_at",
+            )
+        },
+    ))
+
+
+def _snapshot_row(workspace_id, period_type, start, end, total, sentiment, categories, previous, run_at, started) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "workspace_id": workspace_id,
+        "period_type": period_type,
+        "period_start": start,
+        "period_end": end,
+        "total_feedback_count": total,
+        "sentiment_breakdown": sentiment,
+        "category_breakdown": _category_list(categories),
+        "volume_change": _pct_change(total, previous.total_feedback_count if previous else None),
+        "sentiment_change": _sentiment_change(sentiment, previous),
+        "generation_time_ms": int((time.perf_counter() - started) * 1000),
+        "generated_at": run_at,
+    }
+
+
+def _sentiment_change(sentiment: dict, previous) -> Optional[Decimal]:
+    current, before = _net_sentiment(sentiment), _net_sentiment(previous.sentiment_breakdown if previous else None)
+    if current is None or before is None:
+        return None
+    # percentage-point change of (positive - negative) share
+    return Decimal(str(round(max(min(current - before, 999.99), -999.99), 2)))
+
+
+async def refresh_workspace_rollups(db: AsyncSession, workspace_id) -> int:
+    """
+    Bring the workspace's daily/weekly/monthly snapshots up to date.
+    Returns the number of days recomputed.
+    """
+    started = time.perf_counter()
+    run_at = datetime.utcnow()
+
+    last_run = await db.scalar(
+        select(func.max(InsightsSnapshot.generated_at)).where(
+            InsightsSnapshot.workspace_id == workspace_id, InsightsSnapshot.period_type == "daily"
+        )
+    )
+    since = last_run - timedelta(seconds=ROLLUP_WATERMARK_OVERLAP) if last_run else None
+    days = sorted(await _changed_days(db, workspace_id, since))
+    if not days:
+        return 0
+
+    # daily: recomputed from feedback_items for the touched days only
+    aggregates = await _daily_aggregates(db, workspace_id, days)
+    previous = await _previous_totals(db, workspace_id, "daily", days)
+    await _upsert_snapshots(db, [
+        _snapshot_row(
+            workspace_id, "daily", day, day, agg["total"], dict(agg["sentiment"]), agg["categories"],
+            previous.get(day), run_at, started,
+        )
+        for day, agg in aggregates.items()
+    ])
+
+    # weekly / monthly: summed from the daily snapshots
+    for period_type, bounds in (("weekly", week_bounds), ("monthly", month_bounds)):
+        periods = {bounds(day) for day in days}
+        previous = await _previous_totals(db, workspace_id, period_type, [s for s, _ in periods])
+        rows = []
+        for start, end in sorted(periods):
+            dailies = await db.execute(
+                select(*_SNAPSHOT_COLUMNS).where(
+                    InsightsSnapshot.workspace_id == workspace_id,
+                    InsightsSnapshot.period_type == "daily",
+                    InsightsSnapshot.period_start.between(start, end),
+                )
+            )
+            total, sentiment, categories = _sum_snapshots(dailies)
+            rows.append(_snapshot_row(
+                workspace_id, period_type, start, end, total, sentiment, categories,
+                previous.get(start), run_at, started,
+            ))
+        await _upsert_snapshots(db, rows)
+
+    await bump_data_version(db, [workspace_id])
+    await db.commit()
+    return len(days)
+
+
+async def refresh_all_rollups() -> int:
+    async with AsyncSessionLocal() as db:
+        workspace_ids = (await db.scalars(select(Workspace.id))).all()
+
+    refreshed = 0
+    for workspace_id in workspace_ids:
+        async with AsyncSessionLocal() as db:
+            try:
+                refreshed += await refresh_workspace_rollups(db, workspace_id)
+            except Exception:
+                await db.rollback()
+                logger.exception("Insights rollup failed for workspace %s", workspace_id)
+    return refreshed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh InsightsSnapshot rollups")
+    parser.add_argument("--workspace", default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        if args.workspace:
+            async with AsyncSessionLocal() as db:
+                return await refresh_workspace_rollups(db, uuid.UUID(args.workspace))
+        return await refresh_all_rollups()
+
+    logger.info("recomputed %s workspace-days", asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
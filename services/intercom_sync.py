@@ -0,0 +1,185 @@
+# intercom_sync.py
+import html
+import os
+import re
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Integration
+from services.feedback_ingest import (
+    FEEDBACK_UPSERT_CHUNK_SIZE,
+    SyncBatch,
+    get_sync_state,
+    run_feedback_sync,
+)
+from services.http_client import get_http_client
+
+load_dotenv()
+
+INTERCOM_API_BASE_URL = os.environ.get("INTERCOM_API_BASE_URL", "https://api.intercom.io")
+INTERCOM_API_VERSION = os.environ.get("INTERCOM_API_VERSION", "2.11")
+INTERCOM_PAGE_SIZE = int(os.getenv("INTERCOM_PAGE_SIZE", 150))
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+@dataclass
+class IntercomPage:
+    conversations: List[dict] = field(default_factory=list)
+    cursor: Optional[str] = None
+
+
+def intercom_base_url(integration: Integration) -> str:
+    return ((integration.config or {}).get("base_url") or INTERCOM_API_BASE_URL).rstrip("/")
+
+
+def _headers(access_token: str) -> dict:
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "Intercom-Version": INTERCOM_API_VERSION,
+    }
+
+
+async def fetch_app_id(client: httpx.AsyncClient, access_token: str) -> Optional[str]:
+    """The app's id_code: webhook payloads carry it as app_id."""
+    resp = await client.get(f"{INTERCOM_API_BASE_URL}/me", headers=_headers(access_token))
+    if resp.status_code != 200:
+        return None
+    return (resp.json().get("app") or {}).get("id_code")
+
+
+# ---------------------------
+# Pagination
+# ---------------------------
+async def iter_conversation_pages(
+    client: httpx.AsyncClient,
+    base_url: str,
+    access_token: str,
+    updated_since: int = 0,
+    cursor: Optional[str] = None,
+) -> AsyncIterator[IntercomPage]:
+    """
+    Walk POST /conversations/search for conversations updated after
+    `updated_since` (unix seconds), oldest first, using starting_after cursors.
+    """
+    body = {
+        "query": {"field": "updated_at", "operator": ">", "value": updated_since},
+        "sort": {"field": "updated_at", "order": "ascending"},
+        "pagination": {"per_page": INTERCOM_PAGE_SIZE},
+    }
+
+    while True:
+        if cursor:
+            body["pagination"]["starting_after"] = cursor
+        resp = await client.post(f"{base_url}/conversations/search", json=body, headers=_headers(access_token))
+        resp.raise_for_status()
+        data = resp.json()
+
+        cursor = (((data.get("pages") or {}).get("next")) or {}).get("starting_after")
+        yield IntercomPage(conversations=data.get("conversations", []), cursor=cursor)
+
+        if not cursor:
+            return
+
+
+# ---------------------------
+# Mapping
+# ---------------------------
+def _strip_html(value: Optional[str]) -> str:
+    return html.unescape(_TAG_RE.sub(" ", value or "")).strip()
+
+
+def _from_unix(value) -> Optional[datetime]:
+    try:
+        return datetime.utcfromtimestamp(float(value)) if value else None
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def conversation_to_feedback(conversation: dict, workspace_id, integration_id) -> dict:
+    source = conversation.get("source") or {}
+    author = source.get("author") or {}
+    subject = _strip_html(source.get("subject") or conversation.get("title"))
+    body = _strip_html(source.get("body"))
+    tags = [t.get("name") for t in ((conversation.get("tags") or {}).get("tags") or [])]
+
+    return {
+        "id": uuid.uuid4(),
+        "workspace_id": workspace_id,
+        "integration_id": integration_id,
+        "source_type": "intercom",
+        "external_id": str(conversation["id"]),
+        "source_url": source.get("url"),
+        "customer_email": author.get("email"),
+        "customer_name": author.get("name"),
+        "raw_content": f"{subject}\n\n{body}".strip() if subject else body,
+        "source_metadata": {
+            "state": conversation.get("state"),
+            "priority": conversation.get("priority"),
+            "tags": tags,
+            "channel": source.get("type"),
+            "author_id": author.get("id"),
+            "updated_at": conversation.get("updated_at"),
+        },
+        # None when missing: the stored value is kept, a new item is skipped (dedupe key)
+        "created_at": _from_unix(conversation.get("created_at")),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+# ---------------------------
+# Sync engine
+# ---------------------------
+async def _batches(client, integration, base_url, access_token, state: dict) -> AsyncIterator[SyncBatch]:
+    updated_since = int(state.get("updated_since") or 0)
+    high_water = int(state.get("high_water") or updated_since)
+    pages = iter_conversation_pages(
+        client, base_url, access_token, updated_since=updated_since, cursor=state.get("cursor")
+    )
+    async for page in pages:
+        rows = [
+            conversation_to_feedback(c, integration.workspace_id, integration.id)
+            for c in page.conversations
+            if c.get("id")
+        ]
+        high_water = max([high_water, *(c.get("updated_at") or 0 for c in page.conversations)])
+        if page.cursor:
+            # mid-walk: keep the query window and remember where to resume
+            state = {"updated_since": updated_since, "cursor": page.cursor, "high_water": high_water}
+        else:
+            # walk finished: the next run only needs conversations updated after what we saw
+            state = {"updated_since": high_water}
+        yield SyncBatch(rows=rows, state=state)
+
+
+async def sync_intercom_integration(
+    db: AsyncSession,
+    integration: Integration,
+    client: Optional[httpx.AsyncClient] = None,
+    incremental: bool = True,
+    chunk_size: int = FEEDBACK_UPSERT_CHUNK_SIZE,
+) -> int:
+    """
+    Stream conversations into feedback_items. Incremental mode only asks Intercom
+    for conversations updated after the stored watermark; full mode starts at 0.
+    Returns the number of rows written.
+    """
+    access_token = (integration.config or {}).get("access_token")
+    if not access_token:
+        raise ValueError("Intercom integration has no access token")
+
+    base_url = intercom_base_url(integration)
+    client = client or get_http_client("intercom")
+
+    state = get_sync_state(integration) if incremental else {}
+    batches = _batches(client, integration, base_url, access_token, state)
+
+    return await run_feedback_sync(db, integration, batches, full=not incremental, chunk_size=chunk_size)
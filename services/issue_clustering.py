@@ -0,0 +1,174 @@
+"""
+Near-duplicate clustering of feedback into InsightsSnapshot.top_issues.
+
+For each weekly/monthly period the workspace's embedded feedback is pulled from
+its Qdrant collection, every item's nearest neighbours above
+ISSUE_SIMILARITY_THRESHOLD are fetched in batched queries, and items are grouped
+greedily: the item with the most close neighbours leads a cluster containing
+its not-yet-assigned neighbours. Leaders are dense points, so unlike
+single-linkage a chain of loosely related tickets cannot merge into one blob.
+
+Run after the rollups so the snapshot rows exist:
+
+    python -m services.issue_clustering [--workspace <id>] [--date 2024-05-01]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db import AsyncSessionLocal
+from database.models import FeedbackItem, InsightsSnapshot, Workspace
+from services.data_version import bump_data_version
+from services.insights_rollup import month_bounds, week_bounds
+from services.vector_index import neighbors_in_period, scroll_period
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ISSUE_SIMILARITY_THRESHOLD = float(os.getenv("ISSUE_SIMILARITY_THRESHOLD", 0.85))  # cosine
+ISSUE_NEIGHBORS = int(os.getenv("ISSUE_NEIGHBORS", 50))  # neighbours fetched per item
+ISSUE_MIN_CLUSTER_SIZE = int(os.getenv("ISSUE_MIN_CLUSTER_SIZE", 3))
+ISSUE_TOP_N = int(os.getenv("ISSUE_TOP_N", 10))
+ISSUE_QUERY_BATCH = int(os.getenv("ISSUE_QUERY_BATCH", 64))  # neighbour queries per round trip
+ISSUE_SAMPLE_IDS = 10  # feedback ids kept per issue for drill-down
+
+
+# ---------------------------
+# Clustering
+# ---------------------------
+def greedy_clusters(neighbors: Dict[str, List[Tuple[str, float]]], min_size: int = ISSUE_MIN_CLUSTER_SIZE) -> List[List[str]]:
+    """Leader clustering over a kNN graph; returns clusters largest first, leader first."""
+    assigned = set()
+    clusters = []
+    for leader in sorted(neighbors, key=lambda pid: (-len(neighbors[pid]), pid)):
+        if leader in assigned:
+            continue
+        members = [leader] + [pid for pid, _ in neighbors[leader] if pid not in assigned and pid != leader]
+        assigned.update(members)
+        if len(members) >= min_size:
+            clusters.append(members)
+    return sorted(clusters, key=len, reverse=True)
+
+
+async def _neighbor_graph(workspace_id, vectors: Dict[str, List[float]], start: datetime, end: datetime) -> dict:
+    ids = list(vectors)
+    graph = {}
+    for i in range(0, len(ids), ISSUE_QUERY_BATCH):
+        chunk = ids[i:i + ISSUE_QUERY_BATCH]
+        results = await neighbors_in_period(
+            workspace_id, [vectors[pid] for pid in chunk], start, end, ISSUE_NEIGHBORS, ISSUE_SIMILARITY_THRESHOLD
+        )
+        graph.update(zip(chunk, results))
+    return graph
+
+
+async def _describe(db: AsyncSession, workspace_id, clusters: List[List[str]]) -> List[dict]:
+    member_ids = [uuid.UUID(pid) for cluster in clusters for pid in cluster]
+    rows = {
+        str(row.id): row
+        for row in await db.execute(
+            select(
+                FeedbackItem.id, FeedbackItem.ai_summary, FeedbackItem.raw_content,
+                FeedbackItem.sentiment, FeedbackItem.primary_category,
+            ).where(FeedbackItem.workspace_id == workspace_id, FeedbackItem.id.in_(member_ids))
+        )
+    }
+    issues = []
+    for cluster in clusters:
+        members = [rows[pid] for pid in cluster if pid in rows]  # rows deleted since embedding drop out
+        if len(members) < ISSUE_MIN_CLUSTER_SIZE:
+            continue
+        leader = members[0]
+        categories = Counter(m.primary_category or "uncategorized" for m in members)
+        issues.append({
+            "issue": leader.ai_summary or (leader.raw_content or "")[:160],
+            "description": f"{len(members)} similar feedback items",
+            "count": len(members),
+            "primary_category": categories.most_common(1)[0][0],
+            "sentiment_breakdown": dict(Counter(m.sentiment or "unknown" for m in members)),
+            "representative_id": str(leader.id),
+            "feedback_ids": [str(m.id) for m in members[:ISSUE_SAMPLE_IDS]],
+        })
+    return issues
+
+
+async def cluster_period(db: AsyncSession, workspace_id, period_type: str, start: date, end: date) -> int:
+    """Recompute top_issues for one snapshot period. Returns the number of issues stored."""
+    start_at = datetime.combine(start, datetime.min.time())
+    end_at = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+    vectors = await scroll_period(workspace_id, start_at, end_at)
+    clusters = greedy_clusters(await _neighbor_graph(workspace_id, vectors, start_at, end_at)) if vectors else []
+    issues = (await _describe(db, workspace_id, clusters[:ISSUE_TOP_N * 2]))[:ISSUE_TOP_N] if clusters else []
+
+    result = await db.execute(
+        update(InsightsSnapshot)
+        .where(
+            InsightsSnapshot.workspace_id == workspace_id,
+            InsightsSnapshot.period_type == period_type,
+            InsightsSnapshot.period_start == start,
+            # unchanged issues must not bump data_version (it would void cached answers hourly)
+            InsightsSnapshot.top_issues.is_distinct_from(issues),
+        )
+        .values(top_issues=issues)
+    )
+    if result.rowcount:
+        await bump_data_version(db, [workspace_id])
+    await db.commit()
+    if not result.rowcount:
+        logger.info("%s top issues for %s starting %s unchanged (or no snapshot yet)", period_type, workspace_id, start)
+    return len(issues)
+
+
+async def cluster_workspace(db: AsyncSession, workspace_id, day: Optional[date] = None) -> int:
+    day = day or datetime.utcnow().date()
+    stored = 0
+    for period_type, bounds in (("weekly", week_bounds), ("monthly", month_bounds)):
+        start, end = bounds(day)
+        stored += await cluster_period(db, workspace_id, period_type, start, end)
+    return stored
+
+
+async def cluster_all_workspaces(day: Optional[date] = None) -> int:
+    async with AsyncSessionLocal() as db:
+        workspace_ids = (await db.scalars(select(Workspace.id))).all()
+
+    stored = 0
+    for workspace_id in workspace_ids:
+        async with AsyncSessionLocal() as db:
+            try:
+                stored += await cluster_workspace(db, workspace_id, day)
+            except Exception:
+                await db.rollback()
+                logger.exception("Issue clustering failed for workspace %s", workspace_id)
+    return stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate feedback into top issues")
+    parser.add_argument("--workspace", default=None)
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="day inside the periods to cluster")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        if args.workspace:
+            async with AsyncSessionLocal() as db:
+                return await cluster_workspace(db, uuid.UUID(args.workspace), args.date)
+        return await cluster_all_workspaces(args.date)
+
+    logger.info("stored %s issues", asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# live_events.py
+"""
+Live workspace events over Postgres LISTEN/NOTIFY.
+
+Writers call publish() inside their transaction; Postgres delivers the
+notification on commit (never for rolled-back work). Each process holds ONE
+listening connection (LiveEventHub) and fans notifications out in memory to
+per-subscriber bounded queues, so thousands of dashboard streams cost no
+extra database connections or queries. The listener never waits on a
+subscriber: a client whose queue is full is evicted (told so, then
+disconnected) and can reconnect and refetch, instead of slowing everyone.
+
+LISTEN needs a session-level connection: set LIVE_DATABASE_URL to a direct
+Postgres URL when PgBouncer runs in transaction mode.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set
+
+import asyncpg
+from dotenv import load_dotenv
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db import ASYNC_DATABASE_URL, _async_connect_args, _async_database_url
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LIVE_CHANNEL = os.getenv("LIVE_CHANNEL", "workspace_events")
+LIVE_DATABASE_URL = os.getenv("LIVE_DATABASE_URL")
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", 100))  # events buffered per subscriber before eviction
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", 5000))  # per process
+LIVE_HEARTBEAT_INTERVAL = float(os.getenv("LIVE_HEARTBEAT_INTERVAL", 15))  # seconds
+LIVE_RECONNECT_DELAY = float(os.getenv("LIVE_RECONNECT_DELAY", 2))  # seconds, doubled up to 30
+LIVE_MAX_IDS = 50  # NOTIFY payloads are capped at 8000 bytes
+LIVE_MAX_PAYLOAD = 7900  # bytes; pg_notify raises "payload string too long" past 8000
+
+
+# ---------------------------
+# Publishing (inside the writer's transaction)
+# ---------------------------
+def _payload(workspace_id, event: str, data: dict) -> str:
+    """
+    JSON for pg_notify, under LIVE_MAX_PAYLOAD. Free text (an error message)
+    is what grows unbounded: the longest string field is halved until it fits.
+    """
+    message = {"workspace_id": str(workspace_id), "type": event, **data}
+    while True:
+        payload = json.dumps(message, default=str)
+        if len(payload.encode("utf-8")) <= LIVE_MAX_PAYLOAD:
+            return payload
+        texts = [k for k in data if isinstance(message[k], str) and len(message[k]) > 16]
+        if not texts:
+            # nothing left to shorten: subscribers refetch on a bare event
+            return json.dumps({"workspace_id": str(workspace_id), "type": event, "truncated": True})
+        key = max(texts, key=lambda k: len(message[k]))
+        message[key] = message[key][: len(message[key]) // 2] + "..."
+
+
+async def publish(db: AsyncSession, workspace_id, event: str, **data):
+    """Queue a notification for workspace subscribers; sent when `db` commits."""
+    await db.execute(select(func.pg_notify(LIVE_CHANNEL, _payload(workspace_id, event, data))))
+
+
+# ---------------------------
+# Fan-out
+# ---------------------------
+@dataclass(eq=False)
+class Subscriber:
+    workspace_id: str
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=LIVE_QUEUE_SIZE))
+    evicted: bool = False
+
+
+_CLOSED = object()  # queue sentinel: stop streaming
+
+
+class LiveEventHub:
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscriber]] = defaultdict(set)
+        self._count = 0
+        self._conn: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        self.evictions = 0
+
+    async def _connect(self) -> asyncpg.Connection:
+        if LIVE_DATABASE_URL:
+            url, connect_args = _async_database_url(LIVE_DATABASE_URL)
+        else:
+            url, connect_args = ASYNC_DATABASE_URL, _async_connect_args
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return await asyncpg.connect(dsn, ssl=connect_args.get("ssl"))
+
+    # listener connection
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("ignoring malformed %s payload", channel)
+            return
+        self.broadcast(event.get("workspace_id"), event)
+
+    def _on_terminate(self, connection):
+        self._connected.clear()
+
+    async def _listen(self):
+        delay = LIVE_RECONNECT_DELAY
+        reconnect = False
+        while True:
+            try:
+                self._conn = await self._connect()
+                self._conn.add_termination_listener(self._on_terminate)
+                await self._conn.add_listener(LIVE_CHANNEL, self._on_notify)
+                self._connected.set()
+                delay = LIVE_RECONNECT_DELAY
+                if reconnect:
+                    # notifications sent while disconnected are lost: clients refetch
+                    self.broadcast_all({"type": "resync"})
+                reconnect = True
+                while self._connected.is_set() and not self._conn.is_closed():
+                    await asyncio.sleep(LIVE_HEARTBEAT_INTERVAL)
+                    await self._conn.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("live event listener failed; reconnecting in %.0fs", delay)
+            finally:
+                self._connected.clear()
+                if self._conn is not None and not self._conn.is_closed():
+                    self._conn.terminate()
+                self._conn = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscribers in list(self._subscribers.values()):
+            for subscriber in list(subscribers):
+                self._close(subscriber)
+
+    # subscribers
+    def subscribe(self, workspace_id) -> Optional[Subscriber]:
+        """None when this process is at LIVE_MAX_SUBSCRIBERS."""
+        if self._count >= LIVE_MAX_SUBSCRIBERS:
+            return None
+        self.start()
+        subscriber = Subscriber(str(workspace_id))
+        self._subscribers[subscriber.workspace_id].add(subscriber)
+        self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.workspace_id)
+        if subscribers and subscriber in subscribers:
+            subscribers.discard(subscriber)
+            self._count -= 1
+            if not subscribers:
+                del self._subscribers[subscriber.workspace_id]
+
+    def _close(self, subscriber: Subscriber):
+        # drop what is buffered so the sentinel fits and is read next
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(_CLOSED)
+        self.unsubscribe(subscriber)
+
+    def broadcast(self, workspace_id, event: dict):
+        for subscriber in list(self._subscribers.get(workspace_id, ())):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscriber.evicted = True
+                self.evictions += 1
+                self._close(subscriber)
+
+    def broadcast_all(self, event: dict):
+        for workspace_id in list(self._subscribers):
+            self.broadcast(workspace_id, event)
+
+    def status(self) -> dict:
+        return {
+            "connected": self._connected.is_set(),
+            "subscribers": self._count,
+            "workspaces": len(self._subscribers),
+            "evictions": self.evictions,
+        }
+
+
+hub = LiveEventHub()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_events(subscriber: Subscriber):
+    """SSE frames for one subscriber until it is evicted or the client disconnects."""
+    try:
+        yield _sse("ready", {"workspace_id": subscriber.workspace_id})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=LIVE_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                # comment line: keeps proxies from closing an idle stream
+                yield ": ping\n\n"
+                continue
+            if event is _CLOSED:
+                if subscriber.evicted:
+                    yield _sse("evicted", {"reason": "client too slow; reconnect and refetch"})
+                return
+            yield _sse(event.get("type", "message"), event)
+    finally:
+        hub.unsubscribe(subscriber)
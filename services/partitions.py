@@ -0,0 +1,416 @@
+# partitions.py
+"""
+Partition maintenance and retention for feedback_items (monthly, created_at)
+and webhook_events (daily, received_at).
+
+Both parents also have a DEFAULT partition that catches rows outside every
+dated partition: historic items from a first sync, or timestamps beyond the
+pre-created range. Inserts therefore never fail for want of a partition.
+maintain_partitions() pre-creates the coming periods and moves any periods
+found in the default partition into partitions of their own.
+
+Retention drops whole partitions wherever that is possible, so no DELETE has
+to scan them:
+- webhook_events: days older than WEBHOOK_RETENTION_DAYS, unless the day still
+  holds unprocessed events (queued, backing off, or dead letters); such a day
+  only loses its processed rows.
+- feedback_items: months older than the longest finite retention of any
+  workspace. A workspace's retention is settings["retention_days"], falling
+  back to FEEDBACK_RETENTION_DAYS; 0 keeps its data forever, and that is the
+  default. A month holding rows of a workspace that keeps its data forever is
+  not dropped. A workspace with a finite retention has its older rows that
+  were not dropped deleted per workspace, in batches on the
+  (workspace_id, created_at, id) index of the months involved.
+
+Dropped or deleted feedback is also removed from plan usage
+(current_feedback_count), analysis jobs, and the vector index, and it bumps
+the workspace data_version.
+
+New partitions are filled while still detached, in small batches, and then
+attached, which holds only a brief lock on the default partition. Dropping a
+partition takes a brief ACCESS EXCLUSIVE lock on the parent. Lock waits are
+capped at PARTITION_LOCK_TIMEOUT; anything that times out is retried on the
+next run.
+"""
+import logging
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import Table, delete, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db import AsyncSessionLocal
+from database.models import AIAnalysisJob, FeedbackItem, WebhookEvent, Workspace
+from services.data_version import bump_data_version
+from services.vector_index import delete_vectors_before
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_PARTITIONS_AHEAD = int(os.getenv("FEEDBACK_PARTITIONS_AHEAD", 3))  # months
+WEBHOOK_PARTITIONS_AHEAD = int(os.getenv("WEBHOOK_PARTITIONS_AHEAD", 7))  # days
+# for workspaces without settings["retention_days"]; the default, 0, keeps feedback forever
+FEEDBACK_RETENTION_DAYS = int(os.getenv("FEEDBACK_RETENTION_DAYS", 0))
+WEBHOOK_RETENTION_DAYS = int(os.getenv("WEBHOOK_RETENTION_DAYS", 7))
+RETENTION_DELETE_BATCH = int(os.getenv("RETENTION_DELETE_BATCH", 5000))
+PARTITION_MOVE_BATCH = int(os.getenv("PARTITION_MOVE_BATCH", 5000))  # rows moved out of the default per transaction
+PARTITION_LOCK_TIMEOUT = os.getenv("PARTITION_LOCK_TIMEOUT", "5s")
+
+
+@dataclass(frozen=True)
+class PartitionSpec:
+    table: Table
+    column: str
+    unit: str  # month | day
+    ahead: int
+
+    @property
+    def name(self) -> str:
+        return self.table.name
+
+    @property
+    def default(self) -> str:
+        return f"{self.table.name}_default"
+
+    def period_start(self, value: datetime) -> date:
+        if self.unit == "month":
+            return date(value.year, value.month, 1)
+        return date(value.year, value.month, value.day)
+
+    def next_period(self, start: date) -> date:
+        if self.unit == "month":
+            return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        return start + timedelta(days=1)
+
+    def partition_name(self, start: date) -> str:
+        return f"{self.name}_p{start:%Y_%m}" if self.unit == "month" else f"{self.name}_p{start:%Y_%m_%d}"
+
+    def parse(self, partition: str) -> Optional[date]:
+        """Period start of a dated partition; None for the default partition or foreign tables."""
+        match = re.fullmatch(rf"{self.name}_p(\d{{4}})_(\d{{2}})(?:_(\d{{2}}))?", partition)
+        if not match:
+            return None
+        year, month, day = match.groups()
+        if (day is None) != (self.unit == "month"):
+            return None
+        return date(int(year), int(month), int(day or 1))
+
+
+FEEDBACK = PartitionSpec(FeedbackItem.__table__, "created_at", "month", FEEDBACK_PARTITIONS_AHEAD)
+WEBHOOKS = PartitionSpec(WebhookEvent.__table__, "received_at", "day", WEBHOOK_PARTITIONS_AHEAD)
+PARTITIONED = (FEEDBACK, WEBHOOKS)
+
+
+# ---------------------------
+# Creation
+# ---------------------------
+async def list_partitions(db: AsyncSession, spec: PartitionSpec) -> Dict[date, str]:
+    rows = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": spec.name},
+    )
+    partitions = {}
+    for (name,) in rows:
+        start = spec.parse(name)
+        if start is not None:
+            partitions[start] = name
+    return partitions
+
+
+def _insert_columns(spec: PartitionSpec) -> str:
+    # generated columns (search_vector) are recomputed on insert
+    return ", ".join(c.name for c in spec.table.columns if c.computed is None)
+
+
+def _bounds(spec: PartitionSpec, start: date) -> str:
+    # dates we computed ourselves: DDL cannot take bind parameters
+    end = spec.next_period(start)
+    return f"{spec.column} >= '{start.isoformat()}' AND {spec.column} < '{end.isoformat()}'"
+
+
+async def _move_from_default(db: AsyncSession, spec: PartitionSpec, start: date, limit: Optional[int]) -> int:
+    """Move up to `limit` rows of the period from the default partition into its (detached) table. Commits."""
+    columns = _insert_columns(spec)
+    picked = f"SELECT ctid FROM {spec.default} WHERE {_bounds(spec, start)}"
+    if limit:
+        picked += f" LIMIT {int(limit)}"
+    moved = await db.execute(text(
+        f"WITH moved AS (DELETE FROM {spec.default} WHERE ctid = ANY(ARRAY({picked})) RETURNING {columns}) "
+        f"INSERT INTO {spec.partition_name(start)} ({columns}) SELECT {columns} FROM moved"
+    ))
+    return moved.rowcount
+
+
+async def prepare_partition(db: AsyncSession, spec: PartitionSpec, start: date) -> int:
+    """
+    Create the period's table standalone (not yet a partition) and move its rows
+    out of the default partition in PARTITION_MOVE_BATCH batches, one short
+    transaction each: no lock on the parent. The CHECK constraint lets ATTACH
+    skip validating the table. Returns rows moved.
+    """
+    name = spec.partition_name(start)
+    await db.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} "
+        f"(LIKE {spec.name} INCLUDING ALL, CONSTRAINT {name}_bounds CHECK ({spec.column} IS NOT NULL AND {_bounds(spec, start)}))"
+    ))
+    await db.commit()
+    moved = 0
+    while True:
+        batch = await _move_from_default(db, spec, start, PARTITION_MOVE_BATCH)
+        await db.commit()
+        moved += batch
+        if batch < PARTITION_MOVE_BATCH:
+            return moved
+
+
+async def attach_partition(db: AsyncSession, spec: PartitionSpec, start: date):
+    """
+    Attach a prepared table. Rows of the period that reached the default since
+    prepare_partition are moved first; the default is nearly empty by now, so
+    the scan ATTACH makes of it (under its lock) is short. The parent itself
+    is only held in SHARE UPDATE EXCLUSIVE mode. Commits.
+    """
+    name = spec.partition_name(start)
+    end = spec.next_period(start)
+    await db.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+    await db.execute(text(f"LOCK TABLE {spec.default} IN ACCESS EXCLUSIVE MODE"))
+    await _move_from_default(db, spec, start, None)
+    await db.execute(text(
+        f"ALTER TABLE {spec.name} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    await db.commit()
+
+
+async def ensure_partitions(db: AsyncSession, spec: PartitionSpec, now: Optional[datetime] = None) -> List[str]:
+    """Create the current and `spec.ahead` coming partitions, plus one per period found in the default."""
+    now = now or datetime.utcnow()
+    existing = await list_partitions(db, spec)
+    wanted = set()
+    start = spec.period_start(now)
+    for _ in range(spec.ahead + 1):
+        wanted.add(start)
+        start = spec.next_period(start)
+    stray = await db.execute(
+        text(f"SELECT DISTINCT date_trunc('{spec.unit}', {spec.column}) FROM {spec.default} WHERE {spec.column} IS NOT NULL")
+    )
+    wanted.update(spec.period_start(value) for (value,) in stray)
+    await db.commit()
+
+    # drain every period out of the default first, so each ATTACH scans an almost empty default
+    prepared = []
+    for start in sorted(wanted - set(existing)):
+        try:
+            moved = await prepare_partition(db, spec, start)
+            prepared.append(start)
+            if moved:
+                logger.info("moved %s rows from %s to %s", moved, spec.default, spec.partition_name(start))
+        except Exception:
+            await db.rollback()
+            logger.exception("could not prepare partition %s; retrying next run", spec.partition_name(start))
+
+    created = []
+    for start in prepared:
+        try:
+            await attach_partition(db, spec, start)
+            created.append(spec.partition_name(start))
+            logger.info("created partition %s", spec.partition_name(start))
+        except Exception:
+            await db.rollback()
+            logger.exception("could not attach partition %s; retrying next run", spec.partition_name(start))
+    return created
+
+
+# ---------------------------
+# Retention
+# ---------------------------
+async def retention_policies(db: AsyncSession) -> Dict[object, int]:
+    """workspace id -> retention days (0 = keep forever)."""
+    rows = await db.execute(select(Workspace.id, Workspace.settings))
+    policies = {}
+    for workspace_id, settings in rows:
+        value = (settings or {}).get("retention_days")
+        try:
+            days = int(value) if value is not None else FEEDBACK_RETENTION_DAYS
+        except (TypeError, ValueError):
+            logger.warning("workspace %s has an invalid retention_days %r; keeping its data", workspace_id, value)
+            days = 0
+        policies[workspace_id] = max(days, 0)
+    return policies
+
+
+async def _forget_feedback(db: AsyncSession, removed: Counter):
+    """Plan usage and cached answers for feedback that was just removed. Does not commit."""
+    for workspace_id, count in sorted(removed.items(), key=lambda item: str(item[0])):
+        await db.execute(
+            update(Workspace)
+            .where(Workspace.id == workspace_id)
+            .values(current_feedback_count=func.greatest(Workspace.current_feedback_count - count, 0))
+            .execution_options(synchronize_session=False)
+        )
+    await bump_data_version(db, removed)
+
+
+async def _drop_vectors(removed: Counter, cutoff: datetime):
+    for workspace_id in removed:
+        try:
+            await delete_vectors_before(workspace_id, cutoff)
+        except Exception:
+            # orphaned vectors only cost space: similarity results are joined back to feedback_items
+            logger.exception("could not delete vectors of workspace %s before %s", workspace_id, cutoff)
+
+
+async def drop_feedback_partition(db: AsyncSession, name: str, end: date, expired: set) -> Optional[Counter]:
+    """
+    Drop one whole month of feedback, provided every workspace with rows in it
+    is in `expired`; otherwise leave it (None). Commits; returns rows removed
+    per workspace.
+    """
+    await db.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+    # no writes between the check and the DROP
+    await db.execute(text(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE"))
+    counts = Counter(dict((await db.execute(
+        text(f"SELECT workspace_id, count(*) FROM {name} WHERE workspace_id IS NOT NULL GROUP BY workspace_id")
+    )).all()))
+    if set(counts) - expired:
+        await db.rollback()
+        return None
+    await db.execute(text(
+        f"DELETE FROM {AIAnalysisJob.__tablename__} WHERE feedback_item_id IN (SELECT id FROM {name})"
+    ))
+    await db.execute(text(f"DROP TABLE {name}"))
+    await _forget_feedback(db, counts)
+    await db.commit()
+    await _drop_vectors(counts, datetime.combine(end, datetime.min.time()))
+    logger.info("dropped partition %s (%s rows)", name, sum(counts.values()))
+    return counts
+
+
+async def delete_workspace_feedback_before(db: AsyncSession, workspace_id, cutoff: datetime) -> int:
+    """Batched DELETE of one workspace's feedback older than `cutoff`. Commits per batch."""
+    removed = 0
+    while True:
+        doomed = (
+            select(FeedbackItem.id, FeedbackItem.created_at)
+            .where(FeedbackItem.workspace_id == workspace_id, FeedbackItem.created_at < cutoff)
+            .limit(RETENTION_DELETE_BATCH)
+            .cte("doomed")
+        )
+        ids = (await db.execute(
+            delete(FeedbackItem)
+            .where(
+                FeedbackItem.workspace_id == workspace_id,
+                FeedbackItem.id == doomed.c.id,
+                FeedbackItem.created_at == doomed.c.created_at,
+            )
+            .returning(FeedbackItem.id)
+            .execution_options(synchronize_session=False)
+        )).scalars().all()
+        if not ids:
+            break
+        await db.execute(delete(AIAnalysisJob).where(AIAnalysisJob.feedback_item_id.in_(ids)))
+        await _forget_feedback(db, Counter({workspace_id: len(ids)}))
+        await db.commit()
+        removed += len(ids)
+        if len(ids) < RETENTION_DELETE_BATCH:
+            break
+    if removed:
+        await _drop_vectors(Counter({workspace_id: removed}), cutoff)
+        logger.info("retention removed %s feedback items of workspace %s", removed, workspace_id)
+    return removed
+
+
+async def apply_feedback_retention(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    now = now or datetime.utcnow()
+    policies = await retention_policies(db)
+    await db.commit()
+    removed = 0
+
+    # a month past the longest finite retention goes as a whole, unless a
+    # workspace that keeps its data forever has rows in it
+    finite = {workspace_id for workspace_id, days in policies.items() if days}
+    if not finite:
+        logger.info("no workspace has a finite feedback retention (FEEDBACK_RETENTION_DAYS=%s)", FEEDBACK_RETENTION_DAYS)
+        return 0
+    horizon = now - timedelta(days=max(policies[workspace_id] for workspace_id in finite))
+    for start, name in sorted((await list_partitions(db, FEEDBACK)).items()):
+        end = FEEDBACK.next_period(start)
+        if datetime.combine(end, datetime.min.time()) > horizon:
+            break
+        try:
+            counts = await drop_feedback_partition(db, name, end, finite)
+        except Exception:
+            await db.rollback()
+            logger.exception("could not drop partition %s; retrying next run", name)
+            continue
+        if counts is None:
+            logger.info("kept partition %s: it holds feedback of workspaces that keep it forever", name)
+        else:
+            removed += sum(counts.values())
+
+    # shorter retentions, kept months and the default partition row by row
+    for workspace_id, days in policies.items():
+        if days:
+            removed += await delete_workspace_feedback_before(db, workspace_id, now - timedelta(days=days))
+    return removed
+
+
+async def apply_webhook_retention(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """
+    Drop daily webhook_events partitions past WEBHOOK_RETENTION_DAYS; returns
+    partitions dropped. Unprocessed events (waiting on next_attempt_at, or dead
+    letters) are never removed: their day keeps them and loses only its
+    processed rows.
+    """
+    if WEBHOOK_RETENTION_DAYS <= 0:
+        return 0
+    cutoff = (now or datetime.utcnow()).date() - timedelta(days=WEBHOOK_RETENTION_DAYS)
+    dropped = 0
+    for start, name in sorted((await list_partitions(db, WEBHOOKS)).items()):
+        if WEBHOOKS.next_period(start) > cutoff:
+            break
+        try:
+            # idx_webhook_pending: only unprocessed rows are indexed
+            if await db.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {name} WHERE processed = false)")):
+                await db.execute(text(f"DELETE FROM {name} WHERE processed"))
+                await db.commit()
+                continue
+            await db.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+            await db.execute(text(f"DROP TABLE {name}"))
+            await db.commit()
+            dropped += 1
+        except Exception:
+            await db.rollback()
+            logger.exception("could not drop partition %s; retrying next run", name)
+    await db.execute(
+        text(f"DELETE FROM {WEBHOOKS.default} WHERE received_at < :cutoff AND processed"), {"cutoff": cutoff}
+    )
+    await db.commit()
+    return dropped
+
+
+# ---------------------------
+# Scheduled entry point
+# ---------------------------
+async def maintain_partitions() -> int:
+    """Create upcoming partitions, then apply retention; returns feedback rows removed."""
+    async with AsyncSessionLocal() as db:
+        created = 0
+        for spec in PARTITIONED:
+            created += len(await ensure_partitions(db, spec))
+        dropped = await apply_webhook_retention(db)
+        removed = await apply_feedback_retention(db)
+    logger.info(
+        "partition maintenance: %s partitions created, %s webhook days dropped, %s feedback items removed",
+        created, dropped, removed,
+    )
+    return removed
@@ -0,0 +1,232 @@
+# quota.py
+"""
+Plan limit enforcement with leased quota blocks.
+
+Instead of reading and bumping the workspace row for every item, a process
+leases QUOTA_LEASE_BLOCK units at a time with one conditional UPDATE (the
+grant is capped at what the plan has left) and hands them out from memory.
+The sum of all grants can never exceed the plan limit, whatever the number of
+processes; the cost is that units leased but not yet used look consumed until
+they are released (after QUOTA_LEASE_TTL, or at shutdown).
+
+Monthly quotas reset lazily: the lease statement treats the counter as zero
+when last_reset_date is before the current month and stamps the new date.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db import AsyncSessionLocal
+from database.models import Integration, SubscriptionPlan, Workspace
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+QUOTA_LEASE_BLOCK = int(os.getenv("QUOTA_LEASE_BLOCK", 100))  # units leased per round trip
+QUOTA_LEASE_TTL = float(os.getenv("QUOTA_LEASE_TTL", 60))  # seconds before unused units are returned
+QUOTA_EXHAUSTED_TTL = float(os.getenv("QUOTA_EXHAUSTED_TTL", 300))  # seconds before an exhausted quota is re-checked
+
+# integration types that count towards max_integrations (file imports do not)
+CONNECTOR_TYPES = ("zendesk", "intercom", "slack")
+
+
+@dataclass(frozen=True)
+class QuotaSpec:
+    counter: str  # Workspace column
+    limit: str  # SubscriptionPlan column; NULL or negative = unlimited
+    monthly: bool
+
+
+QUOTAS = {
+    "feedback_items": QuotaSpec("current_feedback_count", "max_feedback_items", monthly=False),
+    "ai_analyses": QuotaSpec("monthly_ai_analysis_count", "ai_analysis_limit", monthly=True),
+}
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, workspace_id, quota: str):
+        super().__init__(f"Plan limit reached for {quota} in workspace {workspace_id}")
+        self.workspace_id = workspace_id
+        self.quota = quota
+
+
+def _period_start(spec: QuotaSpec) -> date:
+    return datetime.utcnow().date().replace(day=1) if spec.monthly else date.min
+
+
+# ---------------------------
+# Lease statements
+# ---------------------------
+def _lease_statement(workspace_id, spec: QuotaSpec, units: int):
+    counter = getattr(Workspace, spec.counter)
+    period_start = _period_start(spec)
+    if spec.monthly:
+        used = case(
+            (or_(Workspace.last_reset_date.is_(None), Workspace.last_reset_date < period_start), 0),
+            else_=func.coalesce(counter, 0),
+        )
+    else:
+        used = func.coalesce(counter, 0)
+
+    # FOR UPDATE: the CTE must read the latest committed counter, otherwise two
+    # concurrent leases could both grant the same remaining units
+    current = (
+        select(Workspace.id.label("id"), used.label("used"), getattr(SubscriptionPlan, spec.limit).label("lim"))
+        .select_from(Workspace)
+        .outerjoin(SubscriptionPlan, SubscriptionPlan.id == Workspace.subscription_plan_id)
+        .where(Workspace.id == workspace_id)
+        .with_for_update(of=Workspace)
+        .cte("current_quota")
+    )
+    granted = case(
+        (or_(current.c.lim.is_(None), current.c.lim < 0), units),
+        else_=func.greatest(0, func.least(units, current.c.lim - current.c.used)),
+    )
+    values = {spec.counter: current.c.used + granted}
+    if spec.monthly:
+        values["last_reset_date"] = case(
+            (or_(Workspace.last_reset_date.is_(None), Workspace.last_reset_date < period_start), datetime.utcnow().date()),
+            else_=Workspace.last_reset_date,
+        )
+    return (
+        update(Workspace)
+        .where(Workspace.id == current.c.id)
+        .values(values)
+        .returning(granted.label("granted"))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _release_statement(workspace_id, spec: QuotaSpec, units: int, period_start: date):
+    counter = getattr(Workspace, spec.counter)
+    stmt = update(Workspace).where(Workspace.id == workspace_id).values(
+        {spec.counter: func.greatest(func.coalesce(counter, 0) - units, 0)}
+    )
+    if spec.monthly:
+        # units leased last month are gone with the reset
+        stmt = stmt.where(Workspace.last_reset_date >= period_start)
+    return stmt.execution_options(synchronize_session=False)
+
+
+# ---------------------------
+# In-process leases
+# ---------------------------
+@dataclass
+class _Lease:
+    remaining: int = 0
+    period: date = date.min
+    expires: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class QuotaManager:
+    def __init__(self, block: int = QUOTA_LEASE_BLOCK, ttl: float = QUOTA_LEASE_TTL):
+        self.block = block
+        self.ttl = ttl
+        self._leases: Dict[Tuple[str, str], _Lease] = {}
+        self._exhausted_until: Dict[Tuple[str, str], float] = {}
+
+    def is_exhausted(self, workspace_id, quota: str) -> bool:
+        return self._exhausted_until.get((str(workspace_id), quota), 0) > time.monotonic()
+
+    def exhausted(self, quota: str) -> List[uuid.UUID]:
+        """Workspaces this process has recently found out of `quota`."""
+        now = time.monotonic()
+        return [
+            uuid.UUID(ws) for (ws, q), until in self._exhausted_until.items()
+            if q == quota and until > now and not self._leases[(ws, q)].remaining
+        ]
+
+    async def acquire(self, workspace_id, quota: str, units: int = 1) -> int:
+        """Take up to `units` from the workspace's allowance; returns how many were granted."""
+        if units <= 0:
+            return 0
+        spec = QUOTAS[quota]
+        key = (str(workspace_id), quota)
+        lease = self._leases.setdefault(key, _Lease())
+        async with lease.lock:
+            period = _period_start(spec)
+            if lease.period != period:
+                lease.remaining, lease.period = 0, period
+            if lease.remaining < units and not self.is_exhausted(workspace_id, quota):
+                want = max(self.block, units - lease.remaining)
+                async with AsyncSessionLocal() as db:
+                    got = (await db.execute(_lease_statement(workspace_id, spec, want))).scalar() or 0
+                    await db.commit()
+                lease.remaining += got
+                lease.expires = time.monotonic() + self.ttl
+                if got < want:
+                    self._exhausted_until[key] = time.monotonic() + QUOTA_EXHAUSTED_TTL
+            granted = min(units, lease.remaining)
+            lease.remaining -= granted
+            return granted
+
+    async def require(self, workspace_id, quota: str, units: int = 1):
+        """All-or-nothing acquire; raises QuotaExceeded and keeps nothing on shortfall."""
+        granted = await self.acquire(workspace_id, quota, units)
+        if granted < units:
+            self.give_back(workspace_id, quota, granted)
+            raise QuotaExceeded(workspace_id, quota)
+
+    def give_back(self, workspace_id, quota: str, units: int):
+        """Return unused units to the local lease (they stay leased in the DB)."""
+        if units > 0:
+            self._leases.setdefault((str(workspace_id), quota), _Lease()).remaining += units
+
+    async def release(self, expired_only: bool = True) -> int:
+        """Hand unused leased units back to the workspace rows; returns units released."""
+        now = time.monotonic()
+        released = 0
+        for (workspace_id, quota), lease in list(self._leases.items()):
+            if expired_only and lease.expires > now:
+                continue
+            async with lease.lock:
+                units, lease.remaining = lease.remaining, 0
+                if units <= 0:
+                    continue
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await db.execute(_release_statement(workspace_id, QUOTAS[quota], units, lease.period))
+                        await db.commit()
+                except Exception:
+                    lease.remaining += units
+                    logger.exception("releasing %s %s units for workspace %s failed", units, quota, workspace_id)
+                    continue
+                # freed allowance may be usable again
+                self._exhausted_until.pop((workspace_id, quota), None)
+                released += units
+        return released
+
+
+quota_manager = QuotaManager()
+
+
+# ---------------------------
+# Integration count (checked once per connect, no lease needed)
+# ---------------------------
+async def check_integration_limit(db: AsyncSession, workspace_id):
+    limit = await db.scalar(
+        select(SubscriptionPlan.max_integrations)
+        .join(Workspace, Workspace.subscription_plan_id == SubscriptionPlan.id)
+        .where(Workspace.id == workspace_id)
+    )
+    if limit is None or limit < 0:
+        return
+    count = await db.scalar(
+        select(func.count()).select_from(Integration).where(
+            Integration.workspace_id == workspace_id, Integration.type.in_(CONNECTOR_TYPES)
+        )
+    )
+    if count >= limit:
+        raise HTTPException(status_code=402, detail="Integration limit reached for your plan")
@@ -0,0 +1,340 @@
+"""
+Periodic background jobs.
+
+Runs inside every API process (started from the app lifespan) or standalone:
+
+    python -m services.scheduler [--local-only]
+
+Each job fires every `interval` seconds with +/- `jitter` spread, and at most
+`max_running` runs of one job overlap in a process (a tick that finds the cap
+reached is skipped and counted). Jobs marked `leader=True` (syncs, rollups,
+clustering, invitation cleanup, partition maintenance) only run on the replica
+holding the SCHEDULER_LOCK_KEY Postgres advisory lock, so any number of
+replicas can run the scheduler without duplicating work; if the leader dies
+its session ends, the lock is freed and another replica takes over at its
+next election tick.
+Local jobs (usage flush, quota lease release) run on every replica, since
+they only touch that process's memory.
+
+The advisory lock is session-level: point SCHEDULER_DATABASE_URL at Postgres
+directly (not through PgBouncer in transaction mode) when pooling is in front.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, or_, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database.db import ASYNC_DATABASE_URL, AsyncSessionLocal, _async_connect_args, _async_database_url
+from database.models import Integration, Invitation
+from services.feedback_ingest import claim_integration_sync, release_sync_claim
+from services.insights_rollup import refresh_all_rollups
+from services.intercom_sync import sync_intercom_integration
+from services.issue_clustering import cluster_all_workspaces
+from services.partitions import maintain_partitions
+from services.quota import quota_manager
+from services.slack_sync import sync_slack_integration
+from services.usage_meter import USAGE_FLUSH_INTERVAL, usage_meter
+from services.zendesk_sync import sync_zendesk_integration
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+# "false" keeps this process out of leader election (local jobs only)
+SCHEDULER_LEADER_JOBS = os.getenv("SCHEDULER_LEADER_JOBS", "true").lower() == "true"
+SCHEDULER_DATABASE_URL = os.getenv("SCHEDULER_DATABASE_URL")
+SCHEDULER_LOCK_KEY = int(os.getenv("SCHEDULER_LOCK_KEY", 72_410_001))
+SCHEDULER_ELECTION_INTERVAL = float(os.getenv("SCHEDULER_ELECTION_INTERVAL", 15))  # seconds
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", 0.1))  # fraction of the interval
+
+SYNC_TICK_INTERVAL = float(os.getenv("SYNC_TICK_INTERVAL", 60))  # how often due integrations are looked for
+SYNC_INTERVAL = int(os.getenv("SYNC_INTERVAL", 900))  # seconds between syncs of one integration
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", 4))  # integrations synced at once
+SYNC_STALE_AFTER = int(os.getenv("SYNC_STALE_AFTER", 3600))  # "syncing" this long = crashed run
+ROLLUP_INTERVAL = float(os.getenv("ROLLUP_INTERVAL", 300))
+CLUSTERING_INTERVAL = float(os.getenv("CLUSTERING_INTERVAL", 3600))
+INVITATION_CLEANUP_INTERVAL = float(os.getenv("INVITATION_CLEANUP_INTERVAL", 3600))
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", 3600))
+QUOTA_RELEASE_INTERVAL = float(os.getenv("QUOTA_RELEASE_INTERVAL", 30))
+
+SYNCERS = {
+    "zendesk": sync_zendesk_integration,
+    "intercom": sync_intercom_integration,
+    "slack": sync_slack_integration,
+}
+
+
+@dataclass
+class JobStats:
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    running: int = 0
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_s: Optional[float] = None
+    max_duration_s: float = 0.0
+    last_lag_s: Optional[float] = None  # how late the last run started vs. its due time
+    max_lag_s: float = 0.0
+    last_result: Optional[object] = None
+    last_error: Optional[str] = None
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], Awaitable[object]]
+    interval: float
+    leader: bool = True
+    max_running: int = 1
+    jitter: float = SCHEDULER_JITTER
+    stats: JobStats = field(default_factory=JobStats)
+
+    def next_delay(self) -> float:
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+# ---------------------------
+# Jobs
+# ---------------------------
+async def _sync_one(integration_id, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        async with AsyncSessionLocal() as db:
+            # a manual sync may have started since the due query ran
+            if not await claim_integration_sync(db, integration_id, stale_after=SYNC_STALE_AFTER):
+                return 0
+            integration = await db.get(Integration, integration_id)
+            if integration is None:
+                return 0
+            try:
+                return await SYNCERS[integration.type](db, integration, incremental=True)
+            except Exception as e:
+                logger.exception("Scheduled %s sync for integration %s failed", integration.type, integration_id)
+                await release_sync_claim(db, integration, e)
+                return 0
+
+
+async def sync_due_integrations() -> int:
+    """Incrementally sync every active connector integration whose last sync is older than SYNC_INTERVAL."""
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        due = (await db.scalars(
+            select(Integration.id)
+            .where(
+                Integration.type.in_(SYNCERS),
+                Integration.is_active.is_not(False),
+                or_(Integration.last_sync_at.is_(None), Integration.last_sync_at < now - timedelta(seconds=SYNC_INTERVAL)),
+                or_(
+                    Integration.sync_status.is_distinct_from("syncing"),
+                    Integration.updated_at < now - timedelta(seconds=SYNC_STALE_AFTER),
+                ),
+            )
+            .order_by(Integration.last_sync_at.asc().nulls_first())
+        )).all()
+    semaphore = asyncio.Semaphore(SYNC_CONCURRENCY)
+    return sum(await asyncio.gather(*(_sync_one(integration_id, semaphore) for integration_id in due)))
+
+
+async def delete_expired_invitations() -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(Invitation).where(Invitation.accepted.is_not(True), Invitation.expires_at < func.now())
+        )
+        await db.commit()
+        return result.rowcount
+
+
+def default_jobs() -> List[Job]:
+    return [
+        Job("integration_sync", sync_due_integrations, SYNC_TICK_INTERVAL),
+        Job("insights_rollup", refresh_all_rollups, ROLLUP_INTERVAL),
+        Job("issue_clustering", cluster_all_workspaces, CLUSTERING_INTERVAL),
+        Job("invitation_cleanup", delete_expired_invitations, INVITATION_CLEANUP_INTERVAL),
+        Job("partition_maintenance", maintain_partitions, PARTITION_MAINTENANCE_INTERVAL),
+        # per-process state: every replica flushes / releases its own
+        Job("usage_flush", usage_meter.flush, USAGE_FLUSH_INTERVAL, leader=False),
+        Job("quota_release", quota_manager.release, QUOTA_RELEASE_INTERVAL, leader=False),
+    ]
+
+
+# ---------------------------
+# Scheduler
+# ---------------------------
+class Scheduler:
+    def __init__(self, jobs: List[Job], leader_jobs: bool = SCHEDULER_LEADER_JOBS):
+        self.jobs: Dict[str, Job] = {job.name: job for job in jobs}
+        self.leader_jobs = leader_jobs
+        self.is_leader = False
+        self._lock_engine = None
+        self._lock_conn = None
+        self._tasks: List[asyncio.Task] = []
+        self._runs: set = set()
+
+    # leader election
+    async def _elect(self):
+        if self._lock_conn is not None:
+            try:
+                await self._lock_conn.execute(text("SELECT 1"))
+                await self._lock_conn.commit()
+                return
+            except Exception:
+                logger.warning("scheduler lock connection lost; giving up leadership")
+                await self._drop_lock()
+        if self._lock_engine is None:
+            # own engine, pool of one: the lock lives as long as this session
+            if SCHEDULER_DATABASE_URL:
+                url, connect_args = _async_database_url(SCHEDULER_DATABASE_URL)
+            else:
+                url, connect_args = ASYNC_DATABASE_URL, _async_connect_args
+            self._lock_engine = create_async_engine(
+                url, pool_size=1, max_overflow=0, pool_pre_ping=True, connect_args=connect_args
+            )
+        conn = await self._lock_engine.connect()
+        try:
+            acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": SCHEDULER_LOCK_KEY})
+            await conn.commit()
+        except Exception:
+            await conn.close()
+            raise
+        if acquired:
+            self._lock_conn, self.is_leader = conn, True
+            logger.info("scheduler: this process is now the leader")
+        else:
+            await conn.close()
+
+    async def _drop_lock(self):
+        conn, self._lock_conn, self.is_leader = self._lock_conn, None, False
+        if conn is not None:
+            try:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEDULER_LOCK_KEY})
+                await conn.commit()
+            except Exception:
+                pass
+            await conn.close()
+
+    async def _election_loop(self):
+        while True:
+            try:
+                await self._elect()
+            except Exception:
+                logger.exception("scheduler leader election failed")
+            await asyncio.sleep(SCHEDULER_ELECTION_INTERVAL)
+
+    # job execution
+    async def _execute(self, job: Job, due: float):
+        stats = job.stats
+        started = time.monotonic()
+        stats.running += 1
+        stats.last_lag_s = max(0.0, started - due)
+        stats.max_lag_s = max(stats.max_lag_s, stats.last_lag_s)
+        stats.last_started_at = datetime.utcnow()
+        try:
+            stats.last_result = await job.func()
+            stats.last_error = None
+        except Exception as e:
+            stats.failures += 1
+            stats.last_error = str(e)
+            logger.exception("scheduled job %s failed", job.name)
+        finally:
+            stats.running -= 1
+            stats.runs += 1
+            stats.last_duration_s = time.monotonic() - started
+            stats.max_duration_s = max(stats.max_duration_s, stats.last_duration_s)
+            stats.last_finished_at = datetime.utcnow()
+
+    def run_now(self, name: str) -> bool:
+        """Start a run outside the schedule (same caps); False when at max_running."""
+        job = self.jobs[name]
+        if job.stats.running >= job.max_running:
+            job.stats.skipped += 1
+            return False
+        task = asyncio.create_task(self._execute(job, time.monotonic()))
+        self._runs.add(task)
+        task.add_done_callback(self._runs.discard)
+        return True
+
+    async def _job_loop(self, job: Job):
+        # spread the first runs so replicas started together do not fire together
+        due = time.monotonic() + random.uniform(0, job.interval * job.jitter)
+        while True:
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            if not job.leader or self.is_leader:
+                if job.stats.running >= job.max_running:
+                    job.stats.skipped += 1
+                else:
+                    task = asyncio.create_task(self._execute(job, due))
+                    self._runs.add(task)
+                    task.add_done_callback(self._runs.discard)
+            due = time.monotonic() + job.next_delay()
+
+    def start(self):
+        if self._tasks:
+            return
+        if self.leader_jobs:
+            self._tasks.append(asyncio.create_task(self._election_loop()))
+        for job in self.jobs.values():
+            if job.leader and not self.leader_jobs:
+                continue
+            self._tasks.append(asyncio.create_task(self._job_loop(job)))
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks + list(self._runs), []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._drop_lock()
+        if self._lock_engine is not None:
+            await self._lock_engine.dispose()
+            self._lock_engine = None
+
+    def status(self) -> dict:
+        return {
+            "enabled": bool(self._tasks),
+            "leader": self.is_leader,
+            "jobs": {
+                job.name: {
+                    "interval_s": job.interval,
+                    "leader_only": job.leader,
+                    "max_running": job.max_running,
+                    **{k: v for k, v in vars(job.stats).items() if k != "last_result"},
+                    "last_result": job.stats.last_result if isinstance(job.stats.last_result, (int, float, str)) else None,
+                }
+                for job in self.jobs.values()
+            },
+        }
+
+
+scheduler = Scheduler(default_jobs())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the periodic job scheduler")
+    parser.add_argument("--local-only", action="store_true", help="skip leader election and leader-only jobs")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    async def run():
+        runner = Scheduler(default_jobs(), leader_jobs=not args.local_only)
+        runner.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.stop()
+            await usage_meter.flush()
+            await quota_manager.release(expired_only=False)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
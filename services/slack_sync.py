@@ -0,0 +1,311 @@
+# slack_sync.py
+"""
+Slack channel ingestion.
+
+Backfill walks conversations.history (newest first, cursor paginated) for
+every selected channel concurrently, pulls thread replies with
+conversations.replies, and streams the messages into feedback_items through
+run_feedback_sync. All calls for one Slack workspace (team) share a token
+bucket per rate-limit tier, so adding channels adds parallelism without
+exceeding the tier budget; a 429 drains the bucket for everyone until
+Retry-After has passed.
+
+Replies posted later to threads that started before the watermark are not
+revisited by incremental runs; the Slack webhook (message events) covers them.
+"""
+import asyncio
+import copy
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Integration
+from services.feedback_ingest import (
+    FEEDBACK_UPSERT_CHUNK_SIZE,
+    SyncBatch,
+    get_sync_state,
+    run_feedback_sync,
+)
+from services.http_client import get_http_client
+
+load_dotenv()
+
+SLACK_API_BASE_URL = os.getenv("SLACK_API_BASE_URL", "https://slack.com/api")
+SLACK_PAGE_SIZE = int(os.getenv("SLACK_PAGE_SIZE", 200))  # Slack recommends <= 200
+SLACK_CHANNEL_CONCURRENCY = int(os.getenv("SLACK_CHANNEL_CONCURRENCY", 4))
+SLACK_BUCKET_BURST = int(os.getenv("SLACK_BUCKET_BURST", 5))
+# requests per minute per tier; lower these for apps on Slack's reduced limits
+SLACK_TIER_LIMITS = {
+    2: int(os.getenv("SLACK_TIER2_PER_MINUTE", 20)),
+    3: int(os.getenv("SLACK_TIER3_PER_MINUTE", 50)),
+    4: int(os.getenv("SLACK_TIER4_PER_MINUTE", 100)),
+}
+METHOD_TIERS = {
+    "conversations.list": 2,
+    "conversations.history": 3,
+    "conversations.replies": 3,
+}
+
+# message subtypes that carry user-authored feedback; edits, joins, bot posts etc. are skipped
+FEEDBACK_SUBTYPES = {None, "thread_broadcast", "file_share"}
+
+
+class SlackApiError(Exception):
+    def __init__(self, method: str, error: str):
+        super().__init__(f"{method}: {error}")
+        self.error = error
+
+
+# ---------------------------
+# Rate limiting
+# ---------------------------
+class TokenBucket:
+    """
+    Async token bucket. Waiters are served in arrival order (the lock is held
+    while waiting), so one busy channel cannot starve the others.
+    """
+
+    def __init__(self, per_minute: int, burst: int = SLACK_BUCKET_BURST):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, min(burst, per_minute))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self, seconds: float):
+        # Slack said stop: nobody on this team/tier calls again before Retry-After
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+
+
+_buckets: Dict[Tuple[str, int], TokenBucket] = {}
+
+
+def get_bucket(team_id: str, tier: int) -> TokenBucket:
+    key = (team_id, tier)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        bucket = _buckets[key] = TokenBucket(SLACK_TIER_LIMITS[tier])
+    return bucket
+
+
+# ---------------------------
+# API
+# ---------------------------
+class SlackApi:
+    def __init__(self, client: httpx.AsyncClient, access_token: str, team_id: str, base_url: str = SLACK_API_BASE_URL):
+        self._client = client
+        self._headers = {"Authorization": f"Bearer {access_token}"}
+        self.team_id = team_id
+        self.base_url = base_url.rstrip("/")
+
+    async def call(self, method: str, **params) -> dict:
+        bucket = get_bucket(self.team_id, METHOD_TIERS.get(method, 3))
+        await bucket.acquire()
+        resp = await self._client.get(
+            f"{self.base_url}/{method}",
+            params={k: v for k, v in params.items() if v is not None},
+            headers=self._headers,
+            extensions={"on_throttle": bucket.penalize},
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        if not data.get("ok"):
+            raise SlackApiError(method, data.get("error", "unknown_error"))
+        return data
+
+    async def paginate(self, method: str, key: str, **params) -> AsyncIterator[Tuple[List[dict], Optional[str]]]:
+        """Yields (items, next_cursor) per page; next_cursor is None on the last page."""
+        cursor = params.pop("cursor", None)
+        while True:
+            data = await self.call(method, limit=SLACK_PAGE_SIZE, cursor=cursor, **params)
+            cursor = (data.get("response_metadata") or {}).get("next_cursor") or None
+            yield data.get(key, []), cursor
+            if not cursor:
+                return
+
+
+async def list_channels(api: SlackApi) -> List[dict]:
+    channels = []
+    async for page, _ in api.paginate(
+        "conversations.list", "channels", types="public_channel,private_channel", exclude_archived="true"
+    ):
+        channels.extend(c for c in page if c.get("is_member"))
+    return channels
+
+
+# ---------------------------
+# Mapping
+# ---------------------------
+def _from_slack_ts(ts: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.utcfromtimestamp(float(ts))
+    except (TypeError, ValueError):
+        return None
+
+
+def message_to_feedback(message: dict, channel: str, workspace_id, integration_id, team_id: Optional[str] = None) -> Optional[dict]:
+    """Map a Slack message to a feedback row, or None when it is not user feedback."""
+    if message.get("subtype") not in FEEDBACK_SUBTYPES or message.get("bot_id"):
+        return None
+    text = (message.get("text") or "").strip()
+    if not text:
+        return None
+
+    ts = message["ts"]
+    return {
+        "id": uuid.uuid4(),
+        "workspace_id": workspace_id,
+        "integration_id": integration_id,
+        "source_type": "slack",
+        # channel + ts is Slack's own unique message key
+        "external_id": f"{channel}:{ts}",
+        "source_url": None,
+        "customer_email": None,
+        "customer_name": (message.get("user_profile") or {}).get("real_name") or message.get("user"),
+        "raw_content": text,
+        "source_metadata": {
+            "team_id": team_id,
+            "channel": channel,
+            "user": message.get("user"),
+            "thread_ts": message.get("thread_ts"),
+            "reply_count": message.get("reply_count"),
+        },
+        # None when missing: the stored value is kept, a new item is skipped (dedupe key)
+        "created_at": _from_slack_ts(ts),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+# ---------------------------
+# Sync engine
+# ---------------------------
+async def _thread_replies(api: SlackApi, channel: str, thread_ts: str) -> List[dict]:
+    replies = []
+    async for page, _ in api.paginate("conversations.replies", "messages", channel=channel, ts=thread_ts):
+        # the parent comes back first on every page; it is already in history
+        replies.extend(m for m in page if m.get("ts") != thread_ts)
+    return replies
+
+
+async def _walk_channel(api: SlackApi, integration: Integration, channel: str, state: dict, queue: asyncio.Queue):
+    """
+    Page one channel's history newer than state["oldest"], putting
+    (channel, rows, channel_state) on the queue after every page.
+    """
+    oldest = state.get("oldest")
+    high_water = state.get("high_water") or oldest
+    try:
+        pages = api.paginate("conversations.history", "messages", channel=channel, oldest=oldest, cursor=state.get("cursor"))
+        async for messages, cursor in pages:
+            batch = list(messages)
+            for message in messages:
+                if message.get("reply_count") and message.get("thread_ts") == message.get("ts"):
+                    batch.extend(await _thread_replies(api, channel, message["ts"]))
+            rows = [
+                row for row in (
+                    message_to_feedback(m, channel, integration.workspace_id, integration.id, api.team_id) for m in batch
+                ) if row is not None
+            ]
+            newest = max((m["ts"] for m in messages if m.get("ts")), key=float, default=None)
+            if newest and (high_water is None or float(newest) > float(high_water)):
+                high_water = newest
+            if cursor:
+                # mid-walk: keep the window and remember where to resume
+                channel_state = {"oldest": oldest, "cursor": cursor, "high_water": high_water}
+            else:
+                # walk finished: next run only needs messages after the newest we saw
+                channel_state = {"oldest": high_water}
+            await queue.put((channel, rows, channel_state))
+    except SlackApiError as e:
+        if e.error not in ("not_in_channel", "channel_not_found", "is_archived", "missing_scope"):
+            raise
+        # channel left/removed since it was selected; keep syncing the others
+        await queue.put((channel, [], {**state, "error": e.error}))
+
+
+async def _channel_batches(api: SlackApi, integration: Integration, channels: List[str], state: dict) -> AsyncIterator[SyncBatch]:
+    """
+    Merge concurrent channel walks into one stream of SyncBatches. Each batch
+    carries the combined per-channel state as of the rows yielded so far, so a
+    committed watermark never runs ahead of committed rows.
+    """
+    combined = {"channels": dict(state.get("channels") or {})}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SLACK_CHANNEL_CONCURRENCY * 2)
+    semaphore = asyncio.Semaphore(SLACK_CHANNEL_CONCURRENCY)
+    done = object()
+
+    async def walk(channel: str):
+        async with semaphore:
+            await _walk_channel(api, integration, channel, combined["channels"].get(channel, {}), queue)
+
+    async def walk_all():
+        try:
+            await asyncio.gather(*(walk(c) for c in channels))
+            await queue.put(done)
+        except Exception as e:
+            await queue.put(e)
+
+    producer = asyncio.create_task(walk_all())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            channel, rows, channel_state = item
+            combined["channels"][channel] = channel_state
+            yield SyncBatch(rows=rows, state=copy.deepcopy(combined))
+    finally:
+        producer.cancel()
+
+
+async def sync_slack_integration(
+    db: AsyncSession,
+    integration: Integration,
+    client: Optional[httpx.AsyncClient] = None,
+    incremental: bool = True,
+    chunk_size: int = FEEDBACK_UPSERT_CHUNK_SIZE,
+) -> int:
+    """
+    Stream the selected channels (config["channels"], default: every channel the
+    bot is a member of) into feedback_items. Returns the number of rows written.
+    """
+    config = integration.config or {}
+    if not config.get("access_token"):
+        raise ValueError("Slack integration has no access token")
+
+    api = SlackApi(
+        client or get_http_client("slack"),
+        config["access_token"],
+        config.get("team_id") or str(integration.id),
+        config.get("base_url") or SLACK_API_BASE_URL,
+    )
+    channels = config.get("channels") or [c["id"] for c in await list_channels(api)]
+
+    state = get_sync_state(integration) if incremental else {}
+    batches = _channel_batches(api, integration, channels, state)
+    return await run_feedback_sync(db, integration, batches, full=not incremental, chunk_size=chunk_size)
@@ -0,0 +1,169 @@
+# usage_meter.py
+"""
+Per-workspace usage metering without a write per request.
+
+Requests are counted in process memory (sharded by workspace, one lock per
+shard, so concurrent threads rarely contend) and flushed every
+USAGE_FLUSH_INTERVAL seconds as one multi-row
+INSERT ... ON CONFLICT (workspace_id, date) DO UPDATE that adds the deltas.
+Every replica flushes its own deltas, so totals stay exact across processes;
+a crash loses at most one interval. The app flushes once more at shutdown.
+"""
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from database.db import AsyncSessionLocal
+from database.models import UsageTracking
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", 10))  # seconds
+USAGE_METER_SHARDS = int(os.getenv("USAGE_METER_SHARDS", 16))
+
+METRICS = ("api_requests", "export_requests", "feedback_items_processed", "ai_analyses_run")
+# path segments that mark a request as an export (see workspace export endpoints)
+EXPORT_MARKERS = ("/export",)
+
+_Key = Tuple[UUID, date]
+
+
+class UsageMeter:
+    def __init__(self, shards: int = USAGE_METER_SHARDS):
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._shards = [defaultdict(lambda: defaultdict(int)) for _ in range(shards)]
+        self._task = None
+
+    def record(self, workspace_id: UUID, metric: str, amount: int = 1):
+        key = (workspace_id, datetime.utcnow().date())
+        shard = hash(workspace_id) % len(self._shards)
+        with self._locks[shard]:
+            self._shards[shard][key][metric] += amount
+
+    def drain(self) -> Dict[_Key, Dict[str, int]]:
+        """Swap every shard for an empty one and return what was counted."""
+        totals = {}
+        for i, lock in enumerate(self._locks):
+            with lock:
+                shard, self._shards[i] = self._shards[i], defaultdict(lambda: defaultdict(int))
+            totals.update(shard)
+        return totals
+
+    def _restore(self, totals: Dict[_Key, Dict[str, int]]):
+        for (workspace_id, day), counters in totals.items():
+            shard = hash(workspace_id) % len(self._shards)
+            with self._locks[shard]:
+                for metric, amount in counters.items():
+                    self._shards[shard][(workspace_id, day)][metric] += amount
+
+    async def flush(self) -> int:
+        """Write the pending deltas; on failure they are kept for the next flush."""
+        totals = self.drain()
+        if not totals:
+            return 0
+        stmt = insert(UsageTracking).values([
+            {
+                "id": uuid.uuid4(),
+                "workspace_id": workspace_id,
+                "date": day,
+                **{metric: counters.get(metric, 0) for metric in METRICS},
+                "created_at": datetime.utcnow(),
+            }
+            for (workspace_id, day), counters in totals.items()
+        ])
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_usage_workspace_date",
+            set_={metric: func.coalesce(getattr(UsageTracking, metric), 0) + excluded[metric] for metric in METRICS},
+        )
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(stmt)
+                await db.commit()
+        except Exception:
+            self._restore(totals)
+            logger.exception("usage flush failed; %s workspace-days kept for retry", len(totals))
+            return 0
+        return len(totals)
+
+    # periodic flushing, tied to the app lifespan
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    def start(self, interval: float = USAGE_FLUSH_INTERVAL):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+usage_meter = UsageMeter()
+
+
+# ---------------------------
+# ASGI middleware
+# ---------------------------
+def _workspace_from_scope(scope) -> Optional[UUID]:
+    """workspace id from /workspaces/{id}/... or ?workspace_id=; None when absent or malformed."""
+    parts = scope.get("path", "").strip("/").split("/")
+    candidate = parts[1] if len(parts) > 1 and parts[0] == "workspaces" else None
+    if candidate is None:
+        for pair in scope.get("query_string", b"").decode("latin-1").split("&"):
+            name, _, value = pair.partition("=")
+            if name == "workspace_id" and value:
+                candidate = value
+                break
+    try:
+        return UUID(candidate) if candidate else None
+    except ValueError:
+        return None
+
+
+class UsageMeteringMiddleware:
+    """
+    Pure ASGI (no BaseHTTPMiddleware) so streaming responses are not buffered.
+    Counts a request once its response starts with a non-error status, so
+    rejected or unauthorised calls are never billed to a workspace.
+    """
+
+    def __init__(self, app, meter: UsageMeter = usage_meter):
+        self.app = app
+        self.meter = meter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        workspace_id = _workspace_from_scope(scope)
+        if workspace_id is None:
+            return await self.app(scope, receive, send)
+
+        metric = "export_requests" if any(m in scope["path"] for m in EXPORT_MARKERS) else "api_requests"
+
+        async def metered_send(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                self.meter.record(workspace_id, metric)
+            await send(message)
+
+        await self.app(scope, receive, metered_send)
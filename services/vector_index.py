@@ -0,0 +1,173 @@
+# vector_index.py
+"""
+Feedback embeddings in Qdrant, one collection per workspace so tenants never
+share an index and a workspace can be dropped in one call.
+
+QDRANT_URL may be a server URL, ":memory:" (tests, local dev) or empty with
+QDRANT_PATH set for an on-disk local store.
+"""
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from qdrant_client import AsyncQdrantClient, models
+
+load_dotenv()
+
+QDRANT_URL = os.getenv("QDRANT_URL", ":memory:")
+QDRANT_PATH = os.getenv("QDRANT_PATH")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+QDRANT_COLLECTION_PREFIX = os.getenv("QDRANT_COLLECTION_PREFIX", "feedback")
+QDRANT_SCROLL_PAGE = int(os.getenv("QDRANT_SCROLL_PAGE", 512))
+
+_client: Optional[AsyncQdrantClient] = None
+_collections = set()  # collections known to exist in this process
+
+
+def get_vector_client() -> AsyncQdrantClient:
+    global _client
+    if _client is None:
+        if QDRANT_PATH and not QDRANT_URL.startswith("http"):
+            _client = AsyncQdrantClient(path=QDRANT_PATH)
+        elif QDRANT_URL == ":memory:":
+            _client = AsyncQdrantClient(location=":memory:")
+        else:
+            _client = AsyncQdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    return _client
+
+
+async def close_vector_client() -> None:
+    global _client
+    client, _client = _client, None
+    _collections.clear()
+    if client is not None:
+        await client.close()
+
+
+def collection_name(workspace_id) -> str:
+    return f"{QDRANT_COLLECTION_PREFIX}_{str(workspace_id).replace('-', '')}"
+
+
+async def ensure_collection(workspace_id, dimension: int) -> str:
+    name = collection_name(workspace_id)
+    if name in _collections:
+        return name
+    client = get_vector_client()
+    if not await client.collection_exists(name):
+        await client.create_collection(
+            name, vectors_config=models.VectorParams(size=dimension, distance=models.Distance.COSINE)
+        )
+        # clustering scrolls by period; local mode ignores payload indexes
+        await client.create_payload_index(name, "created_ts", field_schema=models.PayloadSchemaType.FLOAT)
+    _collections.add(name)
+    return name
+
+
+def _ts(value: datetime) -> float:
+    # feedback timestamps are naive UTC
+    return value.replace(tzinfo=value.tzinfo or timezone.utc).timestamp()
+
+
+def vector_payload(created_at: Optional[datetime], **extra) -> dict:
+    return {"created_ts": _ts(created_at) if created_at else 0.0, **extra}
+
+
+# ---------------------------
+# Writes
+# ---------------------------
+async def upsert_vectors(workspace_id, dimension: int, points: List[Tuple[str, List[float], dict]]) -> None:
+    """points: (feedback id, vector, payload)"""
+    if not points:
+        return
+    name = await ensure_collection(workspace_id, dimension)
+    await get_vector_client().upsert(
+        name,
+        points=[models.PointStruct(id=str(pid), vector=vector, payload=payload) for pid, vector, payload in points],
+        wait=True,
+    )
+
+
+async def delete_vectors(workspace_id, feedback_ids: Iterable) -> None:
+    name = collection_name(workspace_id)
+    client = get_vector_client()
+    if await client.collection_exists(name):
+        await client.delete(name, points_selector=models.PointIdsList(points=[str(i) for i in feedback_ids]))
+
+
+async def delete_vectors_before(workspace_id, cutoff: datetime) -> None:
+    """Remove every vector created before `cutoff` (feedback retention)."""
+    name = collection_name(workspace_id)
+    client = get_vector_client()
+    if await client.collection_exists(name):
+        await client.delete(name, points_selector=models.FilterSelector(filter=models.Filter(must=[
+            models.FieldCondition(key="created_ts", range=models.Range(lt=_ts(cutoff)))
+        ])))
+
+
+# ---------------------------
+# Reads
+# ---------------------------
+async def get_vector(workspace_id, feedback_id) -> Optional[List[float]]:
+    name = collection_name(workspace_id)
+    client = get_vector_client()
+    if not await client.collection_exists(name):
+        return None
+    records = await client.retrieve(name, ids=[str(feedback_id)], with_vectors=True)
+    return list(records[0].vector) if records else None
+
+
+async def search_similar(
+    workspace_id, vector: List[float], limit: int, min_score: float = 0.0, exclude_id=None
+) -> List[Tuple[str, float]]:
+    name = collection_name(workspace_id)
+    query_filter = None
+    if exclude_id is not None:
+        query_filter = models.Filter(must_not=[models.HasIdCondition(has_id=[str(exclude_id)])])
+    response = await get_vector_client().query_points(
+        name,
+        query=vector,
+        query_filter=query_filter,
+        limit=limit,
+        score_threshold=min_score,
+        with_payload=False,
+    )
+    return [(str(point.id), point.score) for point in response.points]
+
+
+def _period_filter(start: datetime, end: datetime) -> models.Filter:
+    return models.Filter(must=[
+        models.FieldCondition(key="created_ts", range=models.Range(gte=_ts(start), lt=_ts(end)))
+    ])
+
+
+async def scroll_period(workspace_id, start: datetime, end: datetime) -> Dict[str, List[float]]:
+    """All vectors created in [start, end), keyed by feedback id."""
+    name = collection_name(workspace_id)
+    client = get_vector_client()
+    if not await client.collection_exists(name):
+        return {}
+    period = _period_filter(start, end)
+    vectors, offset = {}, None
+    while True:
+        records, offset = await client.scroll(
+            name, scroll_filter=period, limit=QDRANT_SCROLL_PAGE, offset=offset, with_vectors=True, with_payload=False
+        )
+        vectors.update((str(r.id), list(r.vector)) for r in records)
+        if offset is None:
+            return vectors
+
+
+async def neighbors_in_period(
+    workspace_id, vectors: List[List[float]], start: datetime, end: datetime, limit: int, min_score: float
+) -> List[List[Tuple[str, float]]]:
+    """k nearest neighbours (within the same period) for many vectors in one round trip."""
+    period = _period_filter(start, end)
+    responses = await get_vector_client().query_batch_points(
+        collection_name(workspace_id),
+        requests=[
+            models.QueryRequest(query=vector, filter=period, limit=limit, score_threshold=min_score, with_payload=False)
+            for vector in vectors
+        ],
+    )
+    return [[(str(point.id), point.score) for point in response.points] for response in responses]
@@ -0,0 +1,213 @@
+# zendesk_sync.py
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Integration
+from services.feedback_ingest import (
+    FEEDBACK_UPSERT_CHUNK_SIZE,
+    SyncBatch,
+    get_sync_state,
+    run_feedback_sync,
+)
+from services.http_client import get_http_client
+
+load_dotenv()
+
+ZENDESK_SUBDOMAIN = os.environ.get("ZENDESK_SUB_DOMAIN")
+# Override for local fakes / proxies, e.g. http://127.0.0.1:8081
+ZENDESK_API_BASE_URL = os.environ.get("ZENDESK_API_BASE_URL")
+ZENDESK_PAGE_SIZE = int(os.getenv("ZENDESK_PAGE_SIZE", 100))
+
+
+@dataclass
+class ZendeskPage:
+    tickets: List[dict] = field(default_factory=list)
+    cursor: Optional[str] = None
+    has_more: bool = False
+
+
+def zendesk_base_url(integration: Integration) -> str:
+    config = integration.config or {}
+    if config.get("base_url"):
+        return config["base_url"].rstrip("/")
+    if ZENDESK_API_BASE_URL:
+        return ZENDESK_API_BASE_URL.rstrip("/")
+    subdomain = config.get("subdomain") or ZENDESK_SUBDOMAIN
+    return f"https://{subdomain}.zendesk.com"
+
+
+def _auth_headers(access_token: str) -> dict:
+    return {"Authorization": f"Bearer {access_token}", "Accept": "application/json"}
+
+
+# ---------------------------
+# Pagination
+# ---------------------------
+async def iter_ticket_pages(
+    client: httpx.AsyncClient,
+    base_url: str,
+    access_token: str,
+    page_size: int = ZENDESK_PAGE_SIZE,
+) -> AsyncIterator[ZendeskPage]:
+    """Walk /api/v2/tickets.json using cursor pagination (page[size] / links.next)."""
+    url = f"{base_url}/api/v2/tickets.json"
+    params = {"page[size]": page_size}
+
+    while url:
+        resp = await client.get(url, params=params, headers=_auth_headers(access_token))
+        resp.raise_for_status()
+        data = resp.json()
+
+        meta = data.get("meta") or {}
+        page = ZendeskPage(
+            tickets=data.get("tickets", []),
+            cursor=meta.get("after_cursor"),
+            has_more=bool(meta.get("has_more")),
+        )
+        yield page
+
+        if not page.has_more:
+            return
+        # links.next already carries page[size] and page[after]
+        url = (data.get("links") or {}).get("next")
+        params = None
+
+
+async def iter_incremental_ticket_pages(
+    client: httpx.AsyncClient,
+    base_url: str,
+    access_token: str,
+    start_time: int = 0,
+    cursor: Optional[str] = None,
+) -> AsyncIterator[ZendeskPage]:
+    """
+    Walk the cursor-based incremental export (/api/v2/incremental/tickets/cursor.json).
+    Starts from `cursor` when given, otherwise from the unix `start_time`.
+    """
+    url = f"{base_url}/api/v2/incremental/tickets/cursor.json"
+    params = {"cursor": cursor} if cursor else {"start_time": start_time}
+    params["per_page"] = ZENDESK_PAGE_SIZE
+
+    while True:
+        resp = await client.get(url, params=params, headers=_auth_headers(access_token))
+        resp.raise_for_status()
+        data = resp.json()
+
+        page = ZendeskPage(
+            tickets=data.get("tickets", []),
+            cursor=data.get("after_cursor"),
+            has_more=not data.get("end_of_stream", True),
+        )
+        yield page
+
+        if not page.has_more or not page.cursor:
+            return
+        params = {"cursor": page.cursor, "per_page": ZENDESK_PAGE_SIZE}
+
+
+# ---------------------------
+# Mapping
+# ---------------------------
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    # Zendesk timestamps are ISO 8601 in UTC, e.g. 2024-01-31T12:00:00Z; trigger
+    # payloads are user-defined, so anything else counts as missing
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def ticket_to_feedback(ticket: dict, workspace_id, integration_id, base_url: str) -> dict:
+    source_from = ((ticket.get("via") or {}).get("source") or {}).get("from") or {}
+    subject = ticket.get("subject") or ""
+    description = ticket.get("description") or ""
+    raw_content = f"{subject}\n\n{description}".strip() if subject else description
+
+    return {
+        "id": uuid.uuid4(),
+        "workspace_id": workspace_id,
+        "integration_id": integration_id,
+        "source_type": "zendesk",
+        "external_id": str(ticket["id"]),
+        "source_url": f"{base_url}/agent/tickets/{ticket['id']}",
+        "customer_email": source_from.get("address"),
+        "customer_name": source_from.get("name"),
+        "raw_content": raw_content,
+        "source_metadata": {
+            "status": ticket.get("status"),
+            "priority": ticket.get("priority"),
+            "type": ticket.get("type"),
+            "tags": ticket.get("tags") or [],
+            "requester_id": ticket.get("requester_id"),
+            "assignee_id": ticket.get("assignee_id"),
+            "channel": (ticket.get("via") or {}).get("channel"),
+            "updated_at": ticket.get("updated_at"),
+        },
+        # None when missing: the stored value is kept, a new item is skipped (dedupe key)
+        "created_at": _parse_ts(ticket.get("created_at")),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+# ---------------------------
+# Sync engine
+# ---------------------------
+async def _full_batches(client, integration, base_url, access_token) -> AsyncIterator[SyncBatch]:
+    async for page in iter_ticket_pages(client, base_url, access_token):
+        rows = [ticket_to_feedback(t, integration.workspace_id, integration.id, base_url) for t in page.tickets]
+        yield SyncBatch(rows=rows)
+
+
+async def _incremental_batches(client, integration, base_url, access_token, state: dict) -> AsyncIterator[SyncBatch]:
+    start_time = int(state.get("updated_since") or 0)
+    pages = iter_incremental_ticket_pages(
+        client, base_url, access_token, start_time=start_time, cursor=state.get("cursor")
+    )
+    async for page in pages:
+        rows = [ticket_to_feedback(t, integration.workspace_id, integration.id, base_url) for t in page.tickets]
+        updated = [ts for ts in (_parse_ts(t.get("updated_at")) for t in page.tickets) if ts]
+        if updated:
+            state = {**state, "updated_since": int(max(updated).replace(tzinfo=timezone.utc).timestamp())}
+        if page.cursor:
+            state = {**state, "cursor": page.cursor}
+        yield SyncBatch(rows=rows, state=state)
+
+
+async def sync_zendesk_integration(
+    db: AsyncSession,
+    integration: Integration,
+    client: Optional[httpx.AsyncClient] = None,
+    incremental: bool = True,
+    chunk_size: int = FEEDBACK_UPSERT_CHUNK_SIZE,
+) -> int:
+    """
+    Stream the integration's tickets into feedback_items.
+    Incremental mode resumes the export from the cursor stored in
+    Integration.config["sync_state"]; full mode re-walks every ticket.
+    Returns the number of rows written.
+    """
+    access_token = (integration.config or {}).get("access_token")
+    if not access_token:
+        raise ValueError("Zendesk integration has no access token")
+
+    base_url = zendesk_base_url(integration)
+    client = client or get_http_client("zendesk")
+
+    if incremental:
+        batches = _incremental_batches(client, integration, base_url, access_token, get_sync_state(integration))
+    else:
+        batches = _full_batches(client, integration, base_url, access_token)
+
+    return await run_feedback_sync(db, integration, batches, full=not incremental, chunk_size=chunk_size)
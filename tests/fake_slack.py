@@ -0,0 +1,94 @@
+# fake_slack.py
+"""
+In-process stand-in for the Slack Web API (tests/test_slack_sync.py). Serves
+conversations.list / history / replies with cursor pagination and enforces
+per-method rate limits the way Slack does: 429 with Retry-After.
+
+    fake = FakeSlackApi({"C1": messages}, window_seconds=1)
+    await sync_slack_integration(db, integration, client=fake.client())
+"""
+import math
+import time
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Optional
+
+import httpx
+
+from services.http_client import RetryTransport
+from services.slack_sync import METHOD_TIERS, SLACK_TIER_LIMITS
+
+
+class FakeSlackApi:
+    def __init__(
+        self,
+        channels: Dict[str, List[dict]],
+        per_minute: Optional[Dict[str, int]] = None,
+        window_seconds: float = 60.0,  # shrink to make a "minute" pass quickly in tests
+    ):
+        # channel id -> messages; replies are messages whose thread_ts differs from their ts
+        self.channels = channels
+        self.per_minute = per_minute or {method: SLACK_TIER_LIMITS[tier] for method, tier in METHOD_TIERS.items()}
+        self.window_seconds = window_seconds
+        self.calls = Counter()
+        self.throttled = 0
+        self._windows = defaultdict(deque)
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=RetryTransport(httpx.MockTransport(self.handle)))
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        method = request.url.path.rsplit("/", 1)[-1]
+        retry_after = self._throttle(method)
+        if retry_after is not None:
+            self.throttled += 1
+            return httpx.Response(429, headers={"Retry-After": str(retry_after)}, json={"ok": False, "error": "ratelimited"})
+        self.calls[method] += 1
+
+        params = request.url.params
+        handler = {
+            "conversations.list": self._list,
+            "conversations.history": self._history,
+            "conversations.replies": self._replies,
+        }.get(method)
+        if handler is None:
+            return httpx.Response(200, json={"ok": False, "error": "unknown_method"})
+        if method != "conversations.list" and params.get("channel") not in self.channels:
+            return httpx.Response(200, json={"ok": False, "error": "channel_not_found"})
+        return httpx.Response(200, json=handler(params))
+
+    def _throttle(self, method: str) -> Optional[int]:
+        limit = self.per_minute.get(method)
+        if not limit:
+            return None
+        now = time.monotonic()
+        window = self._windows[method]
+        while window and window[0] <= now - self.window_seconds:
+            window.popleft()
+        if len(window) >= limit:
+            return max(1, math.ceil(window[0] + self.window_seconds - now))
+        window.append(now)
+        return None
+
+    @staticmethod
+    def _page(items: List[dict], params, key: str) -> dict:
+        offset = int(params.get("cursor") or 0)
+        limit = int(params.get("limit") or 100)
+        page = items[offset:offset + limit]
+        next_cursor = str(offset + limit) if offset + limit < len(items) else ""
+        return {"ok": True, key: page, "has_more": bool(next_cursor), "response_metadata": {"next_cursor": next_cursor}}
+
+    def _list(self, params) -> dict:
+        channels = [{"id": cid, "name": cid.lower(), "is_member": True} for cid in self.channels]
+        return self._page(channels, params, "channels")
+
+    def _history(self, params) -> dict:
+        oldest = float(params.get("oldest") or 0)
+        top_level = [
+            m for m in self.channels[params["channel"]]
+            if m.get("thread_ts", m["ts"]) == m["ts"] and float(m["ts"]) > oldest
+        ]
+        return self._page(sorted(top_level, key=lambda m: float(m["ts"]), reverse=True), params, "messages")
+
+    def _replies(self, params) -> dict:
+        thread = [m for m in self.channels[params["channel"]] if m.get("thread_ts") == params["ts"] or m["ts"] == params["ts"]]
+        return self._page(sorted(thread, key=lambda m: float(m["ts"])), params, "messages")
@@ -0,0 +1,89 @@
+# test_feedback_listing.py
+"""Keyset pagination of GET /workspaces/{id}/feedback (services.feedback_query)."""
+import os
+
+import pytest
+from dotenv import load_dotenv
+
+load_dotenv()
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("needs DATABASE_URL (a migrated scratch Postgres)", allow_module_level=True)
+
+from sqlalchemy import select, text  # noqa: E402
+
+from benchmarks.feedback_search import SEED_SQL, _PHRASES  # noqa: E402
+from database.db import engine  # noqa: E402
+from database.models import FeedbackItem  # noqa: E402
+from services.feedback_query import (  # noqa: E402
+    FeedbackFilters,
+    apply_feedback_filters,
+    apply_keyset,
+    encode_cursor,
+    resolve_fields,
+)
+
+ROWS = 300
+TIED_ROWS = 12  # share one created_at: only the id tiebreak keeps pages disjoint
+PAGE = 50
+
+
+@pytest.fixture
+def seeded(workspace_id):
+    with engine.begin() as conn:
+        conn.execute(text(SEED_SQL), {
+            "workspace_id": workspace_id, "rows": ROWS, "phrases": _PHRASES, "n_phrases": len(_PHRASES),
+        })
+        conn.execute(text(
+            "INSERT INTO feedback_items (id, workspace_id, source_type, external_id, raw_content, "
+            "is_processed, priority_score, created_at, updated_at) "
+            "SELECT gen_random_uuid(), :workspace_id, 'benchmark', 'tied-' || g, 'tied row', false, 0, "
+            "date_trunc('second', now()) - interval '100 seconds', now() FROM generate_series(1, :n) AS g"
+        ), {"workspace_id": workspace_id, "n": TIED_ROWS})
+        conn.execute(text("ANALYZE feedback_items"))
+    return workspace_id
+
+
+def _page_query(workspace_id, cursor):
+    query = select(*(getattr(FeedbackItem, name) for name in resolve_fields(None)))
+    return apply_keyset(apply_feedback_filters(query, workspace_id, FeedbackFilters()), cursor, PAGE)
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def test_pages_cover_every_row_once_in_order(seeded):
+    seen, cursor = [], None
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(_page_query(seeded, cursor)).all()
+            page = rows[:PAGE]
+            seen.extend((row.created_at, row.id) for row in page)
+            if len(rows) <= PAGE:
+                break
+            cursor = encode_cursor(page[-1].created_at, page[-1].id)
+
+    assert len(seen) == ROWS + TIED_ROWS
+    assert len({item_id for _, item_id in seen}) == ROWS + TIED_ROWS
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_page_after_cursor_walks_the_index_without_sorting(seeded):
+    with engine.connect() as conn:
+        first = conn.execute(_page_query(seeded, None)).all()
+        query = _page_query(seeded, encode_cursor(first[PAGE - 1].created_at, first[PAGE - 1].id))
+        sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+        # a few hundred rows: steer the planner off the whole-table scans it would pick at this size
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        conn.execute(text("SET LOCAL enable_bitmapscan = off"))
+        [plan] = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+
+    nodes = list(_plan_nodes(plan["Plan"]))
+    assert not [n for n in nodes if n["Node Type"] in ("Sort", "Incremental Sort")], plan
+    # the parent index, or its per-partition copies (feedback_items_pYYYY_MM_workspace_id_created_at_id_idx)
+    indexes = {n.get("Index Name", "") for n in nodes if "Index" in n["Node Type"]}
+    assert indexes and all(
+        name == "idx_feedback_workspace_created" or name.endswith("workspace_id_created_at_id_idx") for name in indexes
+    ), plan
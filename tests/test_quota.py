@@ -0,0 +1,140 @@
+# test_quota.py
+"""Plan limits under concurrency: leased quota blocks (services.quota) and feedback ingest."""
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime
+
+import pytest
+from dotenv import load_dotenv
+
+load_dotenv()
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("needs DATABASE_URL (a migrated scratch Postgres)", allow_module_level=True)
+
+from sqlalchemy import func, select, text  # noqa: E402
+
+from database.db import AsyncSessionLocal, engine  # noqa: E402
+from database.models import FeedbackItem, Workspace  # noqa: E402
+from services.feedback_ingest import upsert_feedback_batch  # noqa: E402
+from services.quota import QuotaExceeded, QuotaManager  # noqa: E402
+
+
+@pytest.fixture
+def limited_workspace(workspace_id):
+    """workspace_id on a plan allowing LIMIT feedback items; returns (workspace_id, limit)."""
+    limit, plan_id = 200, uuid.uuid4()
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO subscription_plans (id, name, max_feedback_items, max_integrations, ai_analysis_limit, created_at) "
+                "VALUES (:id, :name, :limit, 1, :limit, now())"
+            ),
+            {"id": plan_id, "name": f"pytest-{plan_id.hex[:8]}", "limit": limit},
+        )
+        conn.execute(
+            text("UPDATE workspaces SET subscription_plan_id = :plan_id, current_feedback_count = 0 WHERE id = :id"),
+            {"id": workspace_id, "plan_id": plan_id},
+        )
+    yield workspace_id, limit
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE workspaces SET subscription_plan_id = NULL WHERE id = :id"), {"id": workspace_id})
+        conn.execute(text("DELETE FROM subscription_plans WHERE id = :id"), {"id": plan_id})
+
+
+async def _counter(workspace_id) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(Workspace.current_feedback_count).where(Workspace.id == workspace_id))
+
+
+def _rows(workspace_id, prefix: str, n: int, text_: str = "feedback") -> list:
+    return [
+        {
+            "id": uuid.uuid4(),
+            "workspace_id": workspace_id,
+            "integration_id": None,
+            "source_type": "csv",
+            "external_id": f"{prefix}-{i}",
+            "source_url": None,
+            "customer_email": None,
+            "customer_name": None,
+            "raw_content": f"{text_} {prefix} {i}",
+            "source_metadata": {},
+            "created_at": datetime(2026, 1, 1),
+            "updated_at": datetime.utcnow(),
+        }
+        for i in range(n)
+    ]
+
+
+def test_concurrent_managers_never_grant_past_the_limit(limited_workspace, run):
+    workspace_id, limit = limited_workspace
+    # each manager stands in for a worker process with its own leases
+    managers = [QuotaManager(block=25) for _ in range(6)]
+    used = []
+
+    async def consume(manager: QuotaManager):
+        while True:
+            units = random.randint(1, 5)
+            granted = await manager.acquire(workspace_id, "feedback_items", units)
+            if granted < units:
+                manager.give_back(workspace_id, "feedback_items", granted)
+                return
+            used.append(granted)
+
+    async def scenario():
+        await asyncio.gather(*(consume(m) for m in managers for _ in range(8)))
+        leased = await _counter(workspace_id)
+        await asyncio.gather(*(m.release(expired_only=False) for m in managers))
+        return leased, await _counter(workspace_id)
+
+    leased, after_release = run(scenario())
+    assert sum(used) <= leased <= limit
+    # unused leases went back: the counter is exactly what was consumed
+    assert after_release == sum(used)
+
+
+def test_require_is_all_or_nothing(limited_workspace, run):
+    workspace_id, limit = limited_workspace
+    manager = QuotaManager(block=limit)
+
+    async def scenario():
+        await manager.require(workspace_id, "feedback_items", limit - 5)
+        with pytest.raises(QuotaExceeded):
+            await manager.require(workspace_id, "feedback_items", 10)
+        # the failed require kept nothing: the last 5 units are still there
+        return await manager.acquire(workspace_id, "feedback_items", 5)
+
+    assert run(scenario()) == 5
+
+
+def test_concurrent_ingest_stops_at_the_limit(limited_workspace, run):
+    workspace_id, limit = limited_workspace
+    per_batch, batches = 40, 6  # 240 new rows against a limit of 200
+
+    async def ingest(prefix: str, text_: str = "feedback"):
+        async with AsyncSessionLocal() as db:
+            written = await upsert_feedback_batch(db, _rows(workspace_id, prefix, per_batch, text_))
+            await db.commit()
+            return written
+
+    async def scenario():
+        results = await asyncio.gather(*(ingest(f"b{i}") for i in range(batches)), return_exceptions=True)
+        unexpected = [r for r in results if isinstance(r, Exception) and not isinstance(r, QuotaExceeded)]
+        assert not unexpected, unexpected
+        stored_prefixes = [f"b{i}" for i, r in enumerate(results) if not isinstance(r, Exception)]
+        assert stored_prefixes, results
+        # at the limit, re-syncing rows that already exist is still allowed (updates are free)
+        resynced = await ingest(stored_prefixes[0], text_="edited")
+        async with AsyncSessionLocal() as db:
+            stored = await db.scalar(
+                select(func.count()).select_from(FeedbackItem).where(FeedbackItem.workspace_id == workspace_id)
+            )
+        return results, resynced, stored
+
+    results, resynced, stored = run(scenario())
+    failed = [r for r in results if isinstance(r, Exception)]
+    assert len(failed) == batches - limit // per_batch
+    assert stored == (batches - len(failed)) * per_batch <= limit
+    assert resynced == per_batch
@@ -0,0 +1,17 @@
+# base.py
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+from uuid import UUID
+
+
+@dataclass
+class ToolContext:
+    """What every analyst tool gets; tools open their own sessions so they can run concurrently."""
+    workspace_id: UUID
+    question: str
+    days: int = 30  # look-back window for aggregates
+    limit: int = 8  # feedback examples returned by search tools
+
+
+# async (ctx) -> JSON-serialisable dict
+Tool = Callable[[ToolContext], Awaitable[dict]]
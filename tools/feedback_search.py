@@ -0,0 +1,66 @@
+# feedback_search.py
+import re
+import uuid
+from typing import Optional
+
+from sqlalchemy import select
+
+from agents.embeddings import Embedder, get_embedder
+from database.db import AsyncSessionLocal
+from database.models import FeedbackItem
+from services.feedback_query import SEARCH_RESULT_FIELDS, FeedbackFilters, build_search_query
+from services.vector_index import collection_name, get_vector_client, search_similar
+from tools.base import ToolContext
+
+SEMANTIC_MIN_SCORE = 0.5
+_WORD_RE = re.compile(r"[\w'-]+")
+
+_embedder: Optional[Embedder] = None
+
+
+def _query_embedder() -> Embedder:
+    # must match the model the embedding worker indexed with
+    global _embedder
+    if _embedder is None:
+        _embedder = get_embedder()
+    return _embedder
+
+
+def _example(row) -> dict:
+    item = {name: getattr(row, name) for name in SEARCH_RESULT_FIELDS}
+    item["id"] = str(item["id"])
+    item["created_at"] = item["created_at"].isoformat() if item["created_at"] else None
+    return item
+
+
+async def keyword_search(ctx: ToolContext) -> dict:
+    """Full-text matches for any of the question's words (a question rarely matches as an AND query)."""
+    words = _WORD_RE.findall(ctx.question)
+    if not words:
+        return {"items": []}
+    # enriched rows only, like every analyst tool (see agents/answer_cache.py)
+    query = build_search_query(ctx.workspace_id, " or ".join(words), FeedbackFilters(processed=True), None, ctx.limit)
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(query)).all()[:ctx.limit]
+    return {"items": [{**_example(row), "rank": row.rank} for row in rows]}
+
+
+async def semantic_search(ctx: ToolContext) -> dict:
+    """Feedback closest to the question in the workspace's vector collection."""
+    if not await get_vector_client().collection_exists(collection_name(ctx.workspace_id)):
+        return {"items": []}
+    [vector] = await _query_embedder().embed([ctx.question])
+    matches = await search_similar(ctx.workspace_id, vector, ctx.limit, SEMANTIC_MIN_SCORE)
+    if not matches:
+        return {"items": []}
+
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(*(getattr(FeedbackItem, name) for name in SEARCH_RESULT_FIELDS)).where(
+                FeedbackItem.workspace_id == ctx.workspace_id,
+                FeedbackItem.id.in_([uuid.UUID(pid) for pid, _ in matches]),
+                FeedbackItem.is_processed.is_(True),
+            )
+        )
+        by_id = {str(row.id): _example(row) for row in rows}
+    return {"items": [{**by_id[pid], "score": score} for pid, score in matches if pid in by_id]}
@@ -0,0 +1,42 @@
+# feedback_stats.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from database.db import AsyncSessionLocal
+from database.models import FeedbackItem
+from tools.base import ToolContext
+
+
+async def feedback_stats(ctx: ToolContext) -> dict:
+    """Volume, sentiment mix, top categories and average priority of enriched feedback over the last ctx.days."""
+    since = datetime.utcnow() - timedelta(days=ctx.days)
+    # enriched rows only: enrichment bumps data_version, ingest does not (agents/answer_cache.py)
+    window = (
+        FeedbackItem.workspace_id == ctx.workspace_id,
+        FeedbackItem.created_at >= since,
+        FeedbackItem.is_processed.is_(True),
+    )
+    async with AsyncSessionLocal() as db:
+        sentiment = (await db.execute(
+            select(FeedbackItem.sentiment, func.count(), func.avg(FeedbackItem.priority_score))
+            .where(*window)
+            .group_by(FeedbackItem.sentiment)
+        )).all()
+        categories = (await db.execute(
+            select(FeedbackItem.primary_category, func.count().label("n"))
+            .where(*window, FeedbackItem.primary_category.is_not(None))
+            .group_by(FeedbackItem.primary_category)
+            .order_by(func.count().desc())
+            .limit(10)
+        )).all()
+
+    total = sum(count for _, count, _ in sentiment)
+    weighted = sum(float(avg or 0) * count for _, count, avg in sentiment)
+    return {
+        "days": ctx.days,
+        "total": total,
+        "sentiment": {(label or "unknown"): count for label, count, _ in sentiment},
+        "avg_priority": round(weighted / total, 2) if total else None,
+        "top_categories": [{"category": category, "count": count} for category, count in categories],
+    }
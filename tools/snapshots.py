@@ -0,0 +1,35 @@
+# snapshots.py
+from sqlalchemy import select
+
+from database.db import AsyncSessionLocal
+from database.models import InsightsSnapshot
+from tools.base import ToolContext
+
+TOP_ISSUES_PER_SNAPSHOT = 5
+
+
+async def latest_snapshots(ctx: ToolContext) -> dict:
+    """Latest weekly and monthly InsightsSnapshot rows, with their top issues trimmed for the prompt."""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(InsightsSnapshot)
+            .where(InsightsSnapshot.workspace_id == ctx.workspace_id, InsightsSnapshot.period_type.in_(("weekly", "monthly")))
+            .distinct(InsightsSnapshot.period_type)
+            .order_by(InsightsSnapshot.period_type, InsightsSnapshot.period_start.desc())
+        )).scalars().all()
+
+    return {
+        snapshot.period_type: {
+            "period_start": snapshot.period_start.isoformat(),
+            "period_end": snapshot.period_end.isoformat(),
+            "total": snapshot.total_feedback_count,
+            "sentiment": snapshot.sentiment_breakdown,
+            "sentiment_change": float(snapshot.sentiment_change) if snapshot.sentiment_change is not None else None,
+            "volume_change": float(snapshot.volume_change) if snapshot.volume_change is not None else None,
+            "top_issues": [
+                {k: issue.get(k) for k in ("issue", "count", "primary_category")}
+                for issue in (snapshot.top_issues or [])[:TOP_ISSUES_PER_SNAPSHOT]
+            ],
+        }
+        for snapshot in rows
+    }
@@ -0,0 +1,386 @@
+"""
+AI enrichment worker.
+
+Claims pending AIAnalysisJob rows with FOR UPDATE SKIP LOCKED (any number of
+worker processes can run side by side), answers what it can from the
+content-hash analysis cache, packs the rest into multi-item LLM calls, and
+writes results back with bulk UPDATEs. Every analysed item takes one unit
+of the workspace's monthly ai_analysis_limit; jobs over the limit go back to
+pending and the workspace is skipped until its quota frees up. Items whose
+analysis fails are retried with a backoff, up to AI_MAX_ATTEMPTS times.
+
+    python -m workers.ai_enrichment [--once] [--concurrency 4] [--model fake]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, exists, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from agents.analysis_cache import analysis_cache, cache_key
+from agents.enrichment import (
+    AI_PROMPT_VERSION,
+    EnrichmentInput,
+    EnrichmentModel,
+    EnrichmentResult,
+    get_enrichment_model,
+)
+from database.db import AsyncSessionLocal
+from database.models import AIAnalysisJob, FeedbackItem, UsageTracking
+from services.data_version import bump_data_version
+from services.live_events import LIVE_MAX_IDS, publish
+from services.quota import quota_manager
+
+load_dotenv()
+
+logger = logging.getLogger("workers.ai_enrichment")
+
+AI_JOB_TYPE = "enrichment"
+OPEN_JOB_STATUSES = ("pending", "processing")
+AI_CLAIM_SIZE = int(os.getenv("AI_CLAIM_SIZE", 200))  # jobs claimed per round
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", 20))  # feedback items per LLM call
+AI_WORKER_CONCURRENCY = int(os.getenv("AI_WORKER_CONCURRENCY", 4))  # LLM calls in flight
+AI_POLL_INTERVAL = float(os.getenv("AI_POLL_INTERVAL", 5))  # seconds to sleep when idle
+AI_JOB_TIMEOUT = int(os.getenv("AI_JOB_TIMEOUT", 600))  # seconds before a "processing" job is reclaimed
+AI_MAX_TEXT_CHARS = int(os.getenv("AI_MAX_TEXT_CHARS", 4000))
+AI_MAX_ATTEMPTS = int(os.getenv("AI_MAX_ATTEMPTS", 3))  # failed attempts before an item is given up on
+AI_RETRY_BACKOFF = int(os.getenv("AI_RETRY_BACKOFF", 300))  # seconds, times the attempts so far
+
+
+@dataclass
+class WorkerStats:
+    items: int = 0
+    failed: int = 0
+    cache_hits: int = 0
+    llm_items: int = 0
+    cost_usd: float = 0.0
+    cost_saved_usd: float = 0.0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def cost_per_llm_item(self) -> float:
+        return self.cost_usd / self.llm_items if self.llm_items else 0.0
+
+    def log(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        per_item = self.cost_usd / self.items if self.items else 0.0
+        hit_rate = self.cache_hits / self.items if self.items else 0.0
+        logger.info(
+            "enriched %s items (%s failed) at %.1f items/s, $%.6f per item, cache hit rate %.1f%%, $%.4f saved",
+            self.items, self.failed, self.items / elapsed, per_item, hit_rate * 100, self.cost_saved_usd,
+        )
+
+
+# ---------------------------
+# Queue
+# ---------------------------
+async def enqueue_unprocessed(db, limit: int = AI_CLAIM_SIZE * 5) -> int:
+    """
+    Create jobs for unprocessed feedback that has no open job yet. Candidates
+    come from the idx_feedback_enrich_pending partial index, so a poll reads
+    only the backlog; an item whose last attempt failed waits
+    AI_RETRY_BACKOFF x attempts before it is queued again.
+    """
+    now = datetime.utcnow()
+    backoff = literal(timedelta(seconds=AI_RETRY_BACKOFF)) * func.coalesce(FeedbackItem.processing_attempts, 0)
+    blocking_job = exists().where(
+        AIAnalysisJob.feedback_item_id == FeedbackItem.id,
+        or_(
+            AIAnalysisJob.status.in_(OPEN_JOB_STATUSES),
+            and_(AIAnalysisJob.status == "failed", AIAnalysisJob.completed_at > literal(now) - backoff),
+        ),
+    )
+    candidates = (
+        select(
+            func.gen_random_uuid(),
+            FeedbackItem.workspace_id,
+            FeedbackItem.id,
+            literal(AI_JOB_TYPE),
+            literal("pending"),
+            func.now(),
+        )
+        .where(FeedbackItem.is_processed.is_(False), FeedbackItem.processing_error.is_(None), ~blocking_job)
+        .order_by(FeedbackItem.created_at)
+        .limit(limit)
+    )
+    # uq_ai_job_open: a job another worker enqueued meanwhile is skipped, not duplicated
+    result = await db.execute(
+        pg_insert(AIAnalysisJob)
+        .from_select(["id", "workspace_id", "feedback_item_id", "job_type", "status", "created_at"], candidates)
+        .on_conflict_do_nothing(
+            index_elements=[AIAnalysisJob.feedback_item_id],
+            index_where=AIAnalysisJob.status.in_(OPEN_JOB_STATUSES),
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def claim_jobs(db, limit: int = AI_CLAIM_SIZE) -> List[tuple]:
+    """
+    Atomically move up to `limit` pending (or stale processing) jobs to
+    processing. SKIP LOCKED lets concurrent workers claim disjoint sets.
+    Workspaces known to be out of AI quota are skipped.
+    """
+    stale = datetime.utcnow() - timedelta(seconds=AI_JOB_TIMEOUT)
+    claimable = (
+        select(AIAnalysisJob.id)
+        .where(
+            AIAnalysisJob.job_type == AI_JOB_TYPE,
+            or_(
+                AIAnalysisJob.status == "pending",
+                and_(AIAnalysisJob.status == "processing", AIAnalysisJob.started_at < stale),
+            ),
+            AIAnalysisJob.workspace_id.notin_(quota_manager.exhausted("ai_analyses")),
+        )
+        .order_by(AIAnalysisJob.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(AIAnalysisJob)
+        .where(AIAnalysisJob.id.in_(claimable.scalar_subquery()))
+        .values(status="processing", started_at=datetime.utcnow())
+        .returning(AIAnalysisJob.id, AIAnalysisJob.feedback_item_id, AIAnalysisJob.workspace_id)
+        .execution_options(synchronize_session=False)
+    )
+    jobs = result.all()
+    await db.commit()
+    return jobs
+
+
+# ---------------------------
+# Processing
+# ---------------------------
+def _feedback_values(result: EnrichmentResult, now: datetime) -> dict:
+    return {
+        "sentiment": result.sentiment,
+        "sentiment_score": Decimal(str(round(result.sentiment_score, 2))),
+        "confidence_score": Decimal(str(round(result.confidence_score, 2))),
+        "primary_category": result.primary_category,
+        "categories": result.categories,
+        "ai_summary": result.ai_summary,
+        "priority_score": result.priority_score,
+        "keywords": result.keywords,
+        "is_processed": True,
+        "processing_error": None,
+        "processed_at": now,
+        "updated_at": now,
+    }
+
+
+async def _analyze(model: EnrichmentModel, semaphore: asyncio.Semaphore, batch: List[EnrichmentInput]):
+    async with semaphore:
+        try:
+            return batch, await model.analyze_batch(batch), None
+        except Exception as e:
+            logger.exception("LLM batch of %s items failed", len(batch))
+            return batch, None, str(e)
+
+
+async def _record_usage(db, usage: Dict[object, dict]):
+    """Add per-workspace AI counters to today's usage_tracking row. Does not commit."""
+    if not usage:
+        return
+    today = date.today()
+    stmt = pg_insert(UsageTracking).values([
+        {
+            "id": uuid.uuid4(),
+            "workspace_id": workspace_id,
+            "date": today,
+            "feedback_items_processed": counters["items"],
+            "ai_analyses_run": counters["llm_items"],
+            "ai_cost_usd": Decimal(str(round(counters["cost_usd"], 4))),
+            "created_at": datetime.utcnow(),
+        }
+        for workspace_id, counters in usage.items()
+    ])
+    excluded = stmt.excluded
+    await db.execute(stmt.on_conflict_do_update(
+        constraint="uq_usage_workspace_date",
+        set_={
+            col: func.coalesce(getattr(UsageTracking, col), 0) + excluded[col]
+            for col in ("feedback_items_processed", "ai_analyses_run", "ai_cost_usd")
+        },
+    ))
+
+
+async def _within_quota(db, jobs: List[tuple]) -> List[tuple]:
+    """Take one ai_analyses unit per job; jobs that do not fit go back to pending."""
+    by_workspace: Dict[object, List[tuple]] = defaultdict(list)
+    for job in jobs:
+        by_workspace[job.workspace_id].append(job)
+
+    allowed, deferred = [], []
+    for workspace_id, workspace_jobs in by_workspace.items():
+        granted = await quota_manager.acquire(workspace_id, "ai_analyses", len(workspace_jobs))
+        allowed.extend(workspace_jobs[:granted])
+        deferred.extend(workspace_jobs[granted:])
+    if deferred:
+        logger.info("%s jobs deferred: AI analysis limit reached", len(deferred))
+        await db.execute(
+            update(AIAnalysisJob),
+            [{"id": job.id, "status": "pending", "started_at": None} for job in deferred],
+        )
+        await db.commit()
+    return allowed
+
+
+async def process_jobs(db, model: EnrichmentModel, jobs: List[tuple], stats: WorkerStats, concurrency: int):
+    jobs = await _within_quota(db, jobs)
+    if not jobs:
+        return
+    job_by_item: Dict[str, object] = {str(job.feedback_item_id): job.id for job in jobs}
+    item_ids: Dict[str, object] = {str(job.feedback_item_id): job.feedback_item_id for job in jobs}
+    workspace_by_item: Dict[str, object] = {str(job.feedback_item_id): job.workspace_id for job in jobs}
+    rows = (await db.execute(
+        select(FeedbackItem.id, FeedbackItem.cleaned_content, FeedbackItem.raw_content, FeedbackItem.processing_attempts)
+        .where(FeedbackItem.id.in_([job.feedback_item_id for job in jobs]))
+    )).all()
+    inputs = [
+        EnrichmentInput(id=str(row.id), text=(row.cleaned_content or row.raw_content)[:AI_MAX_TEXT_CHARS])
+        for row in rows
+    ]
+    attempts_by_item = {str(row.id): row.processing_attempts or 0 for row in rows}
+
+    # Identical texts (after normalization) share one cache entry and, on a
+    # miss, one LLM slot: only a representative item per key is sent.
+    key_by_item = {item.id: cache_key(item.text, model.name, AI_PROMPT_VERSION) for item in inputs}
+    cached = await analysis_cache.get_many(db, key_by_item.values())
+    representatives: Dict[str, EnrichmentInput] = {}
+    for item in inputs:
+        key = key_by_item[item.id]
+        if key not in cached:
+            representatives.setdefault(key, item)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    to_send = list(representatives.values())
+    batches = [to_send[i:i + AI_BATCH_SIZE] for i in range(0, len(to_send), AI_BATCH_SIZE)]
+    outcomes = await asyncio.gather(*(_analyze(model, semaphore, batch) for batch in batches))
+
+    fresh: Dict[str, dict] = {}
+    errors: Dict[str, str] = {}
+    usage: Dict[object, dict] = defaultdict(lambda: {"items": 0, "llm_items": 0, "cost_usd": 0.0})
+    for batch, output, error in outcomes:
+        results = {r.id: r for r in output.results} if output else {}
+        cost_each = output.cost_usd / len(batch) if output and batch else 0.0
+        for item in batch:
+            key = key_by_item[item.id]
+            result = results.get(item.id)
+            if result is None:
+                errors[key] = error or "model returned no result for item"
+                continue
+            fresh[key] = result.model_dump(exclude={"id"})
+            counters = usage[workspace_by_item[item.id]]
+            counters["llm_items"] += 1
+            counters["cost_usd"] += cost_each
+            stats.llm_items += 1
+            stats.cost_usd += cost_each
+
+    now = datetime.utcnow()
+    feedback_updates, job_updates, error_updates = [], [], []
+    enriched: Dict[object, list] = defaultdict(list)
+    for item in inputs:
+        key = key_by_item[item.id]
+        job_id = job_by_item[item.id]
+        value = cached.get(key) or fresh.get(key)
+        if value is None:
+            message = errors.get(key, "model returned no result for item")
+            job_updates.append({"id": job_id, "status": "failed", "error_message": message, "completed_at": now})
+            # a failed batch (timeout, rate limit) is retried after a backoff; only
+            # AI_MAX_ATTEMPTS failures take the item out of the queue for good
+            attempts = attempts_by_item[item.id] + 1
+            error_updates.append({
+                "id": item_ids[item.id],
+                "processing_attempts": attempts,
+                "processing_error": message if attempts >= AI_MAX_ATTEMPTS else None,
+                "updated_at": now,
+            })
+            quota_manager.give_back(workspace_by_item[item.id], "ai_analyses", 1)
+            stats.failed += 1
+            continue
+
+        result = EnrichmentResult(id=item.id, **value)
+        feedback_updates.append({"id": item_ids[item.id], **_feedback_values(result, now)})
+        job_updates.append({
+            "id": job_id,
+            "status": "completed",
+            "output_data": {**result.model_dump(), "cache_hit": key in cached},
+            "error_message": None,
+            "completed_at": now,
+        })
+        usage[workspace_by_item[item.id]]["items"] += 1
+        enriched[workspace_by_item[item.id]].append(item_ids[item.id])
+        stats.items += 1
+        if representatives.get(key) is not item:
+            # served from cache or from another item's call in this round
+            stats.cache_hits += 1
+            stats.cost_saved_usd += stats.cost_per_llm_item
+
+    # jobs whose feedback item disappeared meanwhile
+    seen = {item.id for item in inputs}
+    for item_id, job_id in job_by_item.items():
+        if item_id not in seen:
+            job_updates.append({"id": job_id, "status": "failed", "error_message": "feedback item not found", "completed_at": now})
+            quota_manager.give_back(workspace_by_item[item_id], "ai_analyses", 1)
+
+    # bulk UPDATE ... WHERE id = :id (executemany), one round-trip per statement
+    await analysis_cache.put_many(db, fresh, model.name, AI_PROMPT_VERSION)
+    if feedback_updates:
+        await db.execute(update(FeedbackItem), feedback_updates)
+    if error_updates:
+        await db.execute(update(FeedbackItem), error_updates)
+    if job_updates:
+        await db.execute(update(AIAnalysisJob), job_updates)
+    await _record_usage(db, usage)
+    # cached agent answers for these workspaces are stale from this commit on
+    await bump_data_version(db, [workspace_id for workspace_id, counters in usage.items() if counters["items"]])
+    for workspace_id, ids in enriched.items():
+        await publish(db, workspace_id, "feedback.enriched", count=len(ids), ids=[str(i) for i in ids[:LIVE_MAX_IDS]])
+    await db.commit()
+
+
+async def run_worker(model: EnrichmentModel, concurrency: int = AI_WORKER_CONCURRENCY, once: bool = False):
+    stats = WorkerStats()
+    try:
+        while True:
+            async with AsyncSessionLocal() as db:
+                await enqueue_unprocessed(db)
+                jobs = await claim_jobs(db)
+                if jobs:
+                    await process_jobs(db, model, jobs, stats, concurrency)
+                    stats.log()
+            await quota_manager.release()
+
+            if once and not jobs:
+                return stats
+            if not jobs:
+                await asyncio.sleep(AI_POLL_INTERVAL)
+    finally:
+        # unused leased units go back to the workspaces
+        await quota_manager.release(expired_only=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI enrichment worker")
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    parser.add_argument("--concurrency", type=int, default=AI_WORKER_CONCURRENCY)
+    parser.add_argument("--model", default=None, help='model name, or "fake" for the local stand-in')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    asyncio.run(run_worker(get_enrichment_model(args.model), args.concurrency, args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Feedback embedding worker.
+
+Locks a batch of not-yet-embedded feedback rows (FOR UPDATE SKIP LOCKED, so
+workers can run side by side and a concurrent re-sync of the same row waits),
+embeds them in multi-text calls, upserts the vectors into each workspace's
+Qdrant collection and stamps embedded_at in the same transaction.
+
+    python -m workers.embedding [--once] [--embedder hashing]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import List
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select, update
+
+from agents.embeddings import Embedder, get_embedder
+from database.db import AsyncSessionLocal
+from database.models import FeedbackItem
+from services.vector_index import upsert_vectors, vector_payload
+
+load_dotenv()
+
+logger = logging.getLogger("workers.embedding")
+
+EMBED_CLAIM_SIZE = int(os.getenv("EMBED_CLAIM_SIZE", 500))  # rows locked per round
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 100))  # texts per embedding call
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", 4))  # embedding calls in flight
+EMBED_POLL_INTERVAL = float(os.getenv("EMBED_POLL_INTERVAL", 10))  # seconds to sleep when idle
+
+
+async def _embed_all(embedder: Embedder, texts: List[str], concurrency: int) -> List[List[float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(batch):
+        async with semaphore:
+            return await embedder.embed(batch)
+
+    batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    vectors = []
+    for result in await asyncio.gather(*(run(b) for b in batches)):
+        vectors.extend(result)
+    return vectors
+
+
+async def embed_pending(db, embedder: Embedder, limit: int = EMBED_CLAIM_SIZE, concurrency: int = EMBED_CONCURRENCY) -> int:
+    """Embed one round of pending rows. Returns the number of rows stamped."""
+    rows = (await db.execute(
+        select(
+            FeedbackItem.id,
+            FeedbackItem.workspace_id,
+            FeedbackItem.created_at,
+            FeedbackItem.sentiment,
+            FeedbackItem.primary_category,
+            func.coalesce(FeedbackItem.cleaned_content, FeedbackItem.raw_content).label("text"),
+        )
+        .where(FeedbackItem.embedded_at.is_(None))
+        .order_by(FeedbackItem.created_at)
+        .limit(limit)
+        .with_for_update(of=FeedbackItem, skip_locked=True)
+    )).all()
+    if not rows:
+        await db.rollback()
+        return 0
+
+    # blank rows have nothing to embed; they are stamped so they leave the queue
+    to_embed = [row for row in rows if (row.text or "").strip()]
+    vectors = await _embed_all(embedder, [row.text for row in to_embed], concurrency)
+
+    by_workspace = defaultdict(list)
+    for row, vector in zip(to_embed, vectors):
+        payload = vector_payload(row.created_at, sentiment=row.sentiment, category=row.primary_category)
+        by_workspace[row.workspace_id].append((row.id, vector, payload))
+    for workspace_id, points in by_workspace.items():
+        await upsert_vectors(workspace_id, embedder.dimension, points)
+
+    await db.execute(
+        update(FeedbackItem)
+        .where(FeedbackItem.id.in_([row.id for row in rows]))
+        .values(embedded_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return len(rows)
+
+
+async def run_worker(embedder: Embedder, once: bool = False, concurrency: int = EMBED_CONCURRENCY) -> int:
+    total = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            embedded = await embed_pending(db, embedder, concurrency=concurrency)
+        total += embedded
+        if embedded:
+            logger.info("embedded %s feedback items (%s total)", embedded, total)
+        elif once:
+            return total
+        else:
+            await asyncio.sleep(EMBED_POLL_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feedback embedding worker")
+    parser.add_argument("--once", action="store_true", help="exit when nothing is left to embed")
+    parser.add_argument("--concurrency", type=int, default=EMBED_CONCURRENCY)
+    parser.add_argument("--embedder", default=None, help='embedding model, or "hashing" for the local stand-in')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    asyncio.run(run_worker(get_embedder(args.embedder), args.once, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Webhook drain worker.
+
+Claims unprocessed WebhookEvent rows in batches (FOR UPDATE SKIP LOCKED; the
+claim pushes next_attempt_at forward as a lease, so a crashed worker's batch
+comes back on its own), drops provider re-deliveries by webhook_id, upserts the
+resulting FeedbackItems one integration at a time and marks the events
+processed in the same transaction. When an integration's upsert fails its
+events are upserted one by one, so only the failing ones are retried, with
+exponential backoff via retry_count / next_attempt_at until
+WEBHOOK_MAX_RETRIES, after which the row stays unprocessed as a dead letter.
+
+    python -m workers.webhook_drain [--once]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import or_, select, tuple_, update
+
+from database.db import AsyncSessionLocal
+from database.models import Integration, WebhookEvent
+from services.feedback_ingest import upsert_feedback_batch
+from services.intercom_sync import conversation_to_feedback
+from services.quota import quota_manager
+from services.slack_sync import message_to_feedback
+from services.webhook_intake import tenant_matches
+from services.zendesk_sync import ticket_to_feedback, zendesk_base_url
+
+load_dotenv()
+
+logger = logging.getLogger("workers.webhook_drain")
+
+WEBHOOK_CLAIM_SIZE = int(os.getenv("WEBHOOK_CLAIM_SIZE", 200))
+WEBHOOK_LEASE = int(os.getenv("WEBHOOK_LEASE", 300))  # seconds a claimed batch stays invisible to other workers
+WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", 8))
+WEBHOOK_BACKOFF_BASE = float(os.getenv("WEBHOOK_BACKOFF_BASE", 30))  # seconds
+WEBHOOK_BACKOFF_MAX = float(os.getenv("WEBHOOK_BACKOFF_MAX", 3600))  # seconds
+WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", 2))  # seconds to sleep when idle
+
+
+@dataclass
+class DrainStats:
+    processed: int = 0
+    feedback_written: int = 0
+    duplicates: int = 0
+    retried: int = 0
+    dead: int = 0
+
+
+# ---------------------------
+# Claim
+# ---------------------------
+async def claim_events(db, limit: int = WEBHOOK_CLAIM_SIZE) -> List[tuple]:
+    now = datetime.utcnow()
+    claimable = (
+        select(WebhookEvent.id)
+        .where(
+            WebhookEvent.processed.is_(False),
+            WebhookEvent.retry_count < WEBHOOK_MAX_RETRIES,
+            or_(WebhookEvent.next_attempt_at.is_(None), WebhookEvent.next_attempt_at <= now),
+        )
+        .order_by(WebhookEvent.received_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(WebhookEvent)
+        .where(WebhookEvent.id.in_(claimable.scalar_subquery()))
+        .values(next_attempt_at=now + timedelta(seconds=WEBHOOK_LEASE))
+        .returning(
+            WebhookEvent.id, WebhookEvent.workspace_id, WebhookEvent.integration_id, WebhookEvent.webhook_id,
+            WebhookEvent.event_type, WebhookEvent.payload, WebhookEvent.retry_count, WebhookEvent.received_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    # oldest first so the last delivery for an entity wins the upsert
+    events = sorted(result.all(), key=lambda e: e.received_at)
+    await db.commit()
+    return events
+
+
+# ---------------------------
+# Event -> feedback row
+# ---------------------------
+def event_to_feedback(event, integration: Integration) -> Optional[dict]:
+    """None for events that carry no feedback (pings, deletions, bot messages...)."""
+    payload = event.payload or {}
+    if integration.type == "zendesk":
+        # trigger payloads conventionally wrap the ticket; event webhooks put it in `detail`
+        ticket = payload.get("ticket") or payload.get("detail")
+        if not ticket or "id" not in ticket:
+            return None
+        return ticket_to_feedback(ticket, event.workspace_id, event.integration_id, zendesk_base_url(integration))
+    if integration.type == "intercom":
+        item = (payload.get("data") or {}).get("item") or {}
+        if item.get("type") != "conversation":
+            return None
+        return conversation_to_feedback(item, event.workspace_id, event.integration_id)
+    if integration.type == "slack":
+        message = payload.get("event") or {}
+        if message.get("type") != "message" or not message.get("ts"):
+            return None
+        return message_to_feedback(message, message.get("channel"), event.workspace_id, event.integration_id, payload.get("team_id"))
+    return None
+
+
+def _retry(event, error: Exception, now: datetime, stats: DrainStats) -> dict:
+    attempts = (event.retry_count or 0) + 1
+    if attempts >= WEBHOOK_MAX_RETRIES:
+        stats.dead += 1
+        logger.warning("webhook event %s gave up after %s attempts: %s", event.id, attempts, error)
+    else:
+        stats.retried += 1
+    delay = min(WEBHOOK_BACKOFF_MAX, WEBHOOK_BACKOFF_BASE * 2 ** (attempts - 1))
+    return {
+        "id": event.id,
+        "retry_count": attempts,
+        "next_attempt_at": now + timedelta(seconds=delay * random.uniform(0.5, 1.0)),
+        "processing_error": str(error)[:2000],
+    }
+
+
+def _done(event, now: datetime, note: Optional[str] = None) -> dict:
+    return {"id": event.id, "processed": True, "processed_at": now, "processing_error": note}
+
+
+async def _processed_keys(db, events: List[tuple]) -> set:
+    keys = {(e.integration_id, e.webhook_id) for e in events if e.webhook_id}
+    if not keys:
+        return set()
+    rows = await db.execute(
+        select(WebhookEvent.integration_id, WebhookEvent.webhook_id).where(
+            tuple_(WebhookEvent.integration_id, WebhookEvent.webhook_id).in_(list(keys)),
+            WebhookEvent.processed.is_(True),
+        )
+    )
+    return {tuple(row) for row in rows}
+
+
+# ---------------------------
+# Process
+# ---------------------------
+async def _upsert(db, rows: List[dict]) -> int:
+    # SAVEPOINT: a failed upsert is undone without losing the rest of the batch
+    async with db.begin_nested():
+        return await upsert_feedback_batch(db, rows)
+
+
+async def _write_feedback(db, pending: List[tuple], now: datetime, stats: DrainStats) -> List[dict]:
+    """Upsert (event, row) pairs per integration; returns the WebhookEvent updates."""
+    groups = {}
+    for event, row in pending:
+        groups.setdefault(event.integration_id, []).append((event, row))
+
+    updates = []
+    for integration_id, group in groups.items():
+        if len(group) > 1:
+            try:
+                stats.feedback_written += await _upsert(db, [row for _, row in group])
+                updates.extend(_done(event, now) for event, _ in group)
+                continue
+            except Exception:
+                logger.exception(
+                    "feedback upsert failed for integration %s; retrying its %s events one by one",
+                    integration_id, len(group),
+                )
+        for event, row in group:
+            try:
+                stats.feedback_written += await _upsert(db, [row])
+                updates.append(_done(event, now))
+            except Exception as e:
+                logger.warning("feedback upsert failed for webhook event %s: %s", event.id, e)
+                updates.append(_retry(event, e, now, stats))
+    return updates
+
+
+async def process_events(db, events: List[tuple], stats: DrainStats):
+    now = datetime.utcnow()
+    integrations = {
+        i.id: i for i in (await db.scalars(
+            select(Integration).where(Integration.id.in_({e.integration_id for e in events}))
+        ))
+    }
+    seen = await _processed_keys(db, events)
+
+    updates, pending = [], []
+    for event in events:
+        key = (event.integration_id, event.webhook_id)
+        if event.webhook_id and key in seen:
+            # provider re-delivered an event we already handled
+            stats.duplicates += 1
+            updates.append(_done(event, now, "duplicate delivery"))
+            continue
+        seen.add(key)
+
+        integration = integrations.get(event.integration_id)
+        if integration is None:
+            updates.append(_done(event, now, "integration no longer exists"))
+            continue
+        if not tenant_matches(integration, event.payload or {}):
+            # queued before intake checked the team/app id, or the integration was reconnected elsewhere
+            updates.append(_done(event, now, "event belongs to another provider account"))
+            continue
+        try:
+            row = event_to_feedback(event, integration)
+        except Exception as e:
+            updates.append(_retry(event, e, now, stats))
+            continue
+        if row is None:
+            updates.append(_done(event, now))
+        else:
+            pending.append((event, row))
+
+    updates.extend(await _write_feedback(db, pending, now, stats))
+    # bulk UPDATE by primary key; same transaction as the feedback upsert
+    await db.execute(update(WebhookEvent), updates)
+    await db.commit()
+    stats.processed += len(events)
+
+
+async def run_worker(once: bool = False) -> DrainStats:
+    stats = DrainStats()
+    try:
+        while True:
+            async with AsyncSessionLocal() as db:
+                events = await claim_events(db)
+                if events:
+                    await process_events(db, events, stats)
+                    logger.info(
+                        "processed=%s feedback=%s duplicates=%s retried=%s dead=%s",
+                        stats.processed, stats.feedback_written, stats.duplicates, stats.retried, stats.dead,
+                    )
+            await quota_manager.release()
+            if not events:
+                if once:
+                    return stats
+                await asyncio.sleep(WEBHOOK_POLL_INTERVAL)
+    finally:
+        # unused leased feedback_items units go back to the workspaces
+        await quota_manager.release(expired_only=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook drain worker")
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    asyncio.run(run_worker(args.once))
+
+
+if __name__ == "__main__":
+    main()